@@ -76,7 +76,7 @@ def serialize(A):
     object, if possible.
     """
     if isinstance(A, str):
-        return (0, A)
+        return (0, A.encode('utf-8'))
 
     if isinstance(A, numpy.ndarray):
         dt = A.dtype
@@ -89,11 +89,11 @@ def serialize(A):
 
         if A.flags['C_CONTIGUOUS']:
             # great, just use the array's buffer interface
-            return (ft, A.tostring())
+            return (ft, A.tobytes())
 
         # otherwise, we need a copy to C order
         AC = A.copy('C')
-        return (ft, AC.tostring())
+        return (ft, AC.tobytes())
 
     if isinstance(A, int):
         return (DATATYPE_INT32, struct.pack('i', A))
@@ -174,13 +174,13 @@ class Event:
         raw_value = buf[32 + st:32 + st + sv]
 
         if type_type == 0:
-            self.type = raw_type
+            self.type = raw_type.decode('utf-8')
         else:
             self.type = numpy.ndarray(
                 (type_numel), dtype=numpyType[type_type], buffer=raw_type)
 
         if value_type == 0:
-            self.value = raw_value
+            self.value = raw_value.decode('utf-8')
         else:
             self.value = numpy.ndarray(
                 (value_numel), dtype=numpyType[value_type], buffer=raw_value)
@@ -196,13 +196,13 @@ class Event:
         if type_type == DATATYPE_UNKNOWN:
             return None
         type_size = len(type_buf)
-        type_numel = type_size / wordSize[type_type]
+        type_numel = type_size // wordSize[type_type]
 
         value_type, value_buf = serialize(self.value)
         if value_type == DATATYPE_UNKNOWN:
             return None
         value_size = len(value_buf)
-        value_numel = value_size / wordSize[value_type]
+        value_numel = value_size // wordSize[value_type]
 
         bufsize = type_size + value_size
 
@@ -247,6 +247,38 @@ class Client:
         while nw < N:
             nw += self.sock.send(request[nw:])
 
+    def sendBuffers(self, buffers):
+        """
+        Send several buffers (bytes or contiguous arrays) back to back,
+        without joining them first where the socket supports sendmsg.
+        """
+        if not(self.isConnected):
+            raise IOError('Not connected to FieldTrip buffer')
+
+        if not(hasattr(self.sock, 'sendmsg')):
+            self.sendRaw(b''.join(bytes(memoryview(b)) for b in buffers))
+            return
+
+        views = [memoryview(b).cast('B') for b in buffers]
+        while views:
+            nw = self.sock.sendmsg(views)
+            while views and nw >= len(views[0]):
+                nw -= len(views[0])
+                views.pop(0)
+            if views and nw:
+                views[0] = views[0][nw:]
+
+    def recvInto(self, buf):
+        """Fill the writable buffer 'buf' (bytearray, contiguous array) from the socket."""
+        view = memoryview(buf).cast('B')
+        nr = 0
+        while nr < len(view):
+            n = self.sock.recv_into(view[nr:])
+            if n == 0:
+                self.disconnect()
+                raise IOError('Connection closed by buffer server')
+            nr += n
+
     def sendRequest(self, command, payload=None):
         if payload is None:
             request = struct.pack('HHI', VERSION, command, 0)
@@ -261,9 +293,8 @@ class Client:
         (status,bufsize,payload).
         """
 
-        resp_hdr = self.sock.recv(8)
-        while len(resp_hdr) < 8:
-            resp_hdr += self.sock.recv(8 - len(resp_hdr))
+        resp_hdr = bytearray(8)
+        self.recvInto(resp_hdr)
 
         (version, command, bufsize) = struct.unpack('HHI', resp_hdr)
 
@@ -272,9 +303,8 @@ class Client:
             raise IOError('Bad response from buffer server - disconnecting')
 
         if bufsize > 0:
-            payload = self.sock.recv(bufsize)
-            while len(payload) < bufsize:
-                payload += self.sock.recv(bufsize - len(payload))
+            payload = bytearray(bufsize)
+            self.recvInto(payload)
         else:
             payload = None
         return (command, bufsize, payload)
@@ -411,11 +441,50 @@ class Client:
         if bfsiz < bufsize - 16 or datype >= len(numpyType):
             raise IOError('Invalid DATA packet received')
 
-        raw = payload[16:bfsiz + 16]
-        D = numpy.ndarray((nsamp, nchans), dtype=numpyType[datype], buffer=raw)
+        D = numpy.ndarray((nsamp, nchans), dtype=numpyType[datype], buffer=payload,
+                          offset=16)
 
         return D
 
+    def getDataInto(self, index, out):
+        """
+        getDataInto(indices, out) -- like getData(indices), but the samples
+        are received straight into 'out', a C-contiguous array of exactly
+        their shape and type. Returns False if the buffer does not hold
+        them (any more).
+        """
+        request = struct.pack('HHIII', VERSION, GET_DAT, 8, int(index[0]), int(index[1]))
+        self.sendRaw(request)
+
+        resp_hdr = bytearray(8)
+        self.recvInto(resp_hdr)
+        (version, status, bufsize) = struct.unpack('HHI', resp_hdr)
+        if version != VERSION:
+            self.disconnect()
+            raise IOError('Bad response from buffer server - disconnecting')
+
+        if status == GET_ERR:
+            if bufsize > 0:
+                self.recvInto(bytearray(bufsize))
+            return False
+
+        if status != GET_OK or bufsize < 16:
+            self.disconnect()
+            raise IOError('Bad response from buffer server - disconnecting')
+
+        datadef = bytearray(16)
+        self.recvInto(datadef)
+        (nchans, nsamp, datype, bfsiz) = struct.unpack('IIII', datadef)
+
+        if (bfsiz != bufsize - 16 or datype >= len(numpyType) or
+                numpy.dtype(numpyType[datype]) != out.dtype or out.shape != (nsamp, nchans)):
+            # keep the connection in step before complaining
+            self.recvInto(bytearray(bufsize - 16))
+            raise IOError('DATA packet does not match the output array')
+
+        self.recvInto(out)
+        return True
+
     def getEvents(self, index=None):
         """
         getEvents([indices]) -- retrieve events and return them as a list
@@ -462,11 +531,12 @@ class Client:
         if isinstance(E, Event):
             buf = E.serialize()
         else:
-            buf = ''
+            buf = b''
             num = 0
             for e in E:
                 if not(isinstance(e, Event)):
-                    raise 'Element %i in given list is not an Event' % num
+                    raise ValueError(
+                        'Element %i in given list is not an Event' % num)
                 buf = buf + e.serialize()
                 num = num + 1
 
@@ -497,18 +567,25 @@ class Client:
         nSamp = D.shape[0]
         nChan = D.shape[1]
 
-        (dataType, dataBuf) = serialize(D)
+        if not(D.flags['C_CONTIGUOUS']):
+            D = D.copy('C')
+
+        dt = D.dtype
+        if not(dt.isnative) or dt.num < 1 or dt.num >= len(dataType) or \
+                dataType[dt.num] == -1:
+            raise ValueError('Data type of the NUMPY array is not supported')
 
-        dataBufSize = len(dataBuf)
+        dataBufSize = D.nbytes
 
         if response:
             command = PUT_DAT
         else:
             command = PUT_DAT_NORESPONSE
 
-        request = struct.pack('HHI', VERSION, command, 16 + dataBufSize)
-        dataDef = struct.pack('IIII', nChan, nSamp, dataType, dataBufSize)
-        self.sendRaw(request + dataDef + dataBuf)
+        # header and samples go out in one call, straight from the array
+        request = struct.pack('HHIIIII', VERSION, command, 16 + dataBufSize,
+                              nChan, nSamp, dataType[dt.num], dataBufSize)
+        self.sendBuffers([request, D])
 
         if response:
             (status, bufsize, resp_buf) = self.receiveResponse()
@@ -1,3 +1,13 @@
-from .start import print_commands
+from . import timing
 
 __version__ = '0.1.dev0'
+
+timing.mark('import fieldline_client')
+
+
+def __getattr__(name):
+    # the console pulls in lib and the session, import it only when asked
+    if name == 'print_commands':
+        from .start import print_commands
+        return print_commands
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
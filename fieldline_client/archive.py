@@ -0,0 +1,218 @@
+"""
+Lossless archive of the raw FieldLine counts.
+
+Samples are stored in blocks. Every block holds the int32 counts of all
+channels, channel by channel, delta-encoded along time, byte-shuffled and
+zlib-compressed, together with the scale (T per count) of every channel.
+An index of the blocks at the end of the file gives random access; a file
+whose writer died before writing it is read by scanning the blocks.
+
+    file   := header block* index footer
+    header := MAGIC, uint32 length, JSON {labels, keys, sample_freq, ...}
+    block  := BLOCK_MAGIC, uint64 first_sample, uint32 n_samples,
+              uint32 n_channels, uint32 length, zlib data,
+              float64 scale[n_channels]
+    index  := (uint64 first_sample, uint32 n_samples, uint64 offset) per block
+    footer := uint64 index offset, uint32 n_blocks, INDEX_MAGIC
+"""
+
+import json
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b'FLARCH01'
+BLOCK_MAGIC = b'BLK1'
+INDEX_MAGIC = b'FLIDX001'
+
+_block_header = struct.Struct('<4sQIII')
+_index_entry = struct.Struct('<QIQ')
+_footer = struct.Struct('<QI8s')
+
+
+def encode_block(counts):
+    """encode_block(counts) -- samples x channels int32 to compressed bytes."""
+    counts = np.ascontiguousarray(counts.T, dtype=np.int32)
+    deltas = np.empty_like(counts)
+    deltas[:, 0] = counts[:, 0]
+    # int32 wrap-around is undone by the int32 cumsum in decode_block
+    np.subtract(counts[:, 1:], counts[:, :-1], out=deltas[:, 1:])
+    shuffled = deltas.view(np.uint8).reshape(-1, 4).T
+    return zlib.compress(shuffled.tobytes(), 6)
+
+
+def decode_block(data, n_samples, n_channels):
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(4, -1)
+    deltas = shuffled.T.copy().view(np.int32).reshape(n_channels, n_samples)
+    return np.cumsum(deltas, axis=1, dtype=np.int32).T
+
+
+class ArchiveWriter:
+
+    """
+    ArchiveWriter(fname, labels, keys, sample_freq [, block_samples,
+    max_blocks]) -- archive raw counts. write() only copies into the block
+    being filled; full blocks are compressed and written by a background
+    thread, with at most 'max_blocks' waiting (write() blocks beyond that).
+    """
+
+    def __init__(self, fname, labels, keys, sample_freq, block_samples=1000, max_blocks=16):
+        self.fname = fname
+        self.n_channels = len(labels)
+        self.block = np.empty((block_samples, self.n_channels), dtype=np.int32)
+        self.scale = np.zeros(self.n_channels)
+        self.fill = 0
+        self.first_sample = 0
+        self.q = queue.Queue(maxsize=max_blocks)
+        self.error = None
+        header = json.dumps({'labels': list(labels), 'keys': list(keys),
+                             'sample_freq': sample_freq, 'created': time.time()}).encode('utf-8')
+        self.fid = open(fname, 'wb')
+        self.fid.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self.thread = threading.Thread(target=self.writer_thread, daemon=True)
+        self.thread.start()
+
+    def write(self, counts, scale):
+        """
+        write(counts, scale) -- samples x channels int32 counts and the
+        T per count of every channel.
+        """
+        if self.error is not None:
+            raise IOError('Archive writer stopped: %s' % self.error)
+        if self.fill and not np.array_equal(scale, self.scale):
+            self.flush()
+        self.scale[:] = scale
+        pos = 0
+        while pos < len(counts):
+            take = min(len(counts) - pos, len(self.block) - self.fill)
+            self.block[self.fill:self.fill + take] = counts[pos:pos + take]
+            self.fill += take
+            pos += take
+            if self.fill == len(self.block):
+                self.flush()
+
+    def flush(self):
+        if self.fill:
+            self.q.put((self.first_sample, self.block[:self.fill].copy(), self.scale.copy()))
+            self.first_sample += self.fill
+            self.fill = 0
+
+    def close(self):
+        if self.thread is not None:
+            self.flush()
+            self.q.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def writer_thread(self):
+        index = []
+        try:
+            while True:
+                item = self.q.get()
+                if item is None:
+                    break
+                first_sample, counts, scale = item
+                data = encode_block(counts)
+                index.append((first_sample, len(counts), self.fid.tell()))
+                self.fid.write(_block_header.pack(BLOCK_MAGIC, first_sample, len(counts),
+                                                  self.n_channels, len(data)))
+                self.fid.write(data)
+                self.fid.write(scale.astype('<f8').tobytes())
+            index_offset = self.fid.tell()
+            for entry in index:
+                self.fid.write(_index_entry.pack(*entry))
+            self.fid.write(_footer.pack(index_offset, len(index), INDEX_MAGIC))
+        except Exception as err:
+            self.error = err
+            while self.q.get() is not None:
+                pass
+        finally:
+            self.fid.close()
+
+
+class ArchiveReader:
+
+    """
+    Reads an archive back: read(start, stop) for any sample range and
+    iter_blocks() to stream the whole file block by block.
+    """
+
+    def __init__(self, fname):
+        self.fid = open(fname, 'rb')
+        if self.fid.read(len(MAGIC)) != MAGIC:
+            raise IOError('%s is not a FieldLine archive' % fname)
+        length, = struct.unpack('<I', self.fid.read(4))
+        self.header = json.loads(self.fid.read(length).decode('utf-8'))
+        self.labels = self.header['labels']
+        self.sample_freq = self.header['sample_freq']
+        self.data_start = self.fid.tell()
+        self.index = self.read_index()
+        self.starts = np.array([entry[0] for entry in self.index], dtype=np.int64)
+        self.n_samples = self.index[-1][0] + self.index[-1][1] if self.index else 0
+
+    def close(self):
+        self.fid.close()
+
+    def read_index(self):
+        self.fid.seek(0, 2)
+        size = self.fid.tell()
+        if size >= self.data_start + _footer.size:
+            self.fid.seek(size - _footer.size)
+            index_offset, n_blocks, magic = _footer.unpack(self.fid.read(_footer.size))
+            if magic == INDEX_MAGIC:
+                self.fid.seek(index_offset)
+                data = self.fid.read(n_blocks * _index_entry.size)
+                return [_index_entry.unpack_from(data, i * _index_entry.size)
+                        for i in range(n_blocks)]
+        return self.scan_blocks(size)
+
+    def scan_blocks(self, size):
+        """Index of a file without one, up to the last complete block."""
+        index = []
+        offset = self.data_start
+        while offset + _block_header.size <= size:
+            self.fid.seek(offset)
+            magic, first_sample, n_samples, n_channels, length = \
+                _block_header.unpack(self.fid.read(_block_header.size))
+            end = offset + _block_header.size + length + 8 * n_channels
+            if magic != BLOCK_MAGIC or end > size:
+                break
+            index.append((first_sample, n_samples, offset))
+            offset = end
+        return index
+
+    def read_block(self, i):
+        """read_block(i) -- (first_sample, counts, scale) of block i."""
+        self.fid.seek(self.index[i][2])
+        magic, first_sample, n_samples, n_channels, length = \
+            _block_header.unpack(self.fid.read(_block_header.size))
+        counts = decode_block(self.fid.read(length), n_samples, n_channels)
+        scale = np.frombuffer(self.fid.read(8 * n_channels), dtype='<f8')
+        return first_sample, counts, scale
+
+    def iter_blocks(self, calibrated=False):
+        """Yield (first_sample, data) per block, counts or T if 'calibrated'."""
+        for i in range(len(self.index)):
+            first_sample, counts, scale = self.read_block(i)
+            yield first_sample, counts * scale if calibrated else counts
+
+    def read(self, start, stop, calibrated=False):
+        """read(start, stop) -- samples start to stop-1, counts or T."""
+        start, stop = max(start, 0), min(stop, self.n_samples)
+        dtype = np.float64 if calibrated else np.int32
+        out = np.zeros((max(stop - start, 0), len(self.labels)), dtype=dtype)
+        if stop <= start:
+            return out
+        first = max(np.searchsorted(self.starts, start, side='right') - 1, 0)
+        for i in range(first, len(self.index)):
+            if self.index[i][0] >= stop:
+                break
+            first_sample, counts, scale = self.read_block(i)
+            lo, hi = max(start, first_sample), min(stop, first_sample + len(counts))
+            block = counts[lo - first_sample:hi - first_sample]
+            out[lo - start:hi - start] = block * scale if calibrated else block
+        return out
@@ -0,0 +1,219 @@
+"""
+Channel map from (chassis, sensor, data_type) to a column of the data
+matrix, and the decoder that turns FieldLine samples into that matrix.
+"""
+
+import numpy as np
+
+DATA_TYPE_BZ = 28
+
+
+def channel_key(chassis, sensor, data_type=DATA_TYPE_BZ):
+    """Name the FieldLine API gives a channel in every sample."""
+    return '%02d:%02d:%s' % (chassis, sensor, data_type)
+
+
+def default_label(chassis, sensor, data_type=DATA_TYPE_BZ):
+    label = str(chassis) + '|' + str(sensor).zfill(2)
+    if data_type != DATA_TYPE_BZ:
+        label += ':' + str(data_type)
+    return label
+
+
+def read_layout(fname):
+    """
+    read_layout(fname) -- read a layout file with one channel per line:
+
+        chassis sensor [data_type [label]]
+
+    Fields are separated by white space or commas, '#' starts a comment.
+    Returns a list of (chassis, sensor, data_type, label) tuples.
+    """
+    channels = []
+    with open(fname, 'r') as fid:
+        for line_no, line in enumerate(fid, 1):
+            line = line.split('#', 1)[0].replace(',', ' ').split()
+            if not line:
+                continue
+            if len(line) < 2:
+                raise ValueError('%s:%i: expected "chassis sensor '
+                                 '[data_type [label]]"' % (fname, line_no))
+            chassis, sensor = int(line[0]), int(line[1])
+            data_type = int(line[2]) if len(line) > 2 else DATA_TYPE_BZ
+            label = line[3] if len(line) > 3 else default_label(chassis, sensor, data_type)
+            channels.append((chassis, sensor, data_type, label))
+    return channels
+
+
+class ChannelMap:
+
+    """
+    Ordered list of channels, each one a (chassis, sensor, data_type, label)
+    tuple, with index arrays precomputed for lookups by chassis.
+    """
+
+    def __init__(self, channels):
+        channels = [tuple(ch) for ch in channels]
+        if not channels:
+            raise ValueError('Channel map needs at least one channel')
+        self.chassis = np.array([ch[0] for ch in channels], dtype=int)
+        self.sensors = np.array([ch[1] for ch in channels], dtype=int)
+        self.data_types = np.array([ch[2] for ch in channels], dtype=int)
+        self.labels = [ch[3] for ch in channels]
+        self.keys = [channel_key(*ch[:3]) for ch in channels]
+        self.index = {ch[:3]: col for col, ch in enumerate(channels)}
+        if len(self.index) != len(channels):
+            raise ValueError('Channel map lists a channel twice')
+        self.chassis_ids = sorted(set(self.chassis.tolist()))
+        self.chassis_columns = {c: np.flatnonzero(self.chassis == c)
+                                for c in self.chassis_ids}
+
+    @classmethod
+    def from_config(cls, working_chassis, working_sensors,
+                    data_types=(DATA_TYPE_BZ,)):
+        channels = []
+        for data_type in data_types:
+            for chassis in working_chassis:
+                for sensor in working_sensors[chassis]:
+                    channels.append((chassis, sensor, data_type,
+                                     default_label(chassis, sensor, data_type)))
+        return cls(channels)
+
+    @classmethod
+    def from_layout(cls, fname):
+        return cls(read_layout(fname))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def channels(self):
+        return list(zip(self.chassis.tolist(), self.sensors.tolist(),
+                        self.data_types.tolist(), self.labels))
+
+    def subset(self, picks):
+        channels = self.channels()
+        return ChannelMap([channels[col] for col in picks])
+
+    def data_type_picks(self, data_types):
+        """Columns of the channels of the given data types."""
+        return np.flatnonzero(np.isin(self.data_types, list(data_types)))
+
+    def column(self, chassis, sensor, data_type=DATA_TYPE_BZ):
+        return self.index[(chassis, sensor, data_type)]
+
+    def picks(self, chassis_list=None):
+        """Columns of the channels on the given chassis (all if None)."""
+        if chassis_list is None:
+            return np.arange(len(self))
+        return np.flatnonzero(np.isin(self.chassis, list(chassis_list)))
+
+    def sensors_by_chassis(self):
+        """{chassis: tuple of sensors}, each sensor listed once."""
+        sensors = {}
+        for chassis in self.chassis_ids:
+            cols = self.chassis_columns[chassis]
+            sensors[chassis] = tuple(dict.fromkeys(self.sensors[cols].tolist()))
+        return sensors
+
+    def num_sensors(self):
+        return sum(len(s) for s in self.sensors_by_chassis().values())
+
+
+class ChannelDecoder:
+
+    """
+    Fills the raw count matrix from a list of FieldLine samples, one chassis
+    at a time, each with its own precomputed keys and columns. The samples
+    are Python dicts, so decoding holds the GIL: threads would not make it
+    any faster, and it is done on the calling thread.
+
+    Channels missing from a sample (e.g. a chassis that dropped out) are
+    left at 0 and counted in 'missing'.
+    """
+
+    def __init__(self, channel_map):
+        self.channel_map = channel_map
+        self.parts = []
+        for chassis in channel_map.chassis_ids:
+            cols = channel_map.chassis_columns[chassis]
+            keys = [channel_map.keys[c] for c in cols]
+            if np.all(np.diff(cols) == 1):
+                cols = slice(cols[0], cols[-1] + 1)
+            self.parts.append((keys, cols))
+        self.missing = 0
+        self.cal = np.ones(len(channel_map))
+
+    def decode(self, samples, raw=None):
+        """
+        decode(samples [, raw]) -- raw counts, samples x channels (int32).
+        """
+        if raw is None:
+            raw = np.zeros((len(samples), len(self.channel_map)), dtype=np.int32)
+        self.missing += sum(self._decode_part(part, samples, raw) for part in self.parts)
+        return raw
+
+    def decode_present(self, samples):
+        """
+        decode_present(samples) -- like decode(), for channels streamed at a
+        lower rate than the samples: only samples that carry the channels
+        become rows. Returns the raw counts and the samples used.
+        """
+        first_key = self.channel_map.keys[0]
+        samples = [sample for sample in samples if first_key in sample]
+        return self.decode(samples), samples
+
+    def _decode_part(self, part, samples, raw):
+        """Fill the columns of one chassis, returning the channels missing."""
+        keys, cols = part
+        missing = 0
+        for sample_i, sample in enumerate(samples):
+            try:
+                raw[sample_i, cols] = [sample[key]['data'] for key in keys]
+            except KeyError:
+                missing += sum(key not in sample for key in keys)
+                raw[sample_i, cols] = [sample[key]['data'] if key in sample else 0
+                                       for key in keys]
+        return missing
+
+    def calibration(self, sample):
+        """
+        Calibration of every channel (counts to T) as of 'sample'. Channels
+        missing from it keep the last calibration seen.
+        """
+        for keys, cols in self.parts:
+            try:
+                self.cal[cols] = [sample[key]['calibration'] for key in keys]
+            except KeyError:
+                cal = self.cal[cols]
+                for i, key in enumerate(keys):
+                    if key in sample:
+                        cal[i] = sample[key]['calibration']
+                self.cal[cols] = cal
+        return self.cal
+
+
+class LowRateStream:
+
+    """
+    Channels streamed below the main rate, decoded from the same samples
+    and written to a sink of their own at their own rate.
+    """
+
+    def __init__(self, channel_map, sample_freq, sink):
+        self.channel_map = channel_map
+        self.decoder = ChannelDecoder(channel_map)
+        self.sample_freq = sample_freq
+        self.sink = sink
+
+    def open(self):
+        self.sink.open(self.channel_map.labels, self.sample_freq)
+
+    def process(self, samples, multiplier=1):
+        raw, samples = self.decoder.decode_present(samples)
+        if not samples:
+            return
+        scale = self.decoder.calibration(samples[0]) * multiplier
+        self.sink.write(np.multiply(raw, scale, dtype=np.float32))
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,78 @@
+"""
+Fixed pool of page-aligned chunk buffers. A chunk is owned by whoever
+acquired it until it is released: the decoder fills one while the writer
+still sends the previous one, and nothing is allocated once the pool
+exists.
+"""
+
+import mmap
+import queue
+
+import numpy as np
+
+
+def aligned_empty(shape, dtype, alignment=mmap.PAGESIZE):
+    """Uninitialised array whose data starts on an 'alignment' boundary."""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    raw = np.empty(nbytes + alignment, dtype=np.uint8)
+    offset = -raw.ctypes.data % alignment
+    return raw[offset:offset + nbytes].view(dtype).reshape(shape)
+
+
+class Chunk:
+
+    """
+    One pool buffer; 'data' is the view of its first n samples and
+    'first_sample' the acquisition index of data[0].
+    """
+
+    def __init__(self, pool, buffer):
+        self.pool = pool
+        self.buffer = buffer
+        self.data = buffer[:0]
+        self.first_sample = 0
+
+    def release(self):
+        self.pool.release(self)
+
+
+class ChunkPool:
+
+    """
+    ChunkPool(n_chunks, max_samples, n_channels [, dtype]) -- n_chunks
+    buffers of max_samples x n_channels. acquire() blocks while all of them
+    are in use, which holds the decoder back to the writer's pace.
+    """
+
+    def __init__(self, n_chunks, max_samples, n_channels, dtype=np.float32):
+        self.max_samples = max_samples
+        self.n_channels = n_channels
+        self.chunks = [Chunk(self, aligned_empty((max_samples, n_channels), dtype))
+                       for _ in range(n_chunks)]
+        self.free = queue.Queue()
+        for chunk in self.chunks:
+            self.free.put(chunk)
+        self.waits = 0
+
+    def acquire(self, n_samples, timeout=None):
+        """
+        acquire(n_samples [, timeout]) -- take a free chunk sized to
+        n_samples. Raises queue.Empty if none frees up within 'timeout'.
+        """
+        if n_samples > self.max_samples:
+            raise ValueError('Chunk of %i samples is larger than the pool\'s %i'
+                             % (n_samples, self.max_samples))
+        try:
+            chunk = self.free.get_nowait()
+        except queue.Empty:
+            self.waits += 1
+            chunk = self.free.get(timeout=timeout)
+        chunk.data = chunk.buffer[:n_samples]
+        return chunk
+
+    def release(self, chunk):
+        self.free.put(chunk)
+
+    def num_free(self):
+        return self.free.qsize()
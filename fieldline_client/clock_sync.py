@@ -0,0 +1,204 @@
+"""
+Relation between the chassis timestamp clocks and the host monotonic clock,
+and the acquisition latency that follows from it.
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class ClockSync:
+
+    """
+    Online fit of host = offset + slope * (timestamp - origin) for one
+    chassis clock, from (timestamp, arrival time) pairs.
+
+    Every packet arrives late by some transport delay, so the points lie on
+    or above the true line. The fit follows their lower envelope: the slope
+    comes from a least squares fit to the earliest point of each of 'bins'
+    stretches of the last 'window' packets, refitted every 'refit_every'
+    packets, and the offset is moved so no point lies below the line.
+    Latencies are measured from that envelope, so they leave out the
+    smallest transport delay, which one-way timestamps cannot show.
+    """
+
+    def __init__(self, window=2000, bins=8, refit_every=50):
+        self.lock = threading.Lock()
+        self.points = collections.deque(maxlen=window)
+        self.bins = bins
+        self.refit_every = refit_every
+        self.origin = None
+        self.slope = None
+        self.offset = None
+        self.n_updates = 0
+
+    def reset(self):
+        with self.lock:
+            self.points.clear()
+            self.origin = self.slope = self.offset = None
+            self.n_updates = 0
+
+    def update(self, timestamp, t=None, nominal_slope=None):
+        """
+        update(timestamp [, t, nominal_slope]) -- add the packet whose last
+        sample has 'timestamp' and arrived at host time 't' (default now).
+        'nominal_slope' (host seconds per timestamp tick) seeds the fit.
+        Returns the arrival latency in seconds above the envelope.
+        """
+        if t is None:
+            t = time.monotonic()
+        with self.lock:
+            if self.origin is None:
+                self.origin = timestamp
+            x = timestamp - self.origin
+            self.points.append((x, t))
+            self.n_updates += 1
+            if self.slope is None:
+                if nominal_slope is None:
+                    return 0.
+                self.slope = nominal_slope
+                self.offset = t - nominal_slope * x
+            elif self.n_updates % self.refit_every == 0:
+                self._refit()
+            residual = t - (self.offset + self.slope * x)
+            if residual < 0:
+                self.offset += residual
+                residual = 0.
+            return residual
+
+    def _refit(self):
+        points = np.array(self.points)
+        if len(points) < 2 * self.bins:
+            return
+        x, y = points[:, 0], points[:, 1]
+        residual = y - self.slope * x
+        lows = [part[np.argmin(residual[part])]
+                for part in np.array_split(np.arange(len(x)), self.bins)]
+        if np.ptp(x[lows]) <= 0:
+            return
+        slope, _ = np.polyfit(x[lows], y[lows], 1)
+        self.slope = slope
+        self.offset = np.min(y - slope * x)
+
+    def is_synced(self):
+        return self.slope is not None
+
+    def host_time(self, timestamp):
+        """Host monotonic time at which 'timestamp' was sampled."""
+        with self.lock:
+            if self.slope is None:
+                return None
+            return self.offset + self.slope * (timestamp - self.origin)
+
+    def timestamp_at(self, t):
+        with self.lock:
+            if self.slope is None:
+                return None
+            return self.origin + (t - self.offset) / self.slope
+
+
+class AcquisitionTimeline:
+
+    """
+    One ClockSync per chassis, the timestamp of the written samples and
+    the latency of every chunk, so sample indices map to host monotonic
+    time and back.
+    """
+
+    def __init__(self, channel_map, sample_freq, history=1000):
+        self.sample_freq = float(sample_freq)
+        self.keys = {chassis: channel_map.keys[cols[0]]
+                     for chassis, cols in channel_map.chassis_columns.items()}
+        self.reference = channel_map.chassis_ids[0]
+        self.syncs = {chassis: ClockSync() for chassis in self.keys}
+        self.lock = threading.Lock()
+        self.ticks_per_sample = None
+        self.anchor = None
+        self.arrival_latency = {chassis: collections.deque(maxlen=history)
+                                for chassis in self.keys}
+        self.write_latency = collections.deque(maxlen=history)
+
+    def reset(self):
+        """Forget everything, e.g. before a measurement with a new device clock."""
+        for sync in self.syncs.values():
+            sync.reset()
+        with self.lock:
+            self.ticks_per_sample = None
+            self.anchor = None
+            for latencies in self.arrival_latency.values():
+                latencies.clear()
+            self.write_latency.clear()
+
+    def update(self, samples, first_sample, t=None):
+        """
+        update(samples, first_sample [, t]) -- add a packet arriving at 't'
+        whose samples get indices from 'first_sample' on.
+        """
+        if t is None:
+            t = time.monotonic()
+        ref_key = self.keys[self.reference]
+        if self.ticks_per_sample is None and len(samples) > 1 and ref_key in samples[0] \
+                and ref_key in samples[-1]:
+            ticks = samples[-1][ref_key]['timestamp'] - samples[0][ref_key]['timestamp']
+            if ticks > 0:
+                self.ticks_per_sample = ticks / (len(samples) - 1)
+        nominal_slope = None
+        if self.ticks_per_sample is not None:
+            nominal_slope = 1. / (self.sample_freq * self.ticks_per_sample)
+        for chassis, key in self.keys.items():
+            if key not in samples[-1]:
+                continue
+            latency = self.syncs[chassis].update(samples[-1][key]['timestamp'], t, nominal_slope)
+            with self.lock:
+                self.arrival_latency[chassis].append(latency)
+        if ref_key in samples[-1] and self.ticks_per_sample is not None:
+            with self.lock:
+                # latest sample index with its reference chassis timestamp
+                self.anchor = (first_sample + len(samples) - 1,
+                               samples[-1][ref_key]['timestamp'])
+
+    def host_time_at(self, sample, chassis=None):
+        """Host monotonic time at which sample index 'sample' was acquired."""
+        with self.lock:
+            anchor = self.anchor
+        if anchor is None:
+            return None
+        timestamp = anchor[1] + (sample - anchor[0]) * self.ticks_per_sample
+        return self.syncs[self.reference if chassis is None else chassis].host_time(timestamp)
+
+    def sample_at(self, t, chassis=None):
+        """Sample index acquired at host monotonic time 't'."""
+        with self.lock:
+            anchor = self.anchor
+        if anchor is None:
+            return None
+        timestamp = self.syncs[self.reference if chassis is None else chassis].timestamp_at(t)
+        return int(round(anchor[0] + (timestamp - anchor[1]) / self.ticks_per_sample))
+
+    def chunk_written(self, last_sample, t=None):
+        """Record when the chunk ending at 'last_sample' reached the buffer."""
+        if t is None:
+            t = time.monotonic()
+        acquired = self.host_time_at(last_sample)
+        if acquired is None:
+            return None
+        latency = t - acquired
+        with self.lock:
+            self.write_latency.append(latency)
+        return latency
+
+    def latency_stats(self):
+        """{name: (median, 95th percentile, max)} in seconds."""
+        stats = {}
+        with self.lock:
+            series = [('write', list(self.write_latency))]
+            series += [('arrival %s' % chassis, list(latencies))
+                       for chassis, latencies in self.arrival_latency.items()]
+        for name, latencies in series:
+            values = np.array(latencies)
+            if len(values):
+                stats[name] = (np.median(values), np.percentile(values, 95), values.max())
+        return stats
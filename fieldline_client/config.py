@@ -4,10 +4,142 @@ working_chassis = [0, 1]
 broken_sensors = [(2, 6, 16),()]
 working_sensors = [(1, 3, 4, 5, 7, 8, 9, 10, 11, 12, 13, 14, 15),
                    (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14)]
+# Seconds to wait for every chassis to connect and report its sensors
+connect_timeout = 10.
+# Layout file listing "chassis sensor [data_type [label]]" per line. When
+# given it replaces working_chassis/working_sensors for any number of chassis.
+layout_file = None
+# Data types streamed from every sensor, with their rate in Hz. Types at the
+# main rate (1000 Hz) are packed into the main buffer; every lower rate goes
+# to its own buffer, on the port given in low_rate_ports.
+# e.g. data_types = {28: 1000, 35: 1000, 0: 250}, low_rate_ports = {250: 1976}
+data_types = {28: 1000}
+low_rate_ports = {}
+# Chunk buffers cycling between decoding and sending, and the most samples
+# one of them holds (longer packets are split)
+chunk_pool_size = 3
+chunk_max_samples = 100
+# Seconds the acquisition waits for a free chunk buffer before dropping the
+# packet (only when the writer thread is stuck)
+chunk_acquire_timeout = 2.
+# Linux only: run the acquisition and writer threads (and the phantom's) with
+# realtime_policy ('fifo' or 'rr') at realtime_priority, pinned to
+# realtime_cpus (e.g. {2, 3}; None leaves them anywhere), with the chunk
+# buffers pre-faulted and, with realtime_lock_memory, all memory locked.
+# Needs CAP_SYS_NICE / CAP_IPC_LOCK; see realtime.py.
+realtime_enabled = False
+realtime_policy = 'fifo'
+realtime_priority = 50
+realtime_cpus = None
+realtime_lock_memory = True
+# A chassis sending nothing for watchdog_stall_timeout seconds is stalled:
+# an event is put in the buffer, its channels are NaN, and the stream is
+# restarted, then the chassis reconnected, then its sensors tuned again,
+# waiting watchdog_recovery_timeout seconds after each step.
+watchdog_enabled = True
+watchdog_stall_timeout = 2.
+watchdog_recovery_timeout = 10.
+watchdog_tune_timeout = 30.
 
 #### FIELDTRIP BUFFER SETTINGS
 ft_IP = 'localhost'
 ft_port = 1972
+# Wait for the buffer to acknowledge every putData
+ft_put_response = True
+# Long reads of the buffer (read_history) go over this many connections of
+# their own, history_block_samples samples per request
+history_connections = 4
+history_block_samples = 20000
 
 #### DEBUG SETTINGS
-use_phantom = False
\ No newline at end of file
+# The phantom device makes up the working sensors and their data
+use_phantom = False
+phantom_packet_size = 10
+# Phantom data comes this many times faster than real time (soak.py)
+phantom_speed = 1.
+
+#### DIAGNOSTICS SETTINGS
+# Thread dump, sampled profile and tracemalloc snapshot of the running
+# client, written to diagnostics_dir on diagnostics_signal (None to not
+# install the handler) or the 'diag' command. The profile samples every
+# diagnostics_interval seconds for diagnostics_duration seconds.
+diagnostics_dir = '.'
+diagnostics_signal = 'SIGUSR1'
+diagnostics_duration = 5.
+diagnostics_interval = .005
+
+#### LOG SETTINGS
+# Chassis and sensor events go through a queue to the console and, if
+# log_file is set, to a rotating file. Repeated warnings from one sensor are
+# cut to log_rate_burst per log_rate_interval seconds.
+log_level = 'INFO'
+log_file = None
+log_file_max_bytes = 10 * 1024 * 1024
+log_file_backups = 5
+log_rate_interval = 1.
+log_rate_burst = 3
+
+#### RECORDING SETTINGS
+# Raw FIF file (e.g. 'subject_raw.fif') recorded from the acquired data,
+# written in buffers of fif_buffer_seconds and split into -1, -2, ... parts
+# at fif_split_size bytes. None disables it.
+fif_file = None
+fif_buffer_seconds = 1.
+fif_split_size = 2000000000
+# Lossless archive of the raw counts (see archive.py), compressed in blocks
+# of archive_block_seconds. None disables it.
+archive_file = None
+archive_block_seconds = 1.
+# Min/max/mean overview at these decimation factors, for browsing long
+# recordings. Written beside fif_file (or archive_file) when one is set.
+# Without a recording it is kept in memory, for the last
+# overview_memory_seconds only (about 80 MB per 100 channels at 600 s).
+overview_enabled = False
+overview_factors = (10, 100, 1000)
+overview_memory_seconds = 600.
+
+#### LIVE STREAM SETTINGS
+# WebSocket port serving the processed data to remote viewers, each with
+# its own channels and decimation (see livestream.py). None disables it.
+# A viewer that falls behind by livestream_max_frames frames loses frames.
+# There is no authentication: the server only listens on livestream_host,
+# so set it to '0.0.0.0' to let other machines (of a trusted network) in.
+livestream_port = None
+livestream_host = '127.0.0.1'
+livestream_max_frames = 8
+
+#### FILTER SETTINGS
+# Filtered copy of the data, either in a second FieldTrip buffer ('sink')
+# or as extra channels of the main buffer ('append').
+filter_enabled = False
+filter_output = 'sink'
+filter_ft_port = 1973
+# One entry per channel group. 'chassis' None means every working chassis.
+filter_groups = [{'chassis': None, 'band': (1., 100.), 'notch': (60., 120.)}]
+
+#### DECIMATION SETTINGS
+# Extra FieldTrip buffers at integer-divided rates, as (factor, port) pairs,
+# e.g. [(4, 1974)] for a 250 Hz copy on port 1974. The anti-alias filter
+# is flat up to 0.8 of the new Nyquist frequency (100 Hz at 250 Hz) and
+# down 60 dB at the new Nyquist frequency.
+decimated_buffers = []
+
+#### PROJECTION SETTINGS
+# Projector file (.npy, .npz or text) with an outputs x channels matrix,
+# applied to every chunk before the other stages. None disables it.
+projector_file = None
+projector_output = 'replace'
+projector_ft_port = 1975
+
+#### QUALITY MONITOR SETTINGS
+# Thresholds in T (std, peak and line power in T and T^2), None disables one.
+monitor_enabled = False
+monitor_interval = 0.25
+monitor_line_freq = 60.
+monitor_flat_std = 1e-15
+monitor_saturation = None
+monitor_noise_std = None
+monitor_drift_rate = None
+monitor_line_power = None
+# Put a FieldTrip event in the buffer whenever a channel changes status
+monitor_events = False
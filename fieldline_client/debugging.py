@@ -14,7 +14,7 @@ for chassis in working_chassis:
                 print(label)
                 channel_names.append(label)
                 
-num_working_sensors = len(working_sensors[0]) + len(working_sensors[1])
+num_working_sensors = sum(len(working_sensors[chassis]) for chassis in working_chassis)
 
 
 import numpy as np
@@ -0,0 +1,110 @@
+"""
+Streaming decimation for consumers that need a lower sample rate.
+"""
+
+import numpy as np
+
+from .pipeline import Stage, OUTPUT_SINK
+
+
+def design_lowpass_fir(numtaps, cutoff, sample_freq, beta=None):
+    """
+    design_lowpass_fir(numtaps, cutoff, sample_freq [, beta]) -- windowed
+    sinc low-pass with unit gain at DC, -6 dB at 'cutoff'. The window is
+    Hamming, or Kaiser with 'beta' if given.
+    """
+    if not 0 < cutoff < sample_freq / 2.:
+        raise ValueError('Cutoff must be between 0 and Nyquist')
+    n = np.arange(numtaps) - (numtaps - 1) / 2.
+    window = np.hamming(numtaps) if beta is None else np.kaiser(numtaps, beta)
+    taps = np.sinc(2. * cutoff / sample_freq * n) * window
+    return taps / taps.sum()
+
+
+def kaiser_design(transition, sample_freq, attenuation):
+    """
+    kaiser_design(transition, sample_freq, attenuation) -- (numtaps, beta)
+    of a Kaiser-window low-pass with a 'transition' Hz wide transition band
+    and 'attenuation' dB in the stop band (Kaiser's estimates).
+    """
+    if attenuation > 50.:
+        beta = 0.1102 * (attenuation - 8.7)
+    elif attenuation > 21.:
+        beta = 0.5842 * (attenuation - 21.) ** 0.4 + 0.07886 * (attenuation - 21.)
+    else:
+        beta = 0.
+    numtaps = int(np.ceil((attenuation - 7.95) / (14.36 * transition / sample_freq))) + 1
+    return numtaps | 1, beta
+
+
+class FIRDecimator:
+
+    """
+    FIRDecimator(factor, n_channels [, passband, attenuation, numtaps]) --
+    anti-alias FIR followed by down-sampling by an integer factor.
+
+    The filter is flat (within 0.02 dB) up to 'passband' times the output
+    Nyquist frequency and attenuates by 'attenuation' dB (Kaiser's
+    estimate, within a dB) from the output Nyquist frequency on, so nothing
+    aliases into the pass band.
+    Fixing 'numtaps' instead trades that attenuation for speed.
+
+    Only the output samples that are kept get computed, each as a direct
+    dot product of the taps with the input samples gathered for it (the
+    same work as a polyphase filter, without splitting the taps into
+    phases). The filter history and the decimation phase carry over
+    between chunks, so any chunk length can be fed.
+    """
+
+    def __init__(self, factor, n_channels, passband=0.8, attenuation=60., numtaps=None):
+        if factor < 1:
+            raise ValueError('Decimation factor must be >= 1')
+        if not 0 < passband < 1:
+            raise ValueError('Pass band must be between 0 and the output Nyquist frequency')
+        self.factor = int(factor)
+        # frequencies relative to the input Nyquist frequency (sample_freq 2)
+        stopband = 1. / self.factor
+        passband = passband * stopband
+        design_numtaps, beta = kaiser_design(stopband - passband, 2., attenuation)
+        if numtaps is None:
+            numtaps = design_numtaps
+        self.numtaps = numtaps
+        if self.factor > 1:
+            self.taps = design_lowpass_fir(numtaps, (passband + stopband) / 2., 2., beta)
+        else:
+            self.taps = np.ones(1)
+        self.history = np.zeros((numtaps - 1, n_channels))
+        self.offset = 0
+        self.tap_index = np.arange(numtaps)
+
+    def process(self, chunk):
+        n_samples = len(chunk)
+        positions = np.arange(self.offset, n_samples, self.factor)
+        self.offset = (self.offset - n_samples) % self.factor
+        data = np.concatenate((self.history, chunk))
+        self.history = data[len(data) - (self.numtaps - 1):]
+        if self.factor == 1:
+            return np.asarray(chunk, dtype=np.float32)
+        # data[p + numtaps - 1 - k] is input sample p - k
+        gather = positions[:, np.newaxis] + (self.numtaps - 1) - self.tap_index
+        return np.einsum('k,okc->oc', self.taps, data[gather]).astype(np.float32)
+
+
+class DecimationStage(Stage):
+
+    """Writes the chunks decimated by 'factor' to a sink of their own."""
+
+    def __init__(self, factor, sink, numtaps=None):
+        super().__init__(OUTPUT_SINK, sink)
+        self.factor = factor
+        self.numtaps = numtaps
+        self.decimator = None
+
+    def setup(self):
+        self.decimator = FIRDecimator(self.factor, len(self.labels), numtaps=self.numtaps)
+
+    def result_sample_freq(self):
+        return self.sample_freq / self.factor
+
+    def transform(self, chunk):
+        return self.decimator.process(chunk)
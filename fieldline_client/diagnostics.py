@@ -0,0 +1,180 @@
+"""
+On-demand diagnostics of a running client, with nothing running until
+they are asked for (SIGUSR1 or the 'diag' console command):
+
+    <prefix>-threads.txt  -- every thread with its stack, and queue depths
+    <prefix>-profile.txt  -- sampled stacks of all threads, one line per
+                             stack and thread with its count (the folded
+                             format of flamegraph.pl)
+    <prefix>-memory.txt   -- top allocating lines from tracemalloc, and the
+                             growth since the previous snapshot if it has
+                             been tracing all along (PYTHONTRACEMALLOC=10)
+
+where prefix is fieldline-diag-YYYYmmdd-HHMMSS in the diagnostics directory.
+"""
+
+import collections
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+log = logging.getLogger('fieldline_client.diagnostics')
+
+
+def thread_names():
+    return {thread.ident: thread for thread in threading.enumerate()}
+
+
+def format_threads(queue_depths=None):
+    """Every thread's state and stack, then the queue depths {name: depth}."""
+    threads = thread_names()
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        thread = threads.get(ident)
+        if thread is None:
+            lines.append('Thread %i (not from threading)' % ident)
+        else:
+            lines.append('Thread %s (ident %i, native %s%s)'
+                         % (thread.name, ident, thread.native_id,
+                            ', daemon' if thread.daemon else ''))
+        lines.extend(line.rstrip() for line in traceback.format_stack(frame))
+        lines.append('')
+    if queue_depths:
+        lines.append('Queue depths:')
+        for name, depth in sorted(queue_depths.items()):
+            lines.append('\t%s\t%s' % (name, depth))
+    return '\n'.join(lines) + '\n'
+
+
+class StackSampler:
+
+    """
+    StackSampler([interval]) -- sample the stacks of all other threads
+    every 'interval' seconds, counting identical stacks per thread.
+    """
+
+    def __init__(self, interval=.005):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.samples = 0
+
+    def sample(self):
+        me = threading.get_ident()
+        threads = thread_names()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s (%s:%i)' % (code.co_name, os.path.basename(code.co_filename),
+                                             frame.f_lineno))
+                frame = frame.f_back
+            thread = threads.get(ident)
+            stack.append(thread.name if thread is not None else str(ident))
+            self.counts[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, duration):
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            self.sample()
+            time.sleep(self.interval)
+
+    def format(self):
+        lines = ['%s %i' % (stack, count) for stack, count in self.counts.most_common()]
+        return '\n'.join(lines) + '\n'
+
+
+class Diagnostics:
+
+    """
+    Diagnostics([directory, duration, interval, queue_depths]) -- trigger()
+    writes the files described above. The profile samples for 'duration'
+    seconds. If tracemalloc was not tracing, it is traced over the same
+    time only, so the memory file shows what was allocated meanwhile.
+    'queue_depths' is a callable returning {name: depth}.
+    """
+
+    def __init__(self, directory='.', duration=5., interval=.005, queue_depths=None):
+        self.directory = directory
+        self.duration = duration
+        self.interval = interval
+        self.queue_depths = queue_depths
+        self.lock = threading.Lock()
+        self.last_snapshot = None
+        self.thread = None
+
+    def trigger(self):
+        """
+        Start a run in the background, unless one is already going or being
+        started. Returns its prefix, or None if no run was started.
+        """
+        # never waits: the signal handler runs this on the main thread, which
+        # may be inside trigger() already, holding the lock
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            if self.thread is not None and self.thread.is_alive():
+                return None
+            prefix = os.path.join(self.directory,
+                                  time.strftime('fieldline-diag-%Y%m%d-%H%M%S'))
+            self.thread = threading.Thread(target=self.run, args=(prefix,),
+                                           name='diagnostics', daemon=True)
+            self.thread.start()
+        finally:
+            self.lock.release()
+        return prefix
+
+    def run(self, prefix):
+        try:
+            depths = self.queue_depths() if self.queue_depths is not None else None
+            with open(prefix + '-threads.txt', 'w') as fid:
+                fid.write(format_threads(depths))
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(10)
+            sampler = StackSampler(self.interval)
+            sampler.run(self.duration)
+            with open(prefix + '-profile.txt', 'w') as fid:
+                fid.write(sampler.format())
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            with open(prefix + '-memory.txt', 'w') as fid:
+                # only snapshots of one continuous trace can be compared
+                fid.write(self.format_memory(snapshot, not started_tracing))
+            log.warning("Diagnostics written to %s-*.txt (%i stack samples)",
+                        prefix, sampler.samples)
+        except Exception as err:
+            log.error("Diagnostics failed: %s", err)
+
+    def format_memory(self, snapshot, compare=False, top=30):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')))
+        lines = ['Top %i allocating lines:' % top]
+        lines.extend(str(stat) for stat in snapshot.statistics('lineno')[:top])
+        if compare and self.last_snapshot is not None:
+            lines.append('')
+            lines.append('Growth since the previous snapshot:')
+            lines.extend(str(stat) for stat in
+                         snapshot.compare_to(self.last_snapshot, 'lineno')[:top])
+        self.last_snapshot = snapshot if compare else None
+        return '\n'.join(lines) + '\n'
+
+    def install_signal(self, name='SIGUSR1'):
+        """
+        Run the diagnostics on signal 'name'. Only the main thread can do
+        this; returns False where it cannot (or the signal does not exist).
+        """
+        signum = getattr(signal, name, None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda signum, frame: self.trigger())
+        return True
@@ -0,0 +1,213 @@
+"""
+Online epoching and evoked averages from a FieldTrip buffer.
+
+An EpochingService follows the buffer with wait(), fetching only the new
+samples into a local ring window and only the new events. Once the whole
+post-stimulus interval of an event is in the window, its epoch is cut out
+and added to the running mean and variance of its condition.
+
+    python -m fieldline_client.epoching --type stim --tmin -0.1 --tmax 0.5
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from .FieldTrip import Client
+
+# events the client itself puts in the buffer, which are no stimuli
+INTERNAL_EVENT_TYPES = ('quality', 'fieldline_stall', 'fieldline_gap', 'fieldline_recovered')
+
+
+class EvokedAverage:
+
+    """Running mean and variance of epochs (times x channels), Welford's method."""
+
+    def __init__(self, n_times, n_channels):
+        self.count = 0
+        self.mean = np.zeros((n_times, n_channels))
+        self.m2 = np.zeros((n_times, n_channels))
+
+    def add(self, epoch):
+        self.count += 1
+        delta = epoch - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (epoch - self.mean)
+
+    def variance(self):
+        if self.count < 2:
+            return np.zeros_like(self.m2)
+        return self.m2 / (self.count - 1)
+
+    def snapshot(self):
+        return {'count': self.count, 'mean': self.mean.copy(), 'variance': self.variance()}
+
+
+def event_condition(event):
+    """Condition name of an event: its value, as a string."""
+    value = event.value
+    if isinstance(value, np.ndarray):
+        value = value[0] if value.size == 1 else ','.join(str(v) for v in value)
+    return str(value)
+
+
+class EpochingService:
+
+    """
+    EpochingService(hostname, port, tmin, tmax [, event_type, baseline,
+    window, timeout, exclude_types]) -- average the epochs tmin to tmax (s)
+    around every event of type 'event_type' (any type but 'exclude_types'
+    if None), one average per event value. 'baseline' (start, stop) in s is
+    subtracted per epoch and channel. 'window' is the length in s of the
+    local ring of samples. Epochs no longer in the ring, or with NaN
+    samples (e.g. across a gap in the stream), are counted in 'dropped'.
+
+    Callbacks in 'on_update' get (condition, snapshot) after every epoch;
+    get_evoked() returns the snapshots of all conditions.
+    """
+
+    def __init__(self, hostname='localhost', port=1972, tmin=-.1, tmax=.5, event_type=None,
+                 baseline=(None, 0.), window=10., timeout=200,
+                 exclude_types=INTERNAL_EVENT_TYPES):
+        self.hostname = hostname
+        self.port = port
+        self.tmin = tmin
+        self.tmax = tmax
+        self.event_type = event_type
+        self.exclude_types = tuple(exclude_types)
+        self.baseline = baseline
+        self.window = window
+        self.timeout = timeout
+        self.on_update = []
+        self.lock = threading.Lock()
+        self.averages = {}
+        self.dropped = 0
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.reader_thread, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def get_evoked(self):
+        with self.lock:
+            return {condition: average.snapshot()
+                    for condition, average in self.averages.items()}
+
+    def reset(self, header):
+        fs = header.fSample
+        self.first = int(round(self.tmin * fs))
+        self.n_times = int(round(self.tmax * fs)) - self.first + 1
+        self.ring = np.zeros((max(int(self.window * fs), self.n_times + 1),
+                              header.nChannels), dtype=np.float32)
+        self.baseline_slice = None
+        if self.baseline is not None:
+            start = self.tmin if self.baseline[0] is None else self.baseline[0]
+            stop = self.tmax if self.baseline[1] is None else self.baseline[1]
+            self.baseline_slice = slice(int(round(start * fs)) - self.first,
+                                        int(round(stop * fs)) - self.first + 1)
+        self.n_samples = header.nSamples
+        self.n_events = header.nEvents
+        self.pending = []
+        with self.lock:
+            self.averages = {}
+
+    def reader_thread(self):
+        client = Client()
+        client.connect(self.hostname, self.port)
+        try:
+            self.reset(client.getHeader())
+            while self.running.is_set():
+                n_samples, n_events = client.wait(self.n_samples, self.n_events, self.timeout)
+                if n_samples < self.n_samples or n_events < self.n_events:
+                    # the header was written again
+                    self.reset(client.getHeader())
+                    continue
+                if n_events > self.n_events:
+                    self.add_events(client.getEvents([self.n_events, n_events - 1]))
+                    self.n_events = n_events
+                if n_samples > self.n_samples:
+                    self.add_samples(client, n_samples)
+                self.cut_epochs()
+        finally:
+            client.disconnect()
+
+    def add_events(self, events):
+        for event in events:
+            if self.event_type is not None:
+                if event.type != self.event_type:
+                    continue
+            elif isinstance(event.type, str) and event.type in self.exclude_types:
+                continue
+            self.pending.append((event.sample, event_condition(event)))
+        self.pending.sort()
+
+    def add_samples(self, client, n_samples):
+        # anything older than the ring is not needed any more
+        start = max(self.n_samples, n_samples - len(self.ring))
+        data = client.getData([start, n_samples - 1])
+        if data is not None:
+            idx = np.arange(start, n_samples) % len(self.ring)
+            self.ring[idx] = data
+        self.n_samples = n_samples
+
+    def cut_epochs(self):
+        while self.pending:
+            sample, condition = self.pending[0]
+            start = sample + self.first
+            stop = start + self.n_times
+            if stop > self.n_samples:
+                break
+            self.pending.pop(0)
+            if start < 0 or start < self.n_samples - len(self.ring):
+                self.dropped += 1
+                continue
+            epoch = self.ring[np.arange(start, stop) % len(self.ring)].astype(np.float64)
+            if not np.isfinite(epoch).all():
+                # one NaN would spoil the average for good
+                self.dropped += 1
+                continue
+            if self.baseline_slice is not None:
+                epoch -= epoch[self.baseline_slice].mean(axis=0)
+            with self.lock:
+                if condition not in self.averages:
+                    self.averages[condition] = EvokedAverage(self.n_times, epoch.shape[1])
+                self.averages[condition].add(epoch)
+                snapshot = self.averages[condition].snapshot() if self.on_update else None
+            for callback in self.on_update:
+                callback(condition, snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1972)
+    parser.add_argument('--type', default=None, help='event type to epoch on')
+    parser.add_argument('--tmin', type=float, default=-.1)
+    parser.add_argument('--tmax', type=float, default=.5)
+    args = parser.parse_args()
+
+    service = EpochingService(args.host, args.port, args.tmin, args.tmax, args.type)
+    service.start()
+    try:
+        while True:
+            time.sleep(1.)
+            for condition, evoked in sorted(service.get_evoked().items()):
+                rms = np.sqrt((evoked['mean'] ** 2).mean(axis=1))
+                print('%s: %i epochs, peak RMS %.3g at sample %i'
+                      % (condition, evoked['count'], rms.max(), rms.argmax() + service.first))
+    except KeyboardInterrupt:
+        service.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Raw FIF files written as the data comes in, readable by MNE-Python
+(mne.io.read_raw_fif) without converting anything afterwards. The tags are
+written by hand, so MNE is not needed to record.
+"""
+
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from .channel_map import DATA_TYPE_BZ
+
+# FIF constants, as in mne.io.constants.FIFF
+FIFF_FILE_ID = 100
+FIFF_DIR_POINTER = 101
+FIFF_BLOCK_ID = 103
+FIFF_BLOCK_START = 104
+FIFF_BLOCK_END = 105
+FIFF_FREE_LIST = 106
+FIFF_NOP = 108
+FIFF_NCHAN = 200
+FIFF_SFREQ = 201
+FIFF_CH_INFO = 203
+FIFF_MEAS_DATE = 204
+FIFF_FIRST_SAMPLE = 208
+FIFF_DATA_BUFFER = 300
+FIFF_REF_ROLE = 115
+FIFF_REF_FILE_NUM = 117
+FIFF_REF_FILE_NAME = 118
+
+FIFFB_MEAS = 100
+FIFFB_MEAS_INFO = 101
+FIFFB_RAW_DATA = 102
+FIFFB_REF = 118
+
+FIFFT_VOID = 0
+FIFFT_INT = 3
+FIFFT_FLOAT = 4
+FIFFT_STRING = 10
+FIFFT_CH_INFO_STRUCT = 30
+FIFFT_ID_STRUCT = 31
+
+FIFFV_NEXT_SEQ = 0
+FIFFV_NEXT_NONE = -1
+FIFFV_ROLE_PREV_FILE = 1
+FIFFV_ROLE_NEXT_FILE = 2
+FIFFC_VERSION = 65539
+
+FIFFV_MEG_CH = 1
+FIFFV_MISC_CH = 502
+FIFFV_COIL_NONE = 0
+FIFFV_COIL_FIELDLINE_OPM_MAG_GEN1 = 8101
+FIFF_UNIT_V = 107
+FIFF_UNIT_T = 112
+
+# FieldLine data types that are magnetic fields (BZ, BY, BX)
+MAGNETIC_DATA_TYPES = (DATA_TYPE_BZ, 35, 37)
+
+# room left at the end of a part for the tags that close it
+END_TAGS_SIZE = 1024
+
+
+def fif_channels(labels, channel_map=None):
+    """
+    fif_channels(labels [, channel_map]) -- (name, kind, coil_type, unit)
+    of every channel. Channels of the map that are not magnetic fields are
+    misc channels in V, everything else is an OPM magnetometer in T.
+    """
+    data_types = {}
+    if channel_map is not None:
+        data_types = dict(zip(channel_map.labels, channel_map.data_types.tolist()))
+    channels = []
+    for label in labels:
+        if data_types.get(label, DATA_TYPE_BZ) in MAGNETIC_DATA_TYPES:
+            channels.append((label, FIFFV_MEG_CH, FIFFV_COIL_FIELDLINE_OPM_MAG_GEN1, FIFF_UNIT_T))
+        else:
+            channels.append((label, FIFFV_MISC_CH, FIFFV_COIL_NONE, FIFF_UNIT_V))
+    return channels
+
+
+def part_name(fname, part):
+    """Name of split part 'part' of fname, e.g. rec_raw.fif, rec_raw-1.fif."""
+    if part == 0:
+        return fname
+    base, ext = os.path.splitext(fname)
+    return '%s-%i%s' % (base, part, ext)
+
+
+class FifWriter:
+
+    """
+    Writes raw FIF data buffers to fname, going on in rec_raw-1.fif,
+    rec_raw-2.fif, ... whenever a part would grow past 'split_size' bytes.
+    """
+
+    def __init__(self, fname, channels, sample_freq, split_size=2000000000):
+        self.fname = fname
+        self.channels = channels
+        self.sample_freq = float(sample_freq)
+        self.split_size = split_size
+        self.meas_date = time.time()
+        self.part = 0
+        self.first_sample = 0
+        self.fid = None
+        self.start_part()
+
+    def tag(self, kind, type, data, next=FIFFV_NEXT_SEQ):
+        self.fid.write(struct.pack('>iiii', kind, type, len(data), next))
+        self.fid.write(data)
+
+    def tag_int(self, kind, *values):
+        self.tag(kind, FIFFT_INT, struct.pack('>%ii' % len(values), *values))
+
+    def tag_id(self, kind):
+        secs = int(self.meas_date)
+        usecs = int((self.meas_date - secs) * 1e6)
+        self.tag(kind, FIFFT_ID_STRUCT, struct.pack('>iiiii', FIFFC_VERSION, 0, 0, secs, usecs))
+
+    def start_block(self, kind):
+        self.tag_int(FIFF_BLOCK_START, kind)
+
+    def end_block(self, kind):
+        self.tag_int(FIFF_BLOCK_END, kind)
+
+    def ref_block(self, role, part):
+        self.start_block(FIFFB_REF)
+        self.tag_int(FIFF_REF_ROLE, role)
+        name = os.path.basename(part_name(self.fname, part)).encode('utf-8')
+        self.tag(FIFF_REF_FILE_NAME, FIFFT_STRING, name)
+        self.tag_int(FIFF_REF_FILE_NUM, part)
+        self.end_block(FIFFB_REF)
+
+    def start_part(self):
+        self.fid = open(part_name(self.fname, self.part), 'wb')
+        self.tag_id(FIFF_FILE_ID)
+        self.tag_int(FIFF_DIR_POINTER, -1)
+        self.tag_int(FIFF_FREE_LIST, -1)
+        self.start_block(FIFFB_MEAS)
+        self.tag_id(FIFF_BLOCK_ID)
+        self.start_block(FIFFB_MEAS_INFO)
+        self.tag_int(FIFF_NCHAN, len(self.channels))
+        self.tag(FIFF_SFREQ, FIFFT_FLOAT, struct.pack('>f', self.sample_freq))
+        secs = int(self.meas_date)
+        self.tag_int(FIFF_MEAS_DATE, secs, int((self.meas_date - secs) * 1e6))
+        for i, (name, kind, coil_type, unit) in enumerate(self.channels):
+            self.tag(FIFF_CH_INFO, FIFFT_CH_INFO_STRUCT,
+                     struct.pack('>iiiffi12fii16s', i + 1, i + 1, kind, 1., 1., coil_type,
+                                 *([0.] * 12), unit, 0, name.encode('utf-8')[:15]))
+        self.end_block(FIFFB_MEAS_INFO)
+        self.start_block(FIFFB_RAW_DATA)
+        if self.first_sample != 0:
+            self.tag_int(FIFF_FIRST_SAMPLE, self.first_sample)
+        if self.part > 0:
+            self.ref_block(FIFFV_ROLE_PREV_FILE, self.part - 1)
+
+    def end_part(self, next_part=None):
+        if next_part is not None:
+            self.ref_block(FIFFV_ROLE_NEXT_FILE, next_part)
+        self.end_block(FIFFB_RAW_DATA)
+        self.end_block(FIFFB_MEAS)
+        self.tag(FIFF_NOP, FIFFT_VOID, b'', FIFFV_NEXT_NONE)
+        self.fid.close()
+        self.fid = None
+
+    def write_buffer(self, data):
+        """write_buffer(data) -- samples x channels, written as big-endian float32."""
+        data = np.asarray(data, dtype='>f4')
+        if self.fid.tell() + 16 + data.nbytes + END_TAGS_SIZE > self.split_size:
+            self.end_part(self.part + 1)
+            self.part += 1
+            self.start_part()
+        self.tag(FIFF_DATA_BUFFER, FIFFT_FLOAT, data.tobytes())
+        self.first_sample += len(data)
+
+    def close(self):
+        if self.fid is not None:
+            self.end_part()
+
+
+class FifSink:
+
+    """
+    Sink that records every chunk to a raw FIF file on a background thread.
+    Chunks are copied into a queue of at most 'max_chunks' entries (write()
+    blocks when it is full) and written in buffers of 'buffer_seconds'.
+    'channel_map' gives the channel types (see fif_channels).
+    """
+
+    def __init__(self, fname, channel_map=None, buffer_seconds=1., split_size=2000000000,
+                 max_chunks=64):
+        self.fname = fname
+        self.channel_map = channel_map
+        self.buffer_seconds = buffer_seconds
+        self.split_size = split_size
+        self.q = queue.Queue(maxsize=max_chunks)
+        self.thread = None
+        self.error = None
+
+    def open(self, labels, sample_freq):
+        writer = FifWriter(self.fname, fif_channels(labels, self.channel_map),
+                           sample_freq, self.split_size)
+        n_samples = max(int(round(self.buffer_seconds * sample_freq)), 1)
+        self.thread = threading.Thread(target=self.writer_thread,
+                                       args=(writer, n_samples, len(labels)), daemon=True)
+        self.thread.start()
+
+    def write(self, chunk):
+        if self.error is not None:
+            raise IOError('FIF writer stopped: %s' % self.error)
+        self.q.put(np.array(chunk, dtype=np.float32))
+
+    def close(self):
+        if self.thread is not None:
+            self.q.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def writer_thread(self, writer, n_samples, n_channels):
+        block = np.empty((n_samples, n_channels), dtype='>f4')
+        fill = 0
+        try:
+            while True:
+                chunk = self.q.get()
+                if chunk is None:
+                    break
+                pos = 0
+                while pos < len(chunk):
+                    take = min(len(chunk) - pos, n_samples - fill)
+                    block[fill:fill + take] = chunk[pos:pos + take]
+                    fill += take
+                    pos += take
+                    if fill == n_samples:
+                        writer.write_buffer(block)
+                        fill = 0
+            if fill:
+                writer.write_buffer(block[:fill])
+        except Exception as err:
+            self.error = err
+            # keep draining so write() never blocks on a dead writer
+            while self.q.get() is not None:
+                pass
+        finally:
+            writer.close()
@@ -0,0 +1,232 @@
+"""
+Streaming IIR filters as cascaded second-order sections (SOS).
+
+Sections use the same layout as scipy.signal: one row [b0, b1, b2, a0, a1, a2]
+per section, with a0 normalized to 1. Coefficients are designed with the
+bilinear transform (RBJ audio EQ cookbook), so numpy is all we need.
+"""
+
+import numpy as np
+
+from .pipeline import Stage, OUTPUT_SINK
+
+
+def _check_freq(freq, sample_freq):
+    if not 0 < freq < sample_freq / 2.:
+        raise ValueError('Frequency %g Hz must be between 0 and Nyquist '
+                         '(%g Hz)' % (freq, sample_freq / 2.))
+
+
+def _butterworth_q(order):
+    if order < 2 or order % 2:
+        raise ValueError('Filter order must be even and >= 2')
+    k = np.arange(1, order // 2 + 1)
+    return 1. / (2. * np.cos((2 * k - 1) * np.pi / (2 * order)))
+
+
+def _biquad(b, a):
+    return np.concatenate((b, a)) / a[0]
+
+
+def sos_lowpass(freq, sample_freq, order=4):
+    _check_freq(freq, sample_freq)
+    w0 = 2. * np.pi * freq / sample_freq
+    cos_w0 = np.cos(w0)
+    sections = []
+    for q in _butterworth_q(order):
+        alpha = np.sin(w0) / (2. * q)
+        b = np.array([(1. - cos_w0) / 2., 1. - cos_w0, (1. - cos_w0) / 2.])
+        a = np.array([1. + alpha, -2. * cos_w0, 1. - alpha])
+        sections.append(_biquad(b, a))
+    return np.array(sections)
+
+
+def sos_highpass(freq, sample_freq, order=4):
+    _check_freq(freq, sample_freq)
+    w0 = 2. * np.pi * freq / sample_freq
+    cos_w0 = np.cos(w0)
+    sections = []
+    for q in _butterworth_q(order):
+        alpha = np.sin(w0) / (2. * q)
+        b = np.array([(1. + cos_w0) / 2., -(1. + cos_w0), (1. + cos_w0) / 2.])
+        a = np.array([1. + alpha, -2. * cos_w0, 1. - alpha])
+        sections.append(_biquad(b, a))
+    return np.array(sections)
+
+
+def sos_bandpass(low, high, sample_freq, order=4):
+    if low >= high:
+        raise ValueError('Band-pass needs low < high')
+    return np.vstack((sos_highpass(low, sample_freq, order),
+                      sos_lowpass(high, sample_freq, order)))
+
+
+def sos_notch(freq, sample_freq, q=30.):
+    _check_freq(freq, sample_freq)
+    w0 = 2. * np.pi * freq / sample_freq
+    alpha = np.sin(w0) / (2. * q)
+    b = np.array([1., -2. * np.cos(w0), 1.])
+    a = np.array([1. + alpha, -2. * np.cos(w0), 1. - alpha])
+    return _biquad(b, a)[np.newaxis, :]
+
+
+def design_sos(sample_freq, band=None, notch=(), order=4, notch_q=30.):
+    """
+    design_sos(sample_freq [, band, notch, order, notch_q]) -- stack the
+    sections for an optional (low, high) band and any number of notches.
+    Either band edge may be None for a plain high- or low-pass.
+    """
+    sections = []
+    if band is not None:
+        low, high = band
+        if low is not None:
+            sections.append(sos_highpass(low, sample_freq, order))
+        if high is not None:
+            sections.append(sos_lowpass(high, sample_freq, order))
+    for freq in notch:
+        sections.append(sos_notch(freq, sample_freq, notch_q))
+    if not sections:
+        raise ValueError('Filter needs a band or at least one notch')
+    return np.vstack(sections)
+
+
+class SOSFilter:
+
+    """
+    Cascade of second-order sections in transposed direct form II, run over
+    all channels at once. The state is kept between calls, so filtering a
+    stream chunk by chunk gives the same result as filtering it in one go.
+
+    The cascade is run as one linear state-space system over blocks of up
+    to 'block' samples: each block is a few matrix products (impulse
+    response, state to output, state update) instead of a Python loop per
+    sample and section.
+
+    A channel with NaN (or inf) in a chunk comes out NaN for the whole
+    chunk and its state is dropped, so it starts again cleanly, from the
+    steady state of its first finite sample, once the data is back.
+    """
+
+    def __init__(self, sos, n_channels, block=64):
+        self.sos = np.atleast_2d(np.asarray(sos, dtype=np.float64))
+        if self.sos.shape[1] != 6:
+            raise ValueError('SOS array must have 6 columns')
+        self.n_channels = n_channels
+        self.block = block
+        self.zi = np.zeros((len(self.sos), 2, n_channels))
+        self.initialized = np.zeros(n_channels, dtype=bool)
+        self.state_space()
+        self.block_matrices = {}
+
+    def state_space(self):
+        """A, B, C, D of the cascade, with the states of self.zi flattened."""
+        n_states = 2 * len(self.sos)
+        self.A = np.empty((n_states, n_states))
+        self.C = np.empty(n_states)
+        for i in range(n_states):
+            z = np.zeros(n_states)
+            z[i] = 1.
+            self.A[:, i], self.C[i] = self.step(z, 0.)
+        self.B, self.D = self.step(np.zeros(n_states), 1.)
+
+    def step(self, z, x):
+        """One sample through the sections: (next state, output)."""
+        z = z.reshape(-1, 2)
+        z_next = np.empty_like(z)
+        for s, (b0, b1, b2, a0, a1, a2) in enumerate(self.sos):
+            y = b0 * x + z[s, 0]
+            z_next[s, 0] = b1 * x - a1 * y + z[s, 1]
+            z_next[s, 1] = b2 * x - a2 * y
+            x = y
+        return z_next.ravel(), x
+
+    def matrices(self, n):
+        """(T, O, Phi, Gamma) for a block of n samples, y = T x + O z, z' = Phi z + Gamma x."""
+        if n not in self.block_matrices:
+            n_states = len(self.C)
+            powers = np.empty((n + 1, n_states, n_states))
+            powers[0] = np.eye(n_states)
+            for k in range(n):
+                powers[k + 1] = self.A @ powers[k]
+            # h[0] = D, h[k] = C A^(k-1) B
+            h = np.concatenate(([self.D], self.C @ powers[:n - 1] @ self.B))
+            lag = np.arange(n)[:, np.newaxis] - np.arange(n)
+            T = np.where(lag >= 0, h[np.maximum(lag, 0)], 0.)
+            O = self.C @ powers[:n]
+            Gamma = (powers[n - 1::-1] @ self.B).T
+            self.block_matrices[n] = (T, O, powers[n], Gamma)
+        return self.block_matrices[n]
+
+    def reset(self, x0=None, picks=None):
+        """
+        reset([x0, picks]) -- clear the state (of the channels 'picks'), or
+        set it to the steady state for a constant input x0 so that a DC
+        offset does not ring at start-up.
+        """
+        if picks is None:
+            picks = slice(None)
+        self.zi[:, :, picks] = 0.
+        self.initialized[picks] = x0 is not None
+        if x0 is None:
+            return
+        x = np.asarray(x0, dtype=np.float64)
+        for s, (b0, b1, b2, a0, a1, a2) in enumerate(self.sos):
+            y = x * (b0 + b1 + b2) / (1. + a1 + a2)
+            self.zi[s, 1, picks] = b2 * x - a2 * y
+            self.zi[s, 0, picks] = y - b0 * x
+            x = y
+
+    def process(self, chunk, out=None):
+        x = np.asarray(chunk, dtype=np.float64)
+        if out is None:
+            out = np.empty(x.shape, dtype=np.float32)
+        finite = np.isfinite(x).all(axis=0)
+        bad = None
+        if not finite.all():
+            bad = ~finite
+            self.initialized[bad] = False
+            x = np.where(finite, x, 0.)
+        new = ~self.initialized & finite
+        if new.any():
+            self.reset(x[0, new], np.flatnonzero(new))
+        z = self.zi.reshape(-1, self.n_channels)
+        for start in range(0, len(x), self.block):
+            xb = x[start:start + self.block]
+            T, O, Phi, Gamma = self.matrices(len(xb))
+            out[start:start + len(xb)] = T @ xb + O @ z
+            z = Phi @ z + Gamma @ xb
+        self.zi[:] = z.reshape(self.zi.shape)
+        if bad is not None:
+            out[:, bad] = np.nan
+        return out
+
+
+class FilterStage(Stage):
+
+    """
+    Filters chunks with one SOS cascade per channel group. 'groups' is a list
+    of (channel_indices, sos) pairs; channel_indices None means all channels.
+    Channels left out of every group are passed on unfiltered.
+    """
+
+    suffix = '_filt'
+
+    def __init__(self, groups, output=OUTPUT_SINK, sink=None):
+        super().__init__(output, sink)
+        self.groups = groups
+        self.filters = []
+
+    def setup(self):
+        n_channels = len(self.labels)
+        self.filters = []
+        for picks, sos in self.groups:
+            if picks is None:
+                picks = np.arange(n_channels)
+            picks = np.asarray(picks, dtype=int)
+            self.filters.append((picks, SOSFilter(sos, len(picks))))
+
+    def transform(self, chunk):
+        result = np.array(chunk, dtype=np.float32)
+        for picks, sos_filter in self.filters:
+            result[:, picks] = sos_filter.process(chunk[:, picks])
+        return result
@@ -0,0 +1,85 @@
+"""
+Long reads of the buffer's history, e.g. minutes of data to compute a
+projector again mid-session, without tying up anybody's connection.
+
+A HistoryReader has a pool of its own buffer connections. A range is cut
+into blocks that are requested concurrently, one per connection, and each
+reply is received straight into its rows of a single output array.
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .FieldTrip import Client, numpyType
+
+
+class HistoryReader:
+
+    """
+    HistoryReader([hostname, port, connections, block_samples]) -- read
+    ranges of samples over 'connections' connections, 'block_samples' per
+    request.
+    """
+
+    def __init__(self, hostname='localhost', port=1972, connections=4, block_samples=20000):
+        self.hostname = hostname
+        self.port = port
+        self.block_samples = block_samples
+        self.clients = queue.Queue()
+        for _ in range(connections):
+            self.clients.put(self.connect())
+        self.executor = ThreadPoolExecutor(max_workers=connections)
+
+    def connect(self):
+        client = Client()
+        client.connect(self.hostname, self.port)
+        return client
+
+    def close(self):
+        self.executor.shutdown()
+        while not self.clients.empty():
+            self.clients.get().disconnect()
+
+    def get_header(self):
+        client = self.clients.get()
+        try:
+            return client.getHeader()
+        finally:
+            self.clients.put(client)
+
+    def read(self, start, stop, out=None):
+        """
+        read(start, stop [, out]) -- samples start to stop-1, samples in
+        rows, into 'out' if given. Raises IOError if some of them are no
+        longer in the buffer.
+        """
+        header = self.get_header()
+        if header is None:
+            raise IOError('No header in the buffer')
+        if not 0 <= start <= stop <= header.nSamples:
+            raise ValueError('Samples %i to %i are not in the buffer (%i samples)'
+                             % (start, stop, header.nSamples))
+        if out is None:
+            out = np.empty((stop - start, header.nChannels), dtype=numpyType[header.dataType])
+        futures = [self.executor.submit(self.fetch, first, min(first + self.block_samples, stop),
+                                        out[first - start:first - start + self.block_samples])
+                   for first in range(start, stop, self.block_samples)]
+        for future in futures:
+            future.result()
+        return out
+
+    def fetch(self, first, last, out):
+        client = self.clients.get()
+        try:
+            received = client.getDataInto([first, last - 1], out)
+        except Exception:
+            # the connection is in an unknown state, start a new one
+            client.disconnect()
+            client = self.connect()
+            raise
+        finally:
+            self.clients.put(client)
+        if not received:
+            raise IOError('Samples %i to %i are no longer in the buffer' % (first, last - 1))
@@ -1,42 +1,27 @@
 # mne_fieldline_connector
 # gabrielbmotta, juangpc
 
-import queue
-import time
 import threading
 
 import numpy as np
 
 from .FieldTrip import Client, DATATYPE_FLOAT32
-from .config import (working_chassis, broken_sensors,
-                     working_sensors, ip_list,
-                     use_phantom, ft_IP, ft_port)
+from .session import AcquisitionSession, default_sample_freq
+from . import timing
 
-measure_flag = False
-measure_flag_lock = threading.Lock()
-process_data_flag = False
-process_data_flag_lock = threading.Lock()
+# Default session behind the module-level functions below, created on first
+# use. Create more AcquisitionSession objects to run several headsets or
+# buffers at once.
+session = None
+session_lock = threading.Lock()
 
-default_sample_freq = 1000
-channel_key_list = []
 
-if use_phantom:
-    import mne_fieldline_phantom as spooky
-    print("Using phantom device")
-    # fConnector = spooky.PhantomConnector()
-    # fService = spooky.PhantomService(fConnector, prefix="")
-else:
-    from .connector import FieldLineConnector
-    from fieldline_api.fieldline_service import FieldLineService
-    from fieldline_api.fieldline_datatype import FieldLineWaveType
-
-    fConnector = FieldLineConnector()
-    fService = FieldLineService(fConnector, prefix="")
-
-ft_client = Client()
-ft_data_type = DATATYPE_FLOAT32
-
-data_stream_multiplier = 1
+def get_session():
+    global session
+    with session_lock:
+        if session is None:
+            session = AcquisitionSession()
+    return session
 
 
 class fieldline_phantom:
@@ -76,234 +61,118 @@ class fieldline_phantom:
                 data = np.random.rand(self.num_samples, self.num_sensors).astype(np.float32) * 1e-12
                 self.ft_client.putData(data)
 
+
 def num_working_sensors():
-    num_sens = 0
-    for ch in working_chassis:
-        num_sens += len(working_sensors[ch])
-    return num_sens
+    return get_session().num_working_sensors()
 
 def num_restarted_sensors():
-    num_sens = 0
-    if fConnector.restarted_sensors:
-        for sensors_in_chassis in fConnector.restarted_sensors.values():
-            num_sens += len(sensors_in_chassis)
-    return num_sens
+    return get_session().num_restarted_sensors()
 
 def num_coarse_zeroed_sensors():
-    num_sens = 0
-    if fConnector.coarse_zero_sensors:
-        for sensors_in_chassis in fConnector.coarse_zero_sensors.values():
-            num_sens += len(sensors_in_chassis)
-    return num_sens
+    return get_session().num_coarse_zeroed_sensors()
 
 def num_fine_zeroed_sensors():
-    num_sens = 0
-    print("fine zeroed sensors:")
-    print(fConnector.fine_zero_sensors)
-    if fConnector.fine_zero_sensors:
-        for sensors_in_chassis in fConnector.fine_zero_sensors.values():
-            num_sens += len(sensors_in_chassis)
-    return num_sens
+    return get_session().num_fine_zeroed_sensors()
 
 def wait_for_restart_to_finish():
-    while (num_restarted_sensors() < num_working_sensors()):
-        time.sleep(.1)
+    return get_session().wait_for_restart_to_finish()
 
 def wait_for_coarse_zero_to_finish():
-    while (num_coarse_zeroed_sensors() < num_working_sensors()):
-        time.sleep(.1)
+    return get_session().wait_for_coarse_zero_to_finish()
 
 def wait_for_fine_zero_to_finish():
-    while (num_fine_zeroed_sensors() < num_working_sensors()):
-        time.sleep(.1)
+    return get_session().wait_for_fine_zero_to_finish()
 
 def turn_off_all_broken_sensors():
-    for ch in working_chassis:
-        for s in broken_sensors[ch]:
-            fService.turn_off_sensor(ch, s)
+    return get_session().turn_off_all_broken_sensors()
 
 def measure(*argv):
-    global measure_flag
-    global measure_flag_lock
-    if len(argv) == 0:
-        measure_flag_lock.acquire()
-        stopFlag = measure_flag
-        measure_flag_lock.release()
-        return stopFlag
-    if len(argv) == 1 and type(argv[0]) is bool:
-        measure_flag_lock.acquire()
-        measure_flag = argv[0]
-        measure_flag_lock.release()
-        return measure()
+    return get_session().measure(*argv)
 
 def process_data(*argv):
-    global process_data_flag
-    global process_data_flag_lock
-    if len(argv) == 0:
-        process_data_flag_lock.acquire()
-        stopFlag = process_data_flag
-        process_data_flag_lock.release()
-        return stopFlag
-    if len(argv) == 1 and type(argv[0]) is bool:
-        process_data_flag_lock.acquire()
-        process_data_flag = argv[0]
-        process_data_flag_lock.release()
-        return process_data()
+    return get_session().process_data(*argv)
 
 def end_measurement():
-    if fService.is_service_running():
-        fService.stop()
-        measure(False)
+    return get_session().end_measurement()
 
 def restart_all_working_sensors():
-    for ch in working_chassis:
-        for s in working_sensors[ch]:
-            fService.restart_sensor(ch, s)
-            time.sleep(.1)
-    wait_for_restart_to_finish()
-    print("All sensors restarted.")
+    return get_session().restart_all_working_sensors()
 
 def coarse_zero_all_working_sensors():
-    for ch in working_chassis:
-        for s in working_sensors[ch]:
-            fService.coarse_zero_sensor(ch, s)
-            time.sleep(.1)
-    wait_for_coarse_zero_to_finish()
-    print("All sensors coarse-zeroed.")
+    return get_session().coarse_zero_all_working_sensors()
 
 def fine_zero_all_working_sensors():
-    for ch in working_chassis:
-        for s in working_sensors[ch]:
-            fService.fine_zero_sensor(ch, s)
-            time.sleep(.1)
-    wait_for_fine_zero_to_finish()
-    print("All sensors fine-zeroed.")
+    return get_session().fine_zero_all_working_sensors()
 
 def connect_to_fieldtrip_buffer():
-    ft_client.connect(ft_IP, ft_port)
-    if ft_client.isConnected:
-        print("Fieldtrip Client connected")
+    return get_session().connect_to_fieldtrip_buffer()
 
 def init_ft_header():
-    labels = create_channel_label_list()
-    if ft_client.isConnected:
-        ft_client.putHeader(num_working_sensors(), default_sample_freq, ft_data_type, labels)
-        header = ft_client.getHeader()
-        if header.nChannels == num_working_sensors():
-            print("Fieldtrip header initialized")
+    return get_session().init_ft_header()
 
 def create_channel_label_list():
-    channel_labels = []
-    for chassis in working_chassis:
-        for s in working_sensors[chassis]
-            label = str(chassis) + '|' + str(s).zfill(2)
-            channel_labels.append(label)
-    return channel_labels
+    return get_session().create_channel_label_list()
+
+def create_channel_chassis_picks(chassis_list):
+    return get_session().create_channel_chassis_picks(chassis_list)
+
+def create_channel_key_list(channel_list):
+    return get_session().create_channel_key_list(channel_list)
+
+def set_projector(fname):
+    return get_session().set_projector(fname)
+
+def print_quality_status():
+    return get_session().print_quality_status()
+
+def print_latency():
+    return get_session().print_latency()
+
+def print_jitter():
+    return get_session().print_jitter()
+
+def run_diagnostics():
+    return get_session().run_diagnostics()
+
+def init_pipeline():
+    return get_session().init_pipeline()
 
 def test_data_to_ft():
-    arr_data = np.zeros((200,num_working_sensors()), dtype=np.single)
-    ft_client.putData(arr_data)
+    return get_session().test_data_to_ft()
 
 def init_sensors():
-    if num_fine_zeroed_sensors() < num_working_sensors():
-        force_init_sensors()
-
-def create_channel_key_list(channel_list):
-    channel_key_list = []
-    for chassis in channel_list:
-        for sensors in working_sensors[chassis]:
-            key = str(chassis).zfill(2) + ':' + str(sensors).zfill(2) + ':' + str(28).zfill(2)
-            channel_key_list.append(key)
-    return channel_key_list
+    return get_session().init_sensors()
 
 def force_init_sensors():
-    turn_off_all_broken_sensors()
-    restart_all_working_sensors()
-    coarse_zero_all_working_sensors()
-    fine_zero_all_working_sensors()
-    global channel_key_list
-    channel_key_list = create_channel_key_list(working_chassis)
+    return get_session().force_init_sensors()
 
 def are_sensors_ready():
-    return num_fine_zeroed_sensors() == num_working_sensors()
+    return get_session().are_sensors_ready()
 
 def init_acquisition():
-    if measure() is False:
-        fService.start_data()
-        print("fService data started.")
-        measure(True)
-        time.sleep(1)
-        acquisition_thread = threading.Thread(target=data_retreiver_thread, daemon=True)
-        acquisition_thread.start()
-        # acquisition_thread_dalayed_stopper = threading.Thread(target=delayed_data_retriever_stopper,args=[ttime], daemon=True)
-        # acquisition_thread_dalayed_stopper.start()
-    else:
-        stop_measurement()
-        init_acquisition
-
-def parse_data(data):
-    global channel_key_list
-    global data_stream_multiplier
-    chunk = np.zeros((len(data),num_working_sensors()), dtype=np.single)
-    for sample_i in range(len(data)):
-        for ch_i, channel in enumerate(channel_key_list):
-            chunk[sample_i, ch_i] = data[0][channel]["data"] * data[0][channel]["calibration"] * data_stream_multiplier;
-    # ft_client.putData(chunk)
-    ft_client.putData(chunk)
-    # print("Writing to buffer")
-
-# def delayed_data_retriever_stopper(t):
-#     time.sleep(t)
-#     stop_acquisition()
-#     time.sleep(.5)
-    
-def data_retreiver_thread():
-    while measure():
-        data = fConnector.data_q.get()
-        parse_data(data)
-        fConnector.data_q.task_done()
+    return get_session().init_acquisition()
 
-def init_fieldline_connection():
-    if fService.is_service_running() is not True:
-        fService.start()
-        print ("Fieldline service started.")
-        time.sleep(.5)
-        print("About to connect to ips : " + str(ip_list))
-        output = fService.connect(ip_list)
-        print(str(output))
-        while fService.get_sensor_state(0, working_sensors[0][4]) is None:
-            print("Doh! No Fieldline Device Detected")
-            time.sleep(1)
-        print ("Fieldline service connected.")
-        for chassis in working_chassis:
-            version = fService.get_version(chassis)
-            print("Connection with chassis: " + str(chassis) + "... OK")
-            print("Chassis " + str(version))
-        print("---")
+def parse_data(data, t=None):
+    return get_session().parse_data(data, t)
 
-def init_fieldtrip_connection():
-    connect_to_fieldtrip_buffer()
-    init_ft_header()
+def mark(type, value, time=None, duration=0):
+    return get_session().mark(type, value, time, duration)
 
+def init_fieldline_connection():
+    return get_session().init_fieldline_connection()
 
-# def start_acquisition():
-#     process_data(True)
-#     measure(True)
-
-# def stop_acquisition():
-#     process_data(False)
-#     measure(False)
+def init_fieldtrip_connection():
+    return get_session().init_fieldtrip_connection()
 
 def stop_measurement():
-    if measure() is True:
-        process_data(False)
-        measure(False)
-        # fConnector.data_q.join()
-        fService.stop_data()
-    
+    return get_session().stop_measurement()
+
 def stop_service():
-    if fService.is_service_running():
-        fService.stop()
+    return get_session().stop_service()
 
+def close():
+    if session is not None:
+        session.close()
 
 
+timing.mark('import fieldline_client.lib')
@@ -0,0 +1,301 @@
+"""
+Live stream of the acquisition to any number of viewers over WebSocket,
+with the standard library only.
+
+The server takes every chunk once, as a pipeline sink, and fans it out on
+its own asyncio thread, so acquisition costs the same however many
+viewers connect. Each viewer picks its channels and decimation by sending
+a JSON text message, e.g.
+
+    {"channels": [0, 1, 2], "decimate": 10}
+
+('channels' may also list labels), and gets binary frames of
+
+    FRAME_HEADER (magic, first sample, n rows, n channels, decimation)
+    float32 rows x channels         -- decimation 1: the samples
+    float32 rows x channels, twice  -- otherwise: min then max per bin
+
+Viewers that do not keep up lose frames rather than slow anyone down.
+GET /info answers with the labels and sample rate as JSON. There is no
+authentication, so the server listens on localhost unless told otherwise.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import struct
+import threading
+
+import numpy as np
+
+log = logging.getLogger('fieldline_client.livestream')
+
+FRAME_MAGIC = b'FLS1'
+FRAME_HEADER = struct.Struct('<4sQIHH')
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_TEXT = 1
+OP_BINARY = 2
+OP_CLOSE = 8
+OP_PING = 9
+OP_PONG = 10
+
+# longest frame taken from a client; they only send small JSON messages
+MAX_CLIENT_FRAME = 1 << 16
+CLOSE_TOO_BIG = 1009
+# the decimation goes out in an unsigned short of the frame header
+MAX_DECIMATION = 0xffff
+
+
+def websocket_frame(opcode, payload):
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header += bytes([n])
+    elif n < 1 << 16:
+        header += bytes([126]) + struct.pack('>H', n)
+    else:
+        header += bytes([127]) + struct.pack('>Q', n)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """
+    (opcode, payload) of the next frame from a client (always masked).
+    Raises ValueError for frames over MAX_CLIENT_FRAME bytes.
+    """
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7f
+    if n == 126:
+        n, = struct.unpack('>H', await reader.readexactly(2))
+    elif n == 127:
+        n, = struct.unpack('>Q', await reader.readexactly(8))
+    if n > MAX_CLIENT_FRAME:
+        raise ValueError('Client frame of %i bytes' % n)
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if mask is not None:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return b0 & 0x0f, payload
+
+
+class Viewer:
+
+    """One connected client: its selection, envelope state and frame queue."""
+
+    def __init__(self, writer, n_channels, max_frames):
+        self.writer = writer
+        self.picks = np.arange(n_channels)
+        self.factor = 1
+        self.pending = None
+        self.pending_first = 0
+        self.frames = asyncio.Queue(maxsize=max_frames)
+        self.dropped = 0
+
+    def configure(self, message, labels):
+        if not isinstance(message, dict):
+            raise TypeError('Expected a JSON object')
+        channels = message.get('channels')
+        if channels is not None:
+            picks = np.array([labels.index(c) if isinstance(c, str) else int(c)
+                              for c in channels], dtype=int)
+            if np.any((picks < 0) | (picks >= len(labels))):
+                raise IndexError('No such channel')
+            self.picks = picks
+        self.factor = min(max(int(message.get('decimate', self.factor)), 1), MAX_DECIMATION)
+        self.pending = None
+
+    def frame(self, first_sample, chunk):
+        """Binary frame for a new chunk, or None if no bin is complete yet."""
+        data = chunk[:, self.picks]
+        if self.factor == 1:
+            return FRAME_HEADER.pack(FRAME_MAGIC, first_sample, len(data), data.shape[1], 1) + \
+                data.tobytes()
+        if self.pending is not None and len(self.pending):
+            data = np.concatenate((self.pending, data))
+            first_sample = self.pending_first
+        n_bins = len(data) // self.factor
+        used = n_bins * self.factor
+        self.pending = data[used:].copy()
+        self.pending_first = first_sample + used
+        if not n_bins:
+            return None
+        bins = data[:used].reshape(n_bins, self.factor, -1)
+        return FRAME_HEADER.pack(FRAME_MAGIC, first_sample, n_bins, data.shape[1], self.factor) + \
+            bins.min(axis=1).tobytes() + bins.max(axis=1).tobytes()
+
+    def offer(self, frame):
+        try:
+            self.frames.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class LiveStreamServer:
+
+    """
+    LiveStreamServer([host, port, max_frames]) -- sink serving the chunks it
+    is given to WebSocket viewers on host:port. Each viewer has at most
+    'max_frames' frames waiting; newer ones are dropped while it is full.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, max_frames=8):
+        self.host = host
+        self.port = port
+        self.max_frames = max_frames
+        self.labels = []
+        self.sample_freq = 0.
+        self.n_samples = 0
+        self.viewers = set()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.started = threading.Event()
+        self.error = None
+
+    # sink interface, called from the acquisition side
+    def open(self, labels, sample_freq):
+        self.labels = list(labels)
+        self.sample_freq = sample_freq
+        self.n_samples = 0
+        self.started.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self.server_thread, daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            self.thread.join()
+            self.thread = None
+            raise self.error
+
+    def write(self, chunk):
+        first_sample = self.n_samples
+        self.n_samples += len(chunk)
+        if self.viewers:
+            self.loop.call_soon_threadsafe(self.publish, first_sample,
+                                           np.array(chunk, dtype=np.float32))
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop = None
+            self.thread = None
+
+    # server side, on the asyncio thread
+    def server_thread(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle_client, self.host, self.port))
+        except Exception as err:
+            # e.g. the port is taken: open() raises it
+            self.error = err
+            self.loop.close()
+            self.loop = None
+            return
+        finally:
+            self.started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            for viewer in list(self.viewers):
+                viewer.writer.close()
+            # closed connections end their handlers, which stop their senders
+            tasks = asyncio.all_tasks(self.loop)
+            if tasks:
+                self.loop.run_until_complete(asyncio.wait(tasks, timeout=1.))
+            self.viewers.clear()
+            self.loop.close()
+
+    def publish(self, first_sample, chunk):
+        for viewer in list(self.viewers):
+            # one viewer's bad selection must not stop the others' frames
+            try:
+                frame = viewer.frame(first_sample, chunk)
+            except Exception as err:
+                log.error("Closing live stream viewer: %s", err)
+                self.viewers.discard(viewer)
+                viewer.writer.close()
+                continue
+            if frame is not None:
+                viewer.offer(websocket_frame(OP_BINARY, frame))
+
+    async def handle_client(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        lines = request.decode('latin-1').split('\r\n')
+        path = lines[0].split(' ')[1] if len(lines[0].split(' ')) > 1 else '/'
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        if headers.get('upgrade', '').lower() != 'websocket':
+            await self.answer_http(writer, path)
+            return
+        accept = base64.b64encode(hashlib.sha1(
+            headers.get('sec-websocket-key', '').encode('latin-1') + WEBSOCKET_GUID).digest())
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                     b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        viewer = Viewer(writer, len(self.labels), self.max_frames)
+        self.viewers.add(viewer)
+        sender = asyncio.ensure_future(self.send_frames(viewer))
+        try:
+            while True:
+                try:
+                    opcode, payload = await read_websocket_frame(reader)
+                except ValueError:
+                    # the sender only writes whole frames, so this cannot split one
+                    writer.write(websocket_frame(OP_CLOSE, struct.pack('>H', CLOSE_TOO_BIG)))
+                    break
+                if opcode == OP_CLOSE:
+                    writer.write(websocket_frame(OP_CLOSE, payload[:2]))
+                    break
+                if opcode == OP_PING:
+                    viewer.offer(websocket_frame(OP_PONG, payload))
+                elif opcode == OP_TEXT:
+                    try:
+                        viewer.configure(json.loads(payload.decode('utf-8')), self.labels)
+                    except (ValueError, TypeError, IndexError, OverflowError):
+                        viewer.offer(websocket_frame(OP_TEXT, b'{"error": "bad request"}'))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            sender.cancel()
+            writer.close()
+
+    async def send_frames(self, viewer):
+        try:
+            while True:
+                viewer.writer.write(await viewer.frames.get())
+                await viewer.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def answer_http(self, writer, path):
+        if path == '/info':
+            body = json.dumps({'labels': self.labels, 'sample_freq': self.sample_freq,
+                               'viewers': len(self.viewers)}).encode('utf-8')
+            status = b'200 OK'
+            content_type = b'application/json'
+        else:
+            body = b'FieldLine live stream: connect with WebSocket, GET /info for channels\n'
+            status = b'200 OK' if path == '/' else b'404 Not Found'
+            content_type = b'text/plain; charset=utf-8'
+        writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Type: ' + content_type + b'\r\n'
+                     b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                     b'Connection: close\r\n\r\n' + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
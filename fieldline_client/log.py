@@ -0,0 +1,120 @@
+"""
+Event log for the fieldline_api callbacks. Callback threads only put
+records on a queue; a listener thread formats them and writes them to the
+console and, if configured, a rotating file, where the structured fields
+of a record (extra={'event': ..., 'chassis': ..., 'sensor': ...}) follow
+the message as key=value pairs for grepping.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+logger = logging.getLogger('fieldline_client')
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+
+    """
+    Lets through at most 'burst' warnings per (event, chassis, sensor) every
+    'interval' seconds. The first record after a quiet spell reports how many
+    were dropped. Records without a sensor are never limited.
+    """
+
+    def __init__(self, interval=1., burst=3):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.windows = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or not hasattr(record, 'sensor'):
+            return True
+        key = (getattr(record, 'event', None), getattr(record, 'chassis', None), record.sensor)
+        now = time.monotonic()
+        start, count, dropped = self.windows.get(key, (now, 0, 0))
+        if now - start >= self.interval:
+            start, count = now, 0
+        if count >= self.burst:
+            self.windows[key] = (start, count, dropped + 1)
+            return False
+        self.windows[key] = (start, count + 1, 0)
+        if dropped:
+            record.msg = str(record.msg) + ' (%i similar suppressed)' % dropped
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+
+    """Formatter appending the structured fields a record has as key=value."""
+
+    fields = ('event', 'chassis', 'sensor')
+
+    def format(self, record):
+        text = super().format(record)
+        pairs = ['%s=%s' % (field, getattr(record, field)) for field in self.fields
+                 if hasattr(record, field)]
+        if not pairs:
+            return text
+        # after the first line, so a traceback stays below it
+        first, newline, rest = text.partition('\n')
+        return first + ' ' + ' '.join(pairs) + newline + rest
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        # same process, so the record can go as it is; formatting is left
+        # to the listener thread
+        return record
+
+
+def start(level='INFO', fname=None, max_bytes=10 * 1024 * 1024, backups=5,
+          rate_interval=1., rate_burst=3):
+    """
+    start([level, fname, ...]) -- route the fieldline_client log through a
+    queue to the console and to the rotating file 'fname'. Only the first
+    call configures the log.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter('%(message)s'))
+        handlers = [console]
+        if fname is not None:
+            file_handler = logging.handlers.RotatingFileHandler(
+                fname, maxBytes=max_bytes, backupCount=backups)
+            file_handler.setFormatter(StructuredFormatter(
+                '%(asctime)s %(levelname)s %(threadName)s %(message)s'))
+            handlers.append(file_handler)
+        log_q = queue.SimpleQueue()
+        handler = _QueueHandler(log_q)
+        handler.addFilter(RateLimitFilter(rate_interval, rate_burst))
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_q, *handlers,
+                                                   respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop)
+
+
+def stop():
+    """Write out what is queued and stop the listener thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in list(logger.handlers):
+            if isinstance(handler, _QueueHandler):
+                logger.removeHandler(handler)
+        _listener = None
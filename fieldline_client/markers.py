@@ -0,0 +1,86 @@
+"""
+Sample counter of the acquisition and sample-aligned event markers.
+"""
+
+import threading
+import time
+
+from .FieldTrip import Event
+
+# mark() takes a 'time' argument, which hides the module inside it
+_now = time.monotonic
+
+
+class SampleClock:
+
+    """
+    Authoritative count of the samples written to the buffer. Host time is
+    mapped to sample index by the AcquisitionTimeline, from the chassis
+    timestamps, not from when the writes happened.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.n_samples = 0
+
+    def reset(self):
+        with self.lock:
+            self.n_samples = 0
+
+    def advance(self, n_samples):
+        with self.lock:
+            self.n_samples += n_samples
+
+    def samples_written(self):
+        with self.lock:
+            return self.n_samples
+
+
+class EventMarker:
+
+    """
+    Thread-safe queue of events converted from host time to sample index
+    by 'timeline' (an AcquisitionTimeline). The acquisition thread takes
+    the pending events after every data write and puts them in the buffer
+    in one request.
+    """
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def mark(self, type, value, time=None, duration=0):
+        """
+        mark(type, value [, time, duration]) -- queue an event for host
+        time 'time' (time.monotonic() seconds, default now). Returns the
+        sample it was aligned to, or None if acquisition has not started.
+        """
+        if time is None:
+            time = _now()
+        sample = self.timeline.sample_at(time)
+        if sample is None:
+            return None
+        return self.mark_sample(type, value, sample, duration)
+
+    def mark_sample(self, type, value, sample, duration=0):
+        """mark_sample(type, value, sample [, duration]) -- queue an event at a sample index."""
+        e = Event()
+        e.type = type
+        e.value = value
+        e.sample = max(sample, 0)
+        e.duration = duration
+        with self.lock:
+            self.pending.append(e)
+        return e.sample
+
+    def take(self):
+        with self.lock:
+            events = self.pending
+            self.pending = []
+        return events
+
+    def clear(self):
+        with self.lock:
+            self.pending = []
+
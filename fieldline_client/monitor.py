@@ -0,0 +1,186 @@
+"""
+Incremental per-channel signal quality monitor.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from .pipeline import Stage, OUTPUT_REPLACE
+
+STATUS_OK = 'ok'
+STATUS_FLAT = 'flat'
+STATUS_SATURATED = 'saturated'
+STATUS_NOISY = 'noisy'
+STATUS_DRIFT = 'drift'
+STATUS_LINE_NOISE = 'line_noise'
+STATUS_NO_DATA = 'no_data'
+
+
+class QualityMonitor(Stage):
+
+    """
+    Watches every channel for flatlines, saturation, drift and excessive
+    (line) noise without keeping any history beyond one Welch segment.
+
+    Mean and variance are exponentially weighted with time constant 'tau'
+    seconds, the peak is the maximum absolute value since the last snapshot
+    and the spectrum is a Welch estimate averaged over the same time
+    constant. A snapshot is published every 'interval' seconds to the
+    'on_status' callbacks and, if 'event_marker' (an EventMarker) is given,
+    every change of a channel's status is queued as a 'quality' event at
+    the last sample seen, to go in the buffer with the next data write.
+
+    Thresholds are in the units of the chunks (T for calibrated data).
+
+    Channels that are NaN in a chunk (e.g. a stalled chassis, or a gap in
+    the stream) are 'no_data' in the next snapshot, and leave every
+    running statistic as it was until their data comes back.
+    """
+
+    def __init__(self, interval=0.25, tau=2., nperseg=256, line_freq=60.,
+                 flat_std=1e-15, saturation=None, noise_std=None,
+                 drift_rate=None, line_power=None, event_marker=None):
+        super().__init__(OUTPUT_REPLACE)
+        self.interval = interval
+        self.tau = tau
+        self.nperseg = nperseg
+        self.line_freq = line_freq
+        self.flat_std = flat_std
+        self.saturation = saturation
+        self.noise_std = noise_std
+        self.drift_rate = drift_rate
+        self.line_power = line_power
+        self.event_marker = event_marker
+        self.on_status = []
+        self.snapshot_lock = threading.Lock()
+        self.snapshot = None
+        self.n_samples = 0
+
+    def setup(self):
+        n_channels = len(self.labels)
+        self.mean = np.zeros(n_channels)
+        self.var = np.zeros(n_channels)
+        self.peak = np.zeros(n_channels)
+        self.segment = np.zeros((self.nperseg, n_channels))
+        self.segment_fill = 0
+        self.window = np.hanning(self.nperseg)
+        self.window_norm = self.sample_freq * (self.window ** 2).sum()
+        freqs = np.fft.rfftfreq(self.nperseg, 1. / self.sample_freq)
+        self.line_bins = np.abs(freqs - self.line_freq) <= (
+            self.sample_freq / self.nperseg)
+        self.freq_step = freqs[1]
+        self.psd = np.zeros((len(freqs), n_channels))
+        self.status = [STATUS_OK] * n_channels
+        self.started = np.zeros(n_channels, dtype=bool)
+        self.no_data = np.zeros(n_channels, dtype=bool)
+        self.segment_bad = np.zeros(n_channels, dtype=bool)
+        self.n_samples = 0
+        self.last_publish = time.monotonic()
+        self.last_publish_mean = self.mean.copy()
+
+    def transform(self, chunk):
+        n = len(chunk)
+        ok = np.isfinite(chunk).all(axis=0)
+        if not ok.all():
+            self.no_data |= ~ok
+            # zeros stand in for the missing channels, whose results are not kept
+            chunk = np.where(ok, chunk, 0.)
+        start = ok & ~self.started
+        if start.any():
+            self.mean[start] = chunk[0, start]
+            # drift is measured from here, not from the zeros of setup()
+            self.last_publish_mean[start] = chunk[0, start]
+            self.started |= start
+        alpha = 1. - np.exp(-n / (self.tau * self.sample_freq))
+        chunk_mean = chunk.mean(axis=0)
+        chunk_var = chunk.var(axis=0)
+        delta = chunk_mean - self.mean
+        mean = self.mean + alpha * delta
+        var = (1. - alpha) * (self.var + alpha * delta ** 2) + alpha * chunk_var
+        self.mean = np.where(ok, mean, self.mean)
+        self.var = np.where(ok, var, self.var)
+        np.maximum(self.peak, np.abs(chunk).max(axis=0), out=self.peak)
+        self._update_psd(chunk, ok)
+        self.n_samples += n
+
+        now = time.monotonic()
+        if now - self.last_publish >= self.interval:
+            self._publish(now)
+        return None
+
+    def _update_psd(self, chunk, ok):
+        pos = 0
+        while pos < len(chunk):
+            take = min(len(chunk) - pos, self.nperseg - self.segment_fill)
+            self.segment[self.segment_fill:self.segment_fill + take] = chunk[pos:pos + take]
+            self.segment_bad |= ~ok
+            self.segment_fill += take
+            pos += take
+            if self.segment_fill == self.nperseg:
+                seg = self.segment - self.segment.mean(axis=0)
+                spec = np.abs(np.fft.rfft(seg * self.window[:, np.newaxis], axis=0)) ** 2
+                spec /= self.window_norm
+                spec[1:-1] *= 2.
+                seg_time = self.nperseg / self.sample_freq
+                alpha = 1. - np.exp(-seg_time / self.tau)
+                good = ~self.segment_bad
+                self.psd[:, good] += alpha * (spec[:, good] - self.psd[:, good])
+                self.segment_bad[:] = False
+                self.segment_fill = 0
+
+    def _publish(self, now):
+        elapsed = now - self.last_publish
+        std = np.sqrt(self.var)
+        line_power = self.psd[self.line_bins].sum(axis=0) * self.freq_step
+        drift = (self.mean - self.last_publish_mean) / elapsed
+
+        status = np.full(len(self.labels), STATUS_OK, dtype=object)
+        if self.drift_rate is not None:
+            status[np.abs(drift) > self.drift_rate] = STATUS_DRIFT
+        if self.line_power is not None:
+            status[line_power > self.line_power] = STATUS_LINE_NOISE
+        if self.noise_std is not None:
+            status[std > self.noise_std] = STATUS_NOISY
+        status[std < self.flat_std] = STATUS_FLAT
+        if self.saturation is not None:
+            status[self.peak >= self.saturation] = STATUS_SATURATED
+        status[self.no_data] = STATUS_NO_DATA
+
+        snapshot = {'time': time.time(),
+                    'sample': self.n_samples,
+                    'labels': self.labels,
+                    'mean': self.mean.copy(),
+                    'std': std,
+                    'peak': self.peak.copy(),
+                    'drift': drift,
+                    'line_power': line_power,
+                    'status': list(status)}
+        with self.snapshot_lock:
+            self.snapshot = snapshot
+        changed = [i for i, s in enumerate(status) if s != self.status[i]]
+        self.status = list(status)
+        if changed and self.event_marker is not None:
+            self._put_events(changed)
+        for callback in self.on_status:
+            callback(snapshot)
+
+        self.peak[:] = 0.
+        self.no_data[:] = False
+        self.last_publish = now
+        self.last_publish_mean[:] = self.mean
+
+    def _put_events(self, channels):
+        for ch_i in channels:
+            self.event_marker.mark_sample('quality', self.labels[ch_i] + ':' + self.status[ch_i],
+                                          self.n_samples - 1)
+
+    def get_snapshot(self):
+        with self.snapshot_lock:
+            return self.snapshot
+
+    def bad_channels(self):
+        return [label for label, status in zip(self.labels, self.status)
+                if status != STATUS_OK]
+
@@ -0,0 +1,236 @@
+"""
+Min/max/mean overview of a recording at a few decimation levels (10x,
+100x and 1000x by default), kept up to date chunk by chunk so long
+recordings can be drawn at any zoom without reading every sample.
+
+A pyramid written beside a recording is a JSON description plus one file
+per level holding float32 (min, max, mean) x channels per bin:
+
+    <base>.overview.json, <base>.overview-10.bin, <base>.overview-100.bin, ...
+
+Without a base the levels are kept in memory, in rings holding the last
+'memory_seconds' of the recording only.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+log = logging.getLogger('fieldline_client.overview')
+
+
+def reduce_bins(mins, maxs, means, group):
+    """Merge every 'group' consecutive bins (the last one may be shorter)."""
+    starts = np.arange(0, len(mins), group)
+    counts = np.diff(np.append(starts, len(mins)))[:, None]
+    return (np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts),
+            np.add.reduceat(means, starts) / counts)
+
+
+class _MemoryLevel:
+
+    # bins 0 to size-1 were appended, the last max_bins of them are kept
+
+    def __init__(self, n_channels, max_bins):
+        self.max_bins = max(int(max_bins), 1)
+        self.bins = np.empty((min(1024, self.max_bins), 3, n_channels), dtype=np.float32)
+        self.size = 0
+
+    @property
+    def oldest(self):
+        return max(self.size - self.max_bins, 0)
+
+    def append(self, bins):
+        if len(bins) > self.max_bins:
+            self.size += len(bins) - self.max_bins
+            bins = bins[-self.max_bins:]
+        if self.size + len(bins) > len(self.bins) and len(self.bins) < self.max_bins:
+            # still growing, so nothing has wrapped around yet
+            grown = np.empty((min(2 * (self.size + len(bins)), self.max_bins),) +
+                             self.bins.shape[1:], dtype=np.float32)
+            grown[:self.size] = self.bins[:self.size]
+            self.bins = grown
+        self.bins[np.arange(self.size, self.size + len(bins)) % len(self.bins)] = bins
+        self.size += len(bins)
+
+    def read(self, start, stop):
+        start = max(start, self.oldest)
+        return self.bins[np.arange(start, max(min(stop, self.size), start)) % len(self.bins)]
+
+    def close(self):
+        pass
+
+
+class _FileLevel:
+
+    oldest = 0
+
+    def __init__(self, fname, n_channels, mode='ab'):
+        self.fname = fname
+        self.n_channels = n_channels
+        self.fid = open(fname, mode) if mode is not None else None
+        self.size = os.path.getsize(fname) // (12 * n_channels)
+
+    def append(self, bins):
+        self.fid.write(np.ascontiguousarray(bins, dtype='<f4').tobytes())
+        self.size += len(bins)
+
+    def read(self, start, stop):
+        if self.fid is not None:
+            self.fid.flush()
+        stop = min(stop, self.size)
+        if stop <= start:
+            return np.empty((0, 3, self.n_channels), dtype=np.float32)
+        data = np.memmap(self.fname, dtype='<f4', mode='r', shape=(self.size, 3, self.n_channels))
+        return np.array(data[start:stop])
+
+    def close(self):
+        if self.fid is not None:
+            self.fid.close()
+            self.fid = None
+
+
+class OverviewPyramid:
+
+    """
+    OverviewPyramid(labels, sample_freq [, factors, base, memory_seconds])
+    -- overview of the chunks given to update(). With 'base' the levels are
+    written to files beside it (see module doc), otherwise the last
+    'memory_seconds' are kept in memory. Every factor must be a multiple of
+    the one before.
+    """
+
+    def __init__(self, labels, sample_freq, factors=(10, 100, 1000), base=None,
+                 memory_seconds=600.):
+        factors = sorted(factors)
+        if any(f % g for f, g in zip(factors[1:], factors[:-1])):
+            raise ValueError('Every overview factor must divide the next one')
+        self.labels = list(labels)
+        self.sample_freq = float(sample_freq)
+        self.factors = factors
+        self.base = base
+        n_channels = len(self.labels)
+        self.memory_seconds = memory_seconds
+        self.wrapped = False
+        if base is None:
+            self.levels = [_MemoryLevel(n_channels, np.ceil(memory_seconds * self.sample_freq / f))
+                           for f in factors]
+        else:
+            with open(base + '.overview.json', 'w') as fid:
+                json.dump({'labels': self.labels, 'sample_freq': self.sample_freq,
+                           'factors': factors}, fid)
+            self.levels = [_FileLevel(level_name(base, f), n_channels, 'wb') for f in factors]
+        # samples / bins not yet making up a whole bin of the next level
+        self.pending = [np.empty((0, n_channels), dtype=np.float32)] + \
+                       [np.empty((0, 3, n_channels), dtype=np.float32) for _ in factors[1:]]
+        self.n_samples = 0
+
+    def update(self, chunk):
+        self.n_samples += len(chunk)
+        data = np.concatenate((self.pending[0], chunk)) if len(self.pending[0]) else chunk
+        n_bins = len(data) // self.factors[0]
+        used = n_bins * self.factors[0]
+        self.pending[0] = np.array(data[used:], dtype=np.float32)
+        if not n_bins:
+            return
+        groups = data[:used].reshape(n_bins, self.factors[0], -1)
+        bins = np.stack((groups.min(axis=1), groups.max(axis=1), groups.mean(axis=1)), axis=1)
+        self.add_bins(0, bins.astype(np.float32))
+        if not self.wrapped and self.levels[0].oldest > 0:
+            self.wrapped = True
+            log.warning("The overview is kept in memory, for the last %g s of the recording "
+                        "only; give it a file to keep all of it", self.memory_seconds)
+
+    def add_bins(self, level, bins):
+        self.levels[level].append(bins)
+        if level + 1 == len(self.factors):
+            return
+        ratio = self.factors[level + 1] // self.factors[level]
+        if len(self.pending[level + 1]):
+            bins = np.concatenate((self.pending[level + 1], bins))
+        n_bins = len(bins) // ratio
+        used = n_bins * ratio
+        self.pending[level + 1] = bins[used:]
+        if n_bins:
+            groups = bins[:used].reshape(n_bins, ratio, 3, -1)
+            self.add_bins(level + 1, np.stack((groups[:, :, 0].min(axis=1),
+                                               groups[:, :, 1].max(axis=1),
+                                               groups[:, :, 2].mean(axis=1)), axis=1))
+
+    def close(self):
+        for level in self.levels:
+            level.close()
+
+    def query(self, start, stop, width, picks=None):
+        """
+        query(start, stop, width [, picks]) -- overview of the time span
+        start to stop (s from the first sample) for a 'width' pixel wide
+        trace: {'factor', 'time', 'min', 'max', 'mean'}, with at most
+        'width' columns from the coarsest level that still has a bin per
+        pixel. Returns None when the span is so short that the samples
+        themselves should be drawn.
+        """
+        samples_per_pixel = (stop - start) * self.sample_freq / max(width, 1)
+        usable = [i for i, f in enumerate(self.factors) if f <= samples_per_pixel]
+        if not usable:
+            return None
+        level = usable[-1]
+        factor = self.factors[level]
+        first = max(int(start * self.sample_freq) // factor, self.levels[level].oldest)
+        last = int(np.ceil(stop * self.sample_freq / factor))
+        bins = self.levels[level].read(first, last)
+        if picks is not None:
+            bins = bins[:, :, picks]
+        group = max(int(np.ceil(len(bins) / float(width))), 1)
+        if not len(bins):
+            mins = maxs = means = bins[:, 0]
+        else:
+            mins, maxs, means = reduce_bins(bins[:, 0], bins[:, 1], bins[:, 2], group)
+        times = (first + np.arange(len(mins)) * group) * factor / self.sample_freq
+        return {'factor': factor * group, 'time': times, 'min': mins, 'max': maxs, 'mean': means}
+
+
+def level_name(base, factor):
+    return '%s.overview-%i.bin' % (base, factor)
+
+
+def read_overview(base):
+    """read_overview(base) -- open the pyramid written beside 'base' for queries."""
+    with open(base + '.overview.json', 'r') as fid:
+        info = json.load(fid)
+    pyramid = OverviewPyramid.__new__(OverviewPyramid)
+    pyramid.labels = info['labels']
+    pyramid.sample_freq = info['sample_freq']
+    pyramid.factors = info['factors']
+    pyramid.base = base
+    pyramid.memory_seconds = None
+    pyramid.wrapped = False
+    pyramid.levels = [_FileLevel(level_name(base, f), len(pyramid.labels), None)
+                      for f in pyramid.factors]
+    pyramid.pending = None
+    pyramid.n_samples = None
+    return pyramid
+
+
+class OverviewSink:
+
+    """Sink that keeps an OverviewPyramid of what it is given."""
+
+    def __init__(self, factors=(10, 100, 1000), base=None, memory_seconds=600.):
+        self.factors = factors
+        self.base = base
+        self.memory_seconds = memory_seconds
+        self.pyramid = None
+
+    def open(self, labels, sample_freq):
+        self.pyramid = OverviewPyramid(labels, sample_freq, self.factors, self.base,
+                                       self.memory_seconds)
+
+    def write(self, chunk):
+        self.pyramid.update(chunk)
+
+    def close(self):
+        if self.pyramid is not None:
+            self.pyramid.close()
@@ -1,132 +1,173 @@
+"""
+Phantom FieldLine device: a connector and service with the API of
+fieldline_api that make up chassis, sensors and data, so the client runs
+without hardware (config.use_phantom = True).
+"""
+
 import queue
-from collections import defaultdict
+import threading
+import time
 
 import numpy
 
-from .config import working_sensors
-
-class PhantomConnector:
+from .channel_map import DATA_TYPE_BZ, channel_key
+from .sensor_callbacks import SensorCallbacks
 
-    def __init__(self):
-        self.new_sensors = {}
-        self.sensors_ready = {}
+# Device timestamp ticks per sample at 1 kHz
+TICKS_PER_SAMPLE = 25
 
-        self.restarted_sensors = {}
-        self.coarse_zero_sensors = {}
-        self.fine_zero_sensors = {}
 
-        self.chassis_id_to_name = {}
-        self.all_sensors_list = []
-        self.valid_sensors_list = []
+class PhantomConnector(SensorCallbacks):
 
+    def __init__(self):
+        super().__init__()
         self.data_q = queue.Queue()
 
-        self.moc_sensor_list = working_sensors
-        self.moc_chassis_ip_list = []
-        self.moc_sensors = {}
-
-    def moc_add_data_chunk(self):
-        self.data_q.put(generate_data_chunk(10))
-
-    def generate_data(self):
-        return numpy.random.randint(-150000, high = 150000, size = 1)
-
-    def moc_sample(self, channel_list):
-        sensors_dict = {}
-        data_type = 28
-        for chassis_i in channel_list:
-            channel_num_accumulator = 0
-            for i in range(channel_list[chassis_i].len()):
-                key = str(chassis_i).zfill(2) + ':' + str(channel_list[chassis_i][i]).zfill(2)
-                sensors_dict[key + ':' + str(28).zfill(2)] = {'data': generate_data(),
-                                            'sensor': key,
-                                            'idx': channel_num_accumulator,
-                                            'sensor_id': channel_list[chassis_i][i],
-                                            'data_type': 28,
-                                            'calibration': 1.0e-16,
-                                            'timestamp': 18528226
-                channel_num_accumulator += 1
-        return sensors_dict
-    
-
-    def generate_data_chunk(self, num_samples):
-        data = []
-        for i in range(num_samples):
-            data.append(moc_sample(moc_sensor_list))
-        return [data]
-
-
-{'00:01:28': {'data':,
- 'sensor': '00:01',
- 'idx': 0,
- 'sensor_id': 1,
- 'data_type': 28,
- 'calibration': 1.0743782446585797e-16,
- 'timestamp': 18528226},
-                                      '00:03:28': {'data': 109240, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528226}, 
-                                      '00:04:28': {'data': 11411, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528226}, '00:05:28': {'data': -301651, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528226}, '00:06:28': {'data': -194838, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528226}, '00:07:28': {'data': -298430, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528226}, '00:08:28': {'data': -180763, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528226}, '00:09:28': {'data': 144527, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528226}, '00:10:28': {'data': -23042, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528226}, '00:11:28': {'data': 86592, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528226}, '00:12:28': {'data': -184812, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528226}, '00:13:28': {'data': 142413, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528226}, '00:14:28': {'data': 107340, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528226}, '00:15:28': {'data': -100598, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528226}, '01:01:28': {'data': -55573, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528226}, '01:02:28': {'data': -130618, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528226}, '01:03:28': {'data': -195362, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528226}, '01:04:28': {'data': -232846, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528226}, '01:05:28': {'data': -128818, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528226}, '01:06:28': {'data': 116427, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528226}, '01:07:28': {'data': -98988, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528226}, '01:08:28': {'data': -98457, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528226}, '01:09:28': {'data': -44456, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528226}, '01:10:28': {'data': -67177, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528226}, '01:11:28': {'data': 184808, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528226}, '01:12:28': {'data': -113330, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528226}, '01:13:28': {'data': -497034, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528226}, '01:14:28': {'data': 302227, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528226}}))
-        
-        
-        
-        
-        data.append(defaultdict(dict,{'00:01:28': {'data': -30901, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528251}, '00:03:28': {'data': 110134, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528251}, '00:04:28': {'data': 9964, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528251}, '00:05:28': {'data': -299719, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528251}, '00:06:28': {'data': -194096, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528251}, '00:07:28': {'data': -298422, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528251}, '00:08:28': {'data': -182223, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528251}, '00:09:28': {'data': 142705, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528251}, '00:10:28': {'data': -22665, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528251}, '00:11:28': {'data': 89822, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528251}, '00:12:28': {'data': -185232, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528251}, '00:13:28': {'data': 145726, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528251}, '00:14:28': {'data': 106450, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528251}, '00:15:28': {'data': -99262, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528251}, '01:01:28': {'data': -55076, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528251}, '01:02:28': {'data': -132713, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528251}, '01:03:28': {'data': -197943, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528251}, '01:04:28': {'data': -231303, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528251}, '01:05:28': {'data': -131576, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528251}, '01:06:28': {'data': 116315, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528251}, '01:07:28': {'data': -99510, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528251}, '01:08:28': {'data': -95096, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528251}, '01:09:28': {'data': -44464, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528251}, '01:10:28': {'data': -66632, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528251}, '01:11:28': {'data': 184838, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528251}, '01:12:28': {'data': -111981, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528251}, '01:13:28': {'data': -500104, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528251}, '01:14:28': {'data': 302748, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528251}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -28565, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528276}, '00:03:28': {'data': 110596, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528276}, '00:04:28': {'data': 10333, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528276}, '00:05:28': {'data': -300641, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528276}, '00:06:28': {'data': -190144, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528276}, '00:07:28': {'data': -300469, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528276}, '00:08:28': {'data': -181131, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528276}, '00:09:28': {'data': 144237, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528276}, '00:10:28': {'data': -24865, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528276}, '00:11:28': {'data': 90046, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528276}, '00:12:28': {'data': -182759, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528276}, '00:13:28': {'data': 145391, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528276}, '00:14:28': {'data': 107900, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528276}, '00:15:28': {'data': -98750, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528276}, '01:01:28': {'data': -52587, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528276}, '01:02:28': {'data': -133906, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528276}, '01:03:28': {'data': -199307, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528276}, '01:04:28': {'data': -229456, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528276}, '01:05:28': {'data': -131901, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528276}, '01:06:28': {'data': 114247, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528276}, '01:07:28': {'data': -101172, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528276}, '01:08:28': {'data': -97226, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528276}, '01:09:28': {'data': -42203, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528276}, '01:10:28': {'data': -65853, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528276}, '01:11:28': {'data': 180635, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528276}, '01:12:28': {'data': -112506, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528276}, '01:13:28': {'data': -504411, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528276}, '01:14:28': {'data': 303948, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528276}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -28464, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528301}, '00:03:28': {'data': 110341, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528301}, '00:04:28': {'data': 8194, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528301}, '00:05:28': {'data': -299765, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528301}, '00:06:28': {'data': -192570, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528301}, '00:07:28': {'data': -295452, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528301}, '00:08:28': {'data': -180794, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528301}, '00:09:28': {'data': 144544, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528301}, '00:10:28': {'data': -23210, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528301}, '00:11:28': {'data': 89844, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528301}, '00:12:28': {'data': -182296, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528301}, '00:13:28': {'data': 143281, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528301}, '00:14:28': {'data': 105088, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528301}, '00:15:28': {'data': -100221, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528301}, '01:01:28': {'data': -53932, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528301}, '01:02:28': {'data': -134442, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528301}, '01:03:28': {'data': -198541, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528301}, '01:04:28': {'data': -227283, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528301}, '01:05:28': {'data': -131879, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528301}, '01:06:28': {'data': 112081, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528301}, '01:07:28': {'data': -100423, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528301}, '01:08:28': {'data': -98079, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528301}, '01:09:28': {'data': -41054, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528301}, '01:10:28': {'data': -65249, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528301}, '01:11:28': {'data': 179925, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528301}, '01:12:28': {'data': -114251, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528301}, '01:13:28': {'data': -500610, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528301}, '01:14:28': {'data': 300891, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528301}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -26865, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528326}, '00:03:28': {'data': 110310, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528326}, '00:04:28': {'data': 5201, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528326}, '00:05:28': {'data': -298314, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528326}, '00:06:28': {'data': -192485, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528326}, '00:07:28': {'data': -296356, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528326}, '00:08:28': {'data': -179117, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528326}, '00:09:28': {'data': 144396, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528326}, '00:10:28': {'data': -22708, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528326}, '00:11:28': {'data': 91398, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528326}, '00:12:28': {'data': -183330, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528326}, '00:13:28': {'data': 141530, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528326}, '00:14:28': {'data': 106920, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528326}, '00:15:28': {'data': -101577, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528326}, '01:01:28': {'data': -52165, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528326}, '01:02:28': {'data': -132052, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528326}, '01:03:28': {'data': -192994, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528326}, '01:04:28': {'data': -228125, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528326}, '01:05:28': {'data': -131896, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528326}, '01:06:28': {'data': 114037, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528326}, '01:07:28': {'data': -98796, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528326}, '01:08:28': {'data': -98039, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528326}, '01:09:28': {'data': -44097, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528326}, '01:10:28': {'data': -66721, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528326}, '01:11:28': {'data': 178502, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528326}, '01:12:28': {'data': -112429, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528326}, '01:13:28': {'data': -506362, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528326}, '01:14:28': {'data': 300557, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528326}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -29539, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528351}, '00:03:28': {'data': 111369, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528351}, '00:04:28': {'data': 9644, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528351}, '00:05:28': {'data': -298303, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528351}, '00:06:28': {'data': -192517, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528351}, '00:07:28': {'data': -297654, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528351}, '00:08:28': {'data': -180438, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528351}, '00:09:28': {'data': 141131, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528351}, '00:10:28': {'data': -24936, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528351}, '00:11:28': {'data': 91199, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528351}, '00:12:28': {'data': -181827, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528351}, '00:13:28': {'data': 142759, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528351}, '00:14:28': {'data': 107438, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528351}, '00:15:28': {'data': -98984, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528351}, '01:01:28': {'data': -54170, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528351}, '01:02:28': {'data': -133340, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528351}, '01:03:28': {'data': -192139, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528351}, '01:04:28': {'data': -230681, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528351}, '01:05:28': {'data': -133079, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528351}, '01:06:28': {'data': 116494, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528351}, '01:07:28': {'data': -98756, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528351}, '01:08:28': {'data': -97459, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528351}, '01:09:28': {'data': -44068, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528351}, '01:10:28': {'data': -64967, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528351}, '01:11:28': {'data': 177727, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528351}, '01:12:28': {'data': -111663, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528351}, '01:13:28': {'data': -506850, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528351}, '01:14:28': {'data': 299049, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528351}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -33597, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528376}, '00:03:28': {'data': 110655, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528376}, '00:04:28': {'data': 10014, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528376}, '00:05:28': {'data': -298339, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528376}, '00:06:28': {'data': -192912, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528376}, '00:07:28': {'data': -297804, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528376}, '00:08:28': {'data': -180233, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528376}, '00:09:28': {'data': 142411, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528376}, '00:10:28': {'data': -22075, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528376}, '00:11:28': {'data': 89844, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528376}, '00:12:28': {'data': -184869, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528376}, '00:13:28': {'data': 144868, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528376}, '00:14:28': {'data': 107624, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528376}, '00:15:28': {'data': -97435, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528376}, '01:01:28': {'data': -52554, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528376}, '01:02:28': {'data': -132654, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528376}, '01:03:28': {'data': -195161, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528376}, '01:04:28': {'data': -230168, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528376}, '01:05:28': {'data': -131747, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528376}, '01:06:28': {'data': 116761, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528376}, '01:07:28': {'data': -99894, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528376}, '01:08:28': {'data': -98394, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528376}, '01:09:28': {'data': -43804, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528376}, '01:10:28': {'data': -64583, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528376}, '01:11:28': {'data': 181711, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528376}, '01:12:28': {'data': -112044, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528376}, '01:13:28': {'data': -507069, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528376}, '01:14:28': {'data': 299482, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528376}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -33030, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528401}, '00:03:28': {'data': 110509, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528401}, '00:04:28': {'data': 7973, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528401}, '00:05:28': {'data': -299810, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528401}, '00:06:28': {'data': -192342, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528401}, '00:07:28': {'data': -298108, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528401}, '00:08:28': {'data': -180398, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528401}, '00:09:28': {'data': 141539, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528401}, '00:10:28': {'data': -23735, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528401}, '00:11:28': {'data': 88418, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528401}, '00:12:28': {'data': -183561, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528401}, '00:13:28': {'data': 148644, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528401}, '00:14:28': {'data': 106927, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528401}, '00:15:28': {'data': -98937, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528401}, '01:01:28': {'data': -52440, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528401}, '01:02:28': {'data': -131063, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528401}, '01:03:28': {'data': -200079, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528401}, '01:04:28': {'data': -231456, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528401}, '01:05:28': {'data': -129833, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528401}, '01:06:28': {'data': 113888, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528401}, '01:07:28': {'data': -101879, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528401}, '01:08:28': {'data': -100503, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528401}, '01:09:28': {'data': -46575, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528401}, '01:10:28': {'data': -65649, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528401}, '01:11:28': {'data': 176568, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528401}, '01:12:28': {'data': -112188, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528401}, '01:13:28': {'data': -508535, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528401}, '01:14:28': {'data': 299401, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528401}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -31470, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528426}, '00:03:28': {'data': 106719, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528426}, '00:04:28': {'data': 10892, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528426}, '00:05:28': {'data': -300841, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528426}, '00:06:28': {'data': -190189, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528426}, '00:07:28': {'data': -297656, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528426}, '00:08:28': {'data': -179985, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528426}, '00:09:28': {'data': 142540, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528426}, '00:10:28': {'data': -23235, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528426}, '00:11:28': {'data': 89474, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528426}, '00:12:28': {'data': -182079, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528426}, '00:13:28': {'data': 146868, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528426}, '00:14:28': {'data': 106011, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528426}, '00:15:28': {'data': -98914, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528426}, '01:01:28': {'data': -53698, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528426}, '01:02:28': {'data': -132155, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528426}, '01:03:28': {'data': -200649, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528426}, '01:04:28': {'data': -228940, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528426}, '01:05:28': {'data': -132083, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528426}, '01:06:28': {'data': 114643, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528426}, '01:07:28': {'data': -102531, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528426}, '01:08:28': {'data': -97036, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528426}, '01:09:28': {'data': -46455, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528426}, '01:10:28': {'data': -63731, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528426}, '01:11:28': {'data': 179218, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528426}, '01:12:28': {'data': -108313, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528426}, '01:13:28': {'data': -502915, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528426}, '01:14:28': {'data': 299632, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528426}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -32538, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528451}, '00:03:28': {'data': 109367, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528451}, '00:04:28': {'data': 8433, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528451}, '00:05:28': {'data': -300259, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528451}, '00:06:28': {'data': -192411, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528451}, '00:07:28': {'data': -297783, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528451}, '00:08:28': {'data': -179439, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528451}, '00:09:28': {'data': 142827, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528451}, '00:10:28': {'data': -21655, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528451}, '00:11:28': {'data': 88002, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528451}, '00:12:28': {'data': -181363, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528451}, '00:13:28': {'data': 143906, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528451}, '00:14:28': {'data': 106568, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528451}, '00:15:28': {'data': -98074, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528451}, '01:01:28': {'data': -52777, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528451}, '01:02:28': {'data': -134624, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528451}, '01:03:28': {'data': -196705, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528451}, '01:04:28': {'data': -228856, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528451}, '01:05:28': {'data': -133127, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528451}, '01:06:28': {'data': 116210, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528451}, '01:07:28': {'data': -101146, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528451}, '01:08:28': {'data': -93311, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528451}, '01:09:28': {'data': -44855, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528451}, '01:10:28': {'data': -65573, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528451}, '01:11:28': {'data': 183359, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528451}, '01:12:28': {'data': -108711, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528451}, '01:13:28': {'data': -505047, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528451}, '01:14:28': {'data': 301469, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528451}}))
-        data.append(defaultdict(dict,{'00:01:28': {'data': -34310, 'sensor': '00:01', 'idx': 0, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.0743782446585797e-16, 'timestamp': 18528476}, '00:03:28': {'data': 108701, 'sensor': '00:03', 'idx': 1, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.527923955324916e-16, 'timestamp': 18528476}, '00:04:28': {'data': 7704, 'sensor': '00:04', 'idx': 2, 'sensor_id': 4, 'data_type': 28, 'calibration': 1.168896335136972e-16, 'timestamp': 18528476}, '00:05:28': {'data': -298343, 'sensor': '00:05', 'idx': 3, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.3289485044765923e-16, 'timestamp': 18528476}, '00:06:28': {'data': -193334, 'sensor': '00:06', 'idx': 4, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.1479352644050167e-16, 'timestamp': 18528476}, '00:07:28': {'data': -296867, 'sensor': '00:07', 'idx': 5, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.6910332518596343e-16, 'timestamp': 18528476}, '00:08:28': {'data': -179678, 'sensor': '00:08', 'idx': 6, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.3600076144656314e-16, 'timestamp': 18528476}, '00:09:28': {'data': 143101, 'sensor': '00:09', 'idx': 7, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9153998387908856e-16, 'timestamp': 18528476}, '00:10:28': {'data': -21902, 'sensor': '00:10', 'idx': 8, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.5981280312268224e-16, 'timestamp': 18528476}, '00:11:28': {'data': 88395, 'sensor': '00:11', 'idx': 9, 'sensor_id': 11, 'data_type': 28, 'calibration': 9.265629220799257e-17, 'timestamp': 18528476}, '00:12:28': {'data': -182950, 'sensor': '00:12', 'idx': 10, 'sensor_id': 12, 'data_type': 28, 'calibration': 9.665903242702647e-17, 'timestamp': 18528476}, '00:13:28': {'data': 144440, 'sensor': '00:13', 'idx': 11, 'sensor_id': 13, 'data_type': 28, 'calibration': 1.0929164209770771e-16, 'timestamp': 18528476}, '00:14:28': {'data': 109881, 'sensor': '00:14', 'idx': 12, 'sensor_id': 14, 'data_type': 28, 'calibration': 1.681767717268297e-15, 'timestamp': 18528476}, '00:15:28': {'data': -98981, 'sensor': '00:15', 'idx': 13, 'sensor_id': 15, 'data_type': 28, 'calibration': 2.1625370536244967e-16, 'timestamp': 18528476}, '01:01:28': {'data': -53254, 'sensor': '01:01', 'idx': 14, 'sensor_id': 1, 'data_type': 28, 'calibration': 1.4809820511325726e-16, 'timestamp': 18528476}, '01:02:28': {'data': -132157, 'sensor': '01:02', 'idx': 15, 'sensor_id': 2, 'data_type': 28, 'calibration': 1.6383468760981307e-16, 'timestamp': 18528476}, '01:03:28': {'data': -194985, 'sensor': '01:03', 'idx': 16, 'sensor_id': 3, 'data_type': 28, 'calibration': 1.3290873384706032e-16, 'timestamp': 18528476}, '01:04:28': {'data': -229758, 'sensor': '01:04', 'idx': 17, 'sensor_id': 4, 'data_type': 28, 'calibration': 8.672480502850143e-17, 'timestamp': 18528476}, '01:05:28': {'data': -131320, 'sensor': '01:05', 'idx': 18, 'sensor_id': 5, 'data_type': 28, 'calibration': 1.0196196822009573e-16, 'timestamp': 18528476}, '01:06:28': {'data': 116225, 'sensor': '01:06', 'idx': 19, 'sensor_id': 6, 'data_type': 28, 'calibration': 2.0922121431787085e-16, 'timestamp': 18528476}, '01:07:28': {'data': -101644, 'sensor': '01:07', 'idx': 20, 'sensor_id': 7, 'data_type': 28, 'calibration': 1.2970938452616242e-16, 'timestamp': 18528476}, '01:08:28': {'data': -96639, 'sensor': '01:08', 'idx': 21, 'sensor_id': 8, 'data_type': 28, 'calibration': 1.2295037924442832e-16, 'timestamp': 18528476}, '01:09:28': {'data': -43254, 'sensor': '01:09', 'idx': 22, 'sensor_id': 9, 'data_type': 28, 'calibration': 1.9424769674855434e-16, 'timestamp': 18528476}, '01:10:28': {'data': -66293, 'sensor': '01:10', 'idx': 23, 'sensor_id': 10, 'data_type': 28, 'calibration': 1.0886136259539232e-16, 'timestamp': 18528476}, '01:11:28': {'data': 185038, 'sensor': '01:11', 'idx': 24, 'sensor_id': 11, 'data_type': 28, 'calibration': 7.234974932364459e-17, 'timestamp': 18528476}, '01:12:28': {'data': -108245, 'sensor': '01:12', 'idx': 25, 'sensor_id': 12, 'data_type': 28, 'calibration': 1.1588615093410706e-16, 'timestamp': 18528476}, '01:13:28': {'data': -510687, 'sensor': '01:13', 'idx': 26, 'sensor_id': 13, 'data_type': 28, 'calibration': 8.363295610001092e-17, 'timestamp': 18528476}, '01:14:28': {'data': 301166, 'sensor': '01:14', 'idx': 27, 'sensor_id': 14, 'data_type': 28, 'calibration': 8.578093901001922e-17, 'timestamp': 18528476}}))
-
-        data.append("")
-
-class PhantomService:
+    def callback_data_available(self, sample_list):
+        # (arrival time, samples), like FieldLineConnector
+        self.data_q.put((time.monotonic(), sample_list))
 
-        def __init__(self, connector, prefix):
-            self.connector = connector
-            self.prefix = prefix
-            self.is_running = False
 
-        def turn_off_sensors(self, chassis, sensor):
-            pass
+class PhantomDataSource:
 
-        def is_service_running(self):
-            return self.is_running
+    """Data types streamed by the phantom, as set by start_datatype()."""
 
-        def start(self):
-            self.is_running = True
-
-        def stop(self):
-            self.is_running = False
-
-        def restart_sensor(self, chassis, sensor):
-            self.connector.restarted_sensors = self.connector.moc_sensors
-
-        def coarse_zero_sensor(self, chassis, sensor):
-            self.connector.coarse_zero_sensors = self.connector.moc_sensors
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data_types = {}
 
-        def fine_zero_sensor(self, chassis, sensor):
-            self.connector.fine_zero_sensors = self.connector.moc_sensors
+    def start_datatype(self, chassis_id, sensor_list, datatype, freq):
+        with self.lock:
+            for sensor in sensor_list:
+                self.data_types[(chassis_id, sensor, datatype)] = freq
 
-        def start_data(self):
-            pass
+    def stop_datatype(self, chassis_id, sensor_list, datatype):
+        with self.lock:
+            for sensor in sensor_list:
+                self.data_types.pop((chassis_id, sensor, datatype), None)
 
-        def stop_data(self):
-            pass
 
-        def connect(self, chassis_ip_list):
-            self.connector.moc_chassis_ip_list = chassis_ip_list
-            index_list = []
-            i = 0
-            for ip in chassis_ip_list:
-                index_list.append(i)
-                i += 1
-            self.moc_sensors = dict(zip(index_list, self.connector.moc_sensor_list))
-        
-        def get_sensor_state(self, chassis, sensor):
-            pass
+class PhantomService:
 
-        def get_version(self, chassis):
-            pass
+    """
+    PhantomService(connector, prefix [, sensors, sample_freq, packet_size,
+    stage_delay, thread_setup, speed]) -- 'sensors' is {chassis: sensors};
+    connect() reports one chassis per ip. Data is sent in packets of
+    'packet_size' samples at 'sample_freq', paced by the host clock ('speed'
+    times faster than real time), and every tuning step completes
+    'stage_delay' seconds after it is asked for.
+    """
+
+    def __init__(self, connector, prefix="", sensors=None, sample_freq=1000,
+                 packet_size=10, stage_delay=.01, thread_setup=None, speed=1.):
+        self.connector = connector
+        self.prefix = prefix
+        self.sensors = dict(sensors) if sensors is not None else {}
+        self.sample_freq = sample_freq
+        self.packet_size = packet_size
+        self.stage_delay = stage_delay
+        self.speed = speed
+        # called first thing on the producer thread, e.g. to make it real-time
+        self.thread_setup = thread_setup
+        self.data_source = PhantomDataSource()
+        self.is_running = False
+        self.chassis_list = []
+        self.data_thread = None
+        self.data_flag = threading.Event()
+        # the device clock runs from the start of the service, data or not
+        self.clock_start = time.monotonic()
+        self.rng = numpy.random.default_rng()
+
+    def is_service_running(self):
+        return self.is_running
+
+    def start(self):
+        self.is_running = True
+
+    def stop(self):
+        self.stop_data()
+        self.is_running = False
+
+    def connect(self, ip_list):
+        self.chassis_list = list(range(len(ip_list)))
+        for chassis, ip in zip(self.chassis_list, ip_list):
+            self.connector.callback_chassis_connected('phantom-' + str(ip), chassis)
+            self.connector.callback_sensors_available(chassis, list(self.sensors.get(chassis, ())))
+        return self.chassis_list
+
+    def get_version(self, chassis):
+        return 'phantom'
+
+    def get_sensor_state(self, chassis, sensor):
+        return None
+
+    def turn_off_sensor(self, chassis, sensor):
+        pass
+
+    def _stage(self, begin, complete, chassis, sensor):
+        begin(chassis, sensor)
+        timer = threading.Timer(self.stage_delay, complete, (chassis, sensor))
+        timer.daemon = True
+        timer.start()
+
+    def restart_sensor(self, chassis, sensor):
+        self._stage(self.connector.callback_restart_begin,
+                    self.connector.callback_restart_complete, chassis, sensor)
+
+    def coarse_zero_sensor(self, chassis, sensor):
+        self._stage(self.connector.callback_coarse_zero_begin,
+                    self.connector.callback_coarse_zero_complete, chassis, sensor)
+
+    def fine_zero_sensor(self, chassis, sensor):
+        self._stage(self.connector.callback_fine_zero_begin,
+                    self.connector.callback_fine_zero_complete, chassis, sensor)
+
+    def start_data(self):
+        if self.data_thread is not None:
+            return
+        self.data_flag.set()
+        self.data_thread = threading.Thread(target=self.data_producer, daemon=True)
+        self.data_thread.start()
+
+    def stop_data(self):
+        self.data_flag.clear()
+        if self.data_thread is not None:
+            self.data_thread.join()
+            self.data_thread = None
+
+    def channels(self):
+        """[(key, every, calibration)] of the streamed channels."""
+        with self.data_source.lock:
+            data_types = dict(self.data_source.data_types)
+        channels = []
+        for chassis in self.chassis_list:
+            for sensor in self.sensors.get(chassis, ()):
+                data_types.setdefault((chassis, sensor, DATA_TYPE_BZ), self.sample_freq)
+        for (chassis, sensor, data_type), freq in sorted(data_types.items()):
+            every = max(int(round(self.sample_freq / freq)), 1)
+            calibration = self.rng.uniform(.7e-16, 2.2e-16)
+            channels.append((channel_key(chassis, sensor, data_type), every, calibration))
+        return channels
+
+    def data_producer(self):
+        if self.thread_setup is not None:
+            self.thread_setup()
+        channels = self.channels()
+        period = self.packet_size / (self.sample_freq * self.speed)
+        next_time = time.monotonic()
+        sample = int((next_time - self.clock_start) * self.sample_freq * self.speed)
+        while self.data_flag.is_set():
+            values = self.rng.integers(-150000, 150000, (self.packet_size, len(channels)))
+            packet = []
+            for i in range(self.packet_size):
+                timestamp = (sample + i) * TICKS_PER_SAMPLE
+                packet.append({key: {'data': int(values[i, ch]), 'calibration': calibration,
+                                     'timestamp': timestamp}
+                               for ch, (key, every, calibration) in enumerate(channels)
+                               if (sample + i) % every == 0})
+            sample += self.packet_size
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.connector.callback_data_available(packet)
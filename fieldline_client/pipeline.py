@@ -0,0 +1,116 @@
+"""
+Processing stages applied to every chunk between parse_data and putData.
+"""
+
+import numpy as np
+
+OUTPUT_REPLACE = 'replace'
+OUTPUT_APPEND = 'append'
+OUTPUT_SINK = 'sink'
+
+
+class Stage:
+
+    """
+    Base class for processing stages. Chunks are float32 arrays with
+    samples in rows. Subclasses implement transform(chunk), which returns
+    the stage result or None, and 'output' decides where the result goes:
+
+        'replace' -- the result replaces the chunk for the following stages
+        'append'  -- the result is added to the chunk as extra channels
+        'sink'    -- the result is written to 'sink', the chunk passes through
+    """
+
+    suffix = ''
+
+    def __init__(self, output=OUTPUT_SINK, sink=None):
+        if output not in (OUTPUT_REPLACE, OUTPUT_APPEND, OUTPUT_SINK):
+            raise ValueError('Unknown stage output: %s' % output)
+        if output == OUTPUT_SINK and sink is None:
+            raise ValueError('A sink is needed for stage output "sink"')
+        self.output = output
+        self.sink = sink
+        self.labels = []
+        self.sample_freq = 0.
+
+    def start(self, labels, sample_freq):
+        """
+        start(labels, sample_freq) -- prepare the stage for chunks with
+        the given channels and return the labels of the chunks it passes on.
+        """
+        self.labels = list(labels)
+        self.sample_freq = sample_freq
+        self.setup()
+        result_labels = self.result_labels()
+        if self.output == OUTPUT_SINK:
+            self.sink.open(result_labels, self.result_sample_freq())
+            return self.labels
+        if self.output == OUTPUT_APPEND:
+            return self.labels + [label + self.suffix for label in result_labels]
+        return result_labels
+
+    def stop(self):
+        if self.sink is not None:
+            self.sink.close()
+
+    def process(self, chunk):
+        result = self.transform(chunk)
+        if result is None:
+            return chunk
+        if self.output == OUTPUT_REPLACE:
+            return result
+        if self.output == OUTPUT_APPEND:
+            return np.hstack((chunk, result))
+        if len(result):
+            self.sink.write(result)
+        return chunk
+
+    def setup(self):
+        pass
+
+    def result_labels(self):
+        return list(self.labels)
+
+    def result_sample_freq(self):
+        return self.sample_freq
+
+    def transform(self, chunk):
+        return None
+
+
+class TapStage(Stage):
+
+    """Writes every chunk, as it comes, to its sink."""
+
+    def __init__(self, sink):
+        super().__init__(OUTPUT_SINK, sink)
+
+    def transform(self, chunk):
+        return chunk
+
+
+class Pipeline:
+
+    """Ordered list of stages, each one fed with the output of the previous."""
+
+    def __init__(self, stages=None):
+        self.stages = list(stages) if stages is not None else []
+        self.labels = []
+
+    def add(self, stage):
+        self.stages.append(stage)
+
+    def start(self, labels, sample_freq):
+        self.labels = list(labels)
+        for stage in self.stages:
+            self.labels = stage.start(self.labels, sample_freq)
+        return self.labels
+
+    def process(self, chunk):
+        for stage in self.stages:
+            chunk = stage.process(chunk)
+        return chunk
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
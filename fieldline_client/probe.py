@@ -0,0 +1,195 @@
+"""
+End-to-end latency probe: from the moment a packet reaches the client to
+the moment a FieldTrip reader can get its samples.
+
+The session records the arrival time of every sample index; a reader
+client blocks in wait() on the buffer and, whenever new samples show up,
+takes the difference. Runs offline against the phantom device:
+
+    python -m fieldline_client.probe --buffer buffer/linux/buffer
+"""
+
+import argparse
+import itertools
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from .FieldTrip import Client
+
+
+class ArrivalLog:
+
+    """Arrival time (time.monotonic()) of the last 'capacity' sample indices."""
+
+    def __init__(self, capacity=1 << 16):
+        self.times = np.full(capacity, np.nan)
+
+    def record(self, first_sample, n_samples, t):
+        idx = np.arange(first_sample, first_sample + n_samples) % len(self.times)
+        self.times[idx] = t
+
+    def get(self, start, stop):
+        return self.times[np.arange(start, stop) % len(self.times)]
+
+
+class LatencyHistogram:
+
+    """Counts of latencies in 'bin_width' s bins up to 'max_latency' s."""
+
+    def __init__(self, bin_width=1e-4, max_latency=.5):
+        self.bin_width = bin_width
+        self.counts = np.zeros(int(round(max_latency / bin_width)) + 1, dtype=np.int64)
+        self.n = 0
+        self.max = 0.
+
+    def add(self, latencies):
+        latencies = latencies[np.isfinite(latencies)]
+        if not len(latencies):
+            return
+        bins = np.minimum((latencies / self.bin_width).astype(int), len(self.counts) - 1)
+        self.counts += np.bincount(np.maximum(bins, 0), minlength=len(self.counts))
+        self.n += len(latencies)
+        self.max = max(self.max, latencies.max())
+
+    def percentile(self, q):
+        """q-th percentile, interpolated within its bin and never above the maximum."""
+        if not self.n:
+            return None
+        cum = np.cumsum(self.counts)
+        rank = q / 100. * self.n
+        i = int(np.searchsorted(cum, rank))
+        below = cum[i - 1] if i else 0
+        fraction = (rank - below) / self.counts[i] if self.counts[i] else 1.
+        return min((i + fraction) * self.bin_width, self.max)
+
+    def report(self, name=''):
+        if not self.n:
+            return name + ': no samples'
+        lines = [name + ': %i samples, median %.2f ms, 95%% %.2f ms, 99%% %.2f ms, max %.2f ms'
+                 % (self.n, self.percentile(50) * 1e3, self.percentile(95) * 1e3,
+                    self.percentile(99) * 1e3, self.max * 1e3)]
+        # coarse text histogram, 1 ms per row up to the 99th percentile
+        per_ms = int(round(1e-3 / self.bin_width))
+        rows = int(np.ceil(self.percentile(99) * 1e3)) + 1
+        counts = np.add.reduceat(self.counts, np.arange(0, len(self.counts), per_ms))[:rows]
+        scale = 50. / max(counts.max(), 1)
+        for ms, count in enumerate(counts):
+            lines.append('%4i ms %8i %s' % (ms, count, '#' * int(count * scale)))
+        return '\n'.join(lines)
+
+
+class LatencyProbe:
+
+    """
+    Reader on hostname:port that waits for new samples and adds their
+    latency against 'arrival_log' to 'histogram'.
+    """
+
+    def __init__(self, hostname, port, arrival_log, histogram=None, timeout=200):
+        self.hostname = hostname
+        self.port = port
+        self.arrival_log = arrival_log
+        self.histogram = histogram if histogram is not None else LatencyHistogram()
+        self.timeout = timeout
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.reader_thread, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def reader_thread(self):
+        client = Client()
+        client.connect(self.hostname, self.port)
+        seen = 0
+        try:
+            while self.running.is_set():
+                n_samples, _ = client.wait(seen, 0xFFFFFFFF, self.timeout)
+                t = time.monotonic()
+                if n_samples < seen:
+                    # header was written again
+                    seen = 0
+                if n_samples > seen:
+                    self.histogram.add(t - self.arrival_log.get(seen, n_samples))
+                    seen = n_samples
+        finally:
+            client.disconnect()
+
+
+def run_configuration(settings, duration):
+    """
+    run_configuration(settings, duration) -- stream for 'duration' seconds
+    with 'settings' and return the latency histogram.
+    """
+    from .session import AcquisitionSession
+    session = AcquisitionSession(settings)
+    try:
+        session.arrival_log = ArrivalLog()
+        if not session.init_fieldline_connection():
+            raise RuntimeError('No chassis connected')
+        session.init_fieldtrip_connection()
+        probe = LatencyProbe(settings.ft_IP, settings.ft_port, session.arrival_log)
+        probe.start()
+        session.init_acquisition()
+        time.sleep(duration)
+        session.stop_measurement()
+        time.sleep(.1)
+        probe.stop()
+    finally:
+        session.close()
+    return probe.histogram
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=5.,
+                        help='seconds per configuration')
+    parser.add_argument('--port', type=int, default=1972)
+    parser.add_argument('--hosts', default='localhost',
+                        help='comma separated buffer hosts (transports) to try')
+    parser.add_argument('--chunk-sizes', default='10',
+                        help='comma separated samples per packet')
+    parser.add_argument('--response', default='on',
+                        help='putData response modes to try (on, off); off needs a '
+                             'buffer server that handles PUT_DAT_NORESPONSE')
+    parser.add_argument('--hardware', action='store_true',
+                        help='use the FieldLine chassis instead of the phantom')
+    parser.add_argument('--buffer', default=None,
+                        help='buffer executable to start on --port for the run')
+    args = parser.parse_args()
+
+    from .session import session_settings
+    buffer_process = None
+    if args.buffer is not None:
+        buffer_process = subprocess.Popen([args.buffer, str(args.port)])
+        time.sleep(.5)
+    try:
+        configurations = itertools.product(args.hosts.split(','),
+                                           [int(n) for n in args.chunk_sizes.split(',')],
+                                           args.response.split(','))
+        for host, chunk_size, response in configurations:
+            settings = session_settings(use_phantom=not args.hardware, ft_IP=host,
+                                        ft_port=args.port, phantom_packet_size=chunk_size,
+                                        ft_put_response=response == 'on')
+            settings.chunk_max_samples = max(settings.chunk_max_samples, chunk_size)
+            histogram = run_configuration(settings, args.duration)
+            print(histogram.report('host %s, %i samples/packet, response %s'
+                                   % (host, chunk_size, response)))
+    finally:
+        if buffer_process is not None:
+            buffer_process.terminate()
+            buffer_process.wait()
+
+
+if __name__ == '__main__':
+    main()
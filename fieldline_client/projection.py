@@ -0,0 +1,123 @@
+"""
+Spatial projection of every chunk by a fixed matrix (SSP, HFC, reference
+regression or a full calibration matrix).
+"""
+
+import os.path as op
+import threading
+
+import numpy as np
+
+from .pipeline import Stage, OUTPUT_REPLACE
+
+
+def load_projector(fname):
+    """
+    load_projector(fname) -- read a projector matrix (outputs x channels)
+    from a .npy, .npz (key 'projector' or the first array) or text file.
+    """
+    ext = op.splitext(fname)[1].lower()
+    if ext == '.npy':
+        projector = np.load(fname)
+    elif ext == '.npz':
+        with np.load(fname) as archive:
+            key = 'projector' if 'projector' in archive else archive.files[0]
+            projector = archive[key]
+    else:
+        delimiter = ',' if ext == '.csv' else None
+        projector = np.loadtxt(fname, delimiter=delimiter, ndmin=2)
+    projector = np.asarray(projector, dtype=np.float64)
+    if projector.ndim != 2:
+        raise ValueError('Projector in %s is not a 2D matrix' % fname)
+    return projector
+
+
+def ssp_projector(vectors):
+    """
+    ssp_projector(vectors) -- I - U U^T for the space spanned by the
+    columns of 'vectors' (channels x components).
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+    u, _ = np.linalg.qr(vectors)
+    return np.eye(len(u)) - u @ u.T
+
+
+def reference_regression_projector(n_channels, ref_picks, weights):
+    """
+    reference_regression_projector(n_channels, ref_picks, weights) --
+    subtract weights (channels x refs) times the reference channels from
+    every channel. Rows of the reference channels themselves are left as is.
+    """
+    weights = np.asarray(weights, dtype=np.float64).copy()
+    weights[ref_picks] = 0.
+    projector = np.eye(n_channels)
+    projector[:, ref_picks] -= weights
+    return projector
+
+
+class ProjectionStage(Stage):
+
+    """
+    Multiplies every chunk by 'projector' (outputs x channels) with a single
+    matmul into a preallocated array. The returned chunk is a view on that
+    array and is overwritten by the next chunk.
+
+    set_projector() swaps the matrix between two chunks, so no samples are
+    dropped or projected half and half.
+    """
+
+    suffix = '_proj'
+
+    def __init__(self, projector, output=OUTPUT_REPLACE, sink=None,
+                 result_labels=None, max_samples=1000):
+        super().__init__(output, sink)
+        self.projector = np.asarray(projector, dtype=np.float64)
+        self.projector_labels = result_labels
+        self.max_samples = max_samples
+        self.pending = None
+        self.pending_lock = threading.Lock()
+        self.matrix = None
+        self.out = None
+
+    def _check(self, projector):
+        if projector.shape[1] != len(self.labels):
+            raise ValueError('Projector has %i columns for %i channels'
+                             % (projector.shape[1], len(self.labels)))
+
+    def setup(self):
+        self._check(self.projector)
+        self.matrix = np.ascontiguousarray(self.projector.T, dtype=np.float32)
+        self.out = np.empty((self.max_samples, len(self.projector)),
+                            dtype=np.float32)
+
+    def result_labels(self):
+        if self.projector_labels is not None:
+            return list(self.projector_labels)
+        if len(self.projector) == len(self.labels):
+            return list(self.labels)
+        return ['PROJ%03i' % i for i in range(len(self.projector))]
+
+    def set_projector(self, projector):
+        projector = np.asarray(projector, dtype=np.float64)
+        if self.matrix is not None:
+            self._check(projector)
+            if projector.shape[0] != self.matrix.shape[1]:
+                raise ValueError('Projector must keep %i outputs'
+                                 % self.matrix.shape[1])
+        with self.pending_lock:
+            self.pending = projector
+
+    def transform(self, chunk):
+        if self.pending is not None:
+            with self.pending_lock:
+                self.projector = self.pending
+                self.pending = None
+            self.matrix = np.ascontiguousarray(self.projector.T,
+                                               dtype=np.float32)
+        n_samples = len(chunk)
+        if n_samples > len(self.out):
+            self.out = np.empty((n_samples, self.out.shape[1]),
+                                dtype=np.float32)
+        out = self.out[:n_samples]
+        np.matmul(chunk, self.matrix, out=out)
+        return out
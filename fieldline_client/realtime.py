@@ -0,0 +1,144 @@
+"""
+Linux real-time setup for the acquisition threads: SCHED_FIFO/SCHED_RR
+priority, CPU affinity, locked and pre-faulted memory, and jitter
+statistics to see what they buy.
+
+Real-time priority and memory locking need CAP_SYS_NICE and CAP_IPC_LOCK
+(or matching rtprio / memlock limits in /etc/security/limits.conf). Whatever
+is not permitted is logged and skipped, so the acquisition runs either way.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import logging
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger('fieldline_client.realtime')
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+POLICIES = {'fifo': getattr(os, 'SCHED_FIFO', None), 'rr': getattr(os, 'SCHED_RR', None)}
+
+
+def _libc():
+    return ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+
+def set_thread_priority(policy='fifo', priority=50):
+    """
+    set_thread_priority([policy, priority]) -- run the calling thread with
+    real-time 'policy' ('fifo' or 'rr') at 'priority' (1-99). True if set.
+    """
+    if POLICIES.get(policy) is None:
+        log.warning("Real-time policy %s is not available here", policy)
+        return False
+    try:
+        # pid 0 is the calling thread, not the whole process
+        os.sched_setscheduler(0, POLICIES[policy], os.sched_param(priority))
+    except OSError as err:
+        log.warning("Cannot set %s priority %i for %s: %s", policy, priority,
+                    threading.current_thread().name, err)
+        return False
+    return True
+
+
+def set_thread_affinity(cpus):
+    """set_thread_affinity(cpus) -- keep the calling thread on these CPUs. True if set."""
+    try:
+        os.sched_setaffinity(0, set(cpus))
+    except (OSError, AttributeError) as err:
+        log.warning("Cannot pin %s to CPUs %s: %s", threading.current_thread().name,
+                    sorted(cpus), err)
+        return False
+    return True
+
+
+def lock_memory(future=True):
+    """
+    lock_memory([future]) -- mlockall the process, and everything it maps
+    later if 'future', so acquisition never waits for a page to come back
+    from swap. True if locked.
+    """
+    try:
+        libc = _libc()
+    except OSError as err:
+        log.warning("Cannot lock memory: %s", err)
+        return False
+    if libc.mlockall(MCL_CURRENT | (MCL_FUTURE if future else 0)) != 0:
+        log.warning("Cannot lock memory: %s", os.strerror(ctypes.get_errno()))
+        return False
+    return True
+
+
+def unlock_memory():
+    try:
+        _libc().munlockall()
+    except OSError:
+        pass
+
+
+def prefault(*arrays):
+    """Touch every page of the arrays so the first real write does not fault."""
+    for array in arrays:
+        pages = array.reshape(-1).view(np.uint8)
+        pages[::mmap.PAGESIZE] = pages[::mmap.PAGESIZE]
+        pages[-1:] = pages[-1:]
+
+
+def setup_thread(settings, priority_offset=0):
+    """
+    setup_thread(settings [, priority_offset]) -- apply the realtime_*
+    settings to the calling thread, at realtime_priority + priority_offset.
+    """
+    if not settings.realtime_enabled:
+        return
+    set_thread_priority(settings.realtime_policy, settings.realtime_priority + priority_offset)
+    if settings.realtime_cpus:
+        set_thread_affinity(settings.realtime_cpus)
+
+
+class JitterStats:
+
+    """
+    JitterStats([size]) -- how late a periodic thread wakes up: the last
+    'size' differences between the interval measured by tick() and the
+    expected one.
+    """
+
+    def __init__(self, size=10000):
+        self.lock = threading.Lock()
+        self.deviations = collections.deque(maxlen=size)
+        self.last = None
+        self.count = 0
+
+    def tick(self, expected, t=None):
+        """tick(expected [, t]) -- a wake-up at t, 'expected' s after the last one."""
+        if t is None:
+            t = time.monotonic()
+        with self.lock:
+            if self.last is not None:
+                self.deviations.append(t - self.last - expected)
+                self.count += 1
+            self.last = t
+
+    def reset(self):
+        with self.lock:
+            self.deviations.clear()
+            self.last = None
+            self.count = 0
+
+    def stats(self):
+        """(count, p50, p99, p99.9, max) of the absolute deviations in s, or None."""
+        with self.lock:
+            if not self.deviations:
+                return None
+            deviations = np.abs(np.array(self.deviations))
+        p50, p99, p999 = np.percentile(deviations, (50, 99, 99.9))
+        return self.count, p50, p99, p999, deviations.max()
@@ -0,0 +1,167 @@
+"""
+Sensor registry shared by the fieldline_api callback threads and the
+acquisition session. One row per (chassis, sensor) in flat arrays; every
+access goes through a single lock, so readers never see a half-applied
+update.
+"""
+
+import threading
+
+import numpy as np
+
+# stage flags, one bit each
+AVAILABLE = 1
+READY = 2
+VALID = 4
+RESTARTED = 8
+COARSE_ZEROED = 16
+FINE_ZEROED = 32
+
+FLAG_NAMES = {AVAILABLE: 'available', READY: 'ready', VALID: 'valid',
+              RESTARTED: 'restarted', COARSE_ZEROED: 'coarse_zeroed',
+              FINE_ZEROED: 'fine_zeroed'}
+
+
+class SensorRegistry:
+
+    """
+    State of every sensor seen, indexed by (chassis, sensor). Flag counts are
+    kept up to date on every change, so counting is O(1) whatever the
+    number of sensors.
+    """
+
+    def __init__(self, capacity=64):
+        self.lock = threading.RLock()
+        self.index = {}
+        self.size = 0
+        self.chassis = np.zeros(capacity, dtype=np.int32)
+        self.sensors = np.zeros(capacity, dtype=np.int32)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.errors = np.zeros(capacity, dtype=np.int32)
+        self.counts = dict.fromkeys(FLAG_NAMES, 0)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return tuple(key) in self.index
+
+    def _grow(self):
+        capacity = 2 * len(self.flags)
+        for name in ('chassis', 'sensors', 'flags', 'errors'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _row(self, chassis, sensor):
+        key = (chassis, sensor)
+        row = self.index.get(key)
+        if row is None:
+            if self.size == len(self.flags):
+                self._grow()
+            row = self.size
+            self.chassis[row] = chassis
+            self.sensors[row] = sensor
+            self.index[key] = row
+            self.size += 1
+        return row
+
+    def _update(self, row, set_flags=0, clear_flags=0):
+        old = int(self.flags[row])
+        new = (old | set_flags) & ~clear_flags
+        if new != old:
+            for flag in self.counts:
+                if (old ^ new) & flag:
+                    self.counts[flag] += 1 if new & flag else -1
+            self.flags[row] = new
+
+    def add(self, chassis, sensor, flags=0):
+        with self.lock:
+            self._update(self._row(chassis, sensor), flags)
+
+    def set_flag(self, chassis, sensor, flag):
+        with self.lock:
+            self._update(self._row(chassis, sensor), flag)
+
+    def clear_flag(self, chassis, sensor, flag):
+        with self.lock:
+            row = self.index.get((chassis, sensor))
+            if row is not None:
+                self._update(row, 0, flag)
+
+    def has_flag(self, chassis, sensor, flag):
+        with self.lock:
+            row = self.index.get((chassis, sensor))
+            return row is not None and bool(self.flags[row] & flag)
+
+    def _rows(self, chassis=None, flag=None):
+        mask = np.ones(self.size, dtype=bool)
+        if chassis is not None:
+            mask &= self.chassis[:self.size] == chassis
+        if flag is not None:
+            mask &= (self.flags[:self.size] & flag) != 0
+        return np.flatnonzero(mask)
+
+    def clear_chassis(self, chassis, flags):
+        """Clear 'flags' on every sensor of a chassis, e.g. when it drops out."""
+        with self.lock:
+            for row in self._rows(chassis, flags):
+                self._update(row, 0, flags)
+
+    def copy_flag(self, src, dst):
+        """Set 'dst' on exactly the sensors that have 'src'."""
+        with self.lock:
+            for row in range(self.size):
+                if self.flags[row] & src:
+                    self._update(row, dst)
+                else:
+                    self._update(row, 0, dst)
+
+    def reset_flag(self, flag):
+        with self.lock:
+            for row in self._rows(flag=flag):
+                self._update(row, 0, flag)
+
+    def add_error(self, chassis, sensor):
+        """Count an error on a sensor and take it out of the valid set."""
+        with self.lock:
+            row = self._row(chassis, sensor)
+            self.errors[row] += 1
+            self._update(row, 0, VALID)
+
+    def count(self, flag=None):
+        with self.lock:
+            if flag is None:
+                return self.size
+            return self.counts[flag]
+
+    def sensors_with(self, flag=None):
+        """[(chassis, sensor)] with 'flag' set (all sensors if None)."""
+        with self.lock:
+            rows = self._rows(flag=flag)
+            return list(zip(self.chassis[rows].tolist(), self.sensors[rows].tolist()))
+
+    def by_chassis(self, flag=None):
+        """{chassis: [sensors]} with 'flag' set."""
+        ret = {}
+        for chassis, sensor in self.sensors_with(flag):
+            ret.setdefault(chassis, []).append(sensor)
+        return ret
+
+    def take(self, flag):
+        """by_chassis(flag), clearing the flag in the same step."""
+        with self.lock:
+            ret = self.by_chassis(flag)
+            self.reset_flag(flag)
+            return ret
+
+    def snapshot(self):
+        """Consistent copy of the whole table."""
+        with self.lock:
+            n = self.size
+            return {'chassis': self.chassis[:n].copy(),
+                    'sensors': self.sensors[:n].copy(),
+                    'flags': self.flags[:n].copy(),
+                    'errors': self.errors[:n].copy(),
+                    'counts': {FLAG_NAMES[f]: c for f, c in self.counts.items()}}
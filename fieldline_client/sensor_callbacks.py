@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+
+from .registry import (SensorRegistry, AVAILABLE, READY, VALID, RESTARTED,
+                       COARSE_ZEROED, FINE_ZEROED)
+
+log = logging.getLogger('fieldline_client.connector')
+
+
+class SensorCallbacks:
+
+    """
+    Chassis and sensor callbacks of the FieldLine API, kept in a
+    SensorRegistry and in per-chassis readiness events. Shared by the
+    FieldLine connector and the phantom device.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chassis_id_to_name = {}
+        # state of every sensor, written from the callback threads
+        self.registry = SensorRegistry()
+        # readiness of every chassis, set from the callbacks
+        self.events_lock = threading.Lock()
+        self.chassis_connected_events = {}
+        self.sensors_available_events = {}
+
+    # required callback
+    def callback_chassis_connected(self, chassis_name, chassis_id):
+        self.chassis_id_to_name[chassis_id] = chassis_name
+        log.info("CONNECTOR Chassis %s with ID %s connected", chassis_name, chassis_id,
+                 extra={'event': 'chassis_connected', 'chassis': chassis_id})
+        self._chassis_event(self.chassis_connected_events, chassis_id).set()
+
+    # required callback
+    def callback_chassis_disconnected(self, chassis_id):
+        log.warning("CONNECTOR Chassis %s disconnected", self.chassis_id_to_name.get(chassis_id),
+                    extra={'event': 'chassis_disconnected', 'chassis': chassis_id})
+        self._chassis_event(self.chassis_connected_events, chassis_id).clear()
+        self._chassis_event(self.sensors_available_events, chassis_id).clear()
+        self.registry.clear_chassis(chassis_id, AVAILABLE | READY | VALID)
+        del self.chassis_id_to_name[chassis_id]
+
+    # required callback
+    def callback_sensors_available(self, chassis_id, sensor_list):
+        log.info("CONNECTOR Chassis %s has sensors %s", self.chassis_id_to_name.get(chassis_id),
+                 sensor_list, extra={'event': 'sensors_available', 'chassis': chassis_id})
+        for s in sensor_list:
+            self.registry.add(chassis_id, s, AVAILABLE | READY)
+        self._chassis_event(self.sensors_available_events, chassis_id).set()
+
+    # required callback
+    def callback_sensor_ready(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s ready", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'ready', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.set_flag(chassis_id, sensor_id, READY)
+
+    # required callback
+    def callback_restart_begin(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s restart", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'restart', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.clear_flag(chassis_id, sensor_id, RESTARTED)
+
+    # required callback
+    def callback_restart_complete(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s restart complete", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'restart_complete', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.set_flag(chassis_id, sensor_id, RESTARTED)
+
+    # required_callback
+    def callback_coarse_zero_begin(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s coarse zero", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'coarse_zero', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.clear_flag(chassis_id, sensor_id, COARSE_ZEROED)
+
+    # required callback
+    def callback_coarse_zero_complete(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s coarse zero complete", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'coarse_zero_complete', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.set_flag(chassis_id, sensor_id, COARSE_ZEROED)
+
+    # required_callback
+    def callback_fine_zero_begin(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s fine zero", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'fine_zero', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.clear_flag(chassis_id, sensor_id, FINE_ZEROED)
+
+    # required_callback
+    def callback_fine_zero_complete(self, chassis_id, sensor_id):
+        log.info("CONNECTOR Chassis %s sensor %s fine zero complete", self.chassis_id_to_name.get(chassis_id),
+                 sensor_id, extra={'event': 'fine_zero_complete', 'chassis': chassis_id, 'sensor': sensor_id})
+        self.registry.set_flag(chassis_id, sensor_id, FINE_ZEROED)
+
+    # required callback
+    def callback_sensor_error(self, chassis_id, sensor, msg):
+        log.error("CONNECTOR Chassis %s sensor %s returned error: %s",
+                  self.chassis_id_to_name.get(chassis_id), sensor, msg,
+                  extra={'event': 'sensor_error', 'chassis': chassis_id, 'sensor': sensor})
+        self.registry.add_error(chassis_id, sensor)
+
+    # custom functions below
+    def _chassis_event(self, events, chassis_id):
+        with self.events_lock:
+            if chassis_id not in events:
+                events[chassis_id] = threading.Event()
+            return events[chassis_id]
+
+    def _wait_for_events(self, events, chassis_list, timeout):
+        deadline = time.monotonic() + timeout
+        missing = []
+        for chassis_id in chassis_list:
+            remaining = max(deadline - time.monotonic(), 0.)
+            if not self._chassis_event(events, chassis_id).wait(remaining):
+                missing.append(chassis_id)
+        return missing
+
+    def wait_for_chassis(self, chassis_list, timeout):
+        """Wait until all chassis connect, return the ones that did not."""
+        return self._wait_for_events(self.chassis_connected_events, chassis_list, timeout)
+
+    def wait_for_sensors(self, chassis_list, timeout):
+        """Wait until all chassis list their sensors, return the ones that did not."""
+        return self._wait_for_events(self.sensors_available_events, chassis_list, timeout)
+
+    @property
+    def all_sensors_list(self):
+        return self.registry.sensors_with()
+
+    @property
+    def valid_sensors_list(self):
+        return self.registry.sensors_with(VALID)
+
+    def set_all_sensors_valid(self):
+        self.registry.copy_flag(AVAILABLE, VALID)
+
+    def has_sensors_ready(self):
+        return self.registry.count(READY) > 0
+
+    def get_sensors_ready(self):
+        return self.registry.take(READY)
+
+    @property
+    def restarted_sensors(self):
+        return self.registry.by_chassis(RESTARTED)
+
+    def has_restarted_sensors(self):
+        return self.registry.count(RESTARTED) > 0
+
+    def get_restarted_sensors(self):
+        return self.registry.take(RESTARTED)
+
+    def get_num_restarted_sensors(self):
+        return self.registry.count(RESTARTED)
+
+    @property
+    def coarse_zero_sensors(self):
+        return self.registry.by_chassis(COARSE_ZEROED)
+
+    def has_coarse_zero_sensors(self):
+        return self.registry.count(COARSE_ZEROED) > 0
+
+    def get_coarse_zero_sensors(self):
+        return self.registry.take(COARSE_ZEROED)
+
+    def get_num_coarse_zero_sensors(self):
+        return self.registry.count(COARSE_ZEROED)
+
+    @property
+    def fine_zero_sensors(self):
+        return self.registry.by_chassis(FINE_ZEROED)
+
+    def has_fine_zero_sensors(self):
+        return self.registry.count(FINE_ZEROED) > 0
+
+    def get_fine_zero_sensors(self):
+        return self.registry.take(FINE_ZEROED)
+
+    def get_num_fine_zero_sensors(self):
+        return self.registry.count(FINE_ZEROED)
+
+    def num_sensors(self):
+        return self.registry.count()
+
+    def num_valid_sensors(self):
+        return self.registry.count(VALID)
@@ -0,0 +1,791 @@
+# mne_fieldline_connector
+# gabrielbmotta, juangpc
+
+import logging
+import queue
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import config
+from .FieldTrip import Client, DATATYPE_FLOAT32
+from .pipeline import Pipeline, TapStage, OUTPUT_SINK
+from .sinks import FieldTripSink
+from .fif import FifSink
+from .archive import ArchiveWriter
+from .overview import OverviewSink
+from .livestream import LiveStreamServer
+from . import realtime
+from .watchdog import StreamWatchdog
+from .diagnostics import Diagnostics
+from .history import HistoryReader
+from .filters import FilterStage, design_sos
+from .decimation import DecimationStage
+from .projection import ProjectionStage, load_projector
+from .monitor import QualityMonitor
+from .markers import SampleClock, EventMarker
+from .channel_map import ChannelMap, ChannelDecoder, LowRateStream, DATA_TYPE_BZ
+from .chunk_pool import ChunkPool
+from .clock_sync import AcquisitionTimeline
+from .registry import RESTARTED, COARSE_ZEROED, FINE_ZEROED
+from . import log
+from . import timing
+
+default_sample_freq = 1000
+
+logger = logging.getLogger('fieldline_client.session')
+
+
+def session_settings(**overrides):
+    """
+    session_settings(**overrides) -- copy of the values in config, with
+    'overrides' replacing some of them (e.g. ip_list, ft_port).
+    """
+    settings = {key: value for key, value in vars(config).items()
+                if not key.startswith('_') and
+                not isinstance(value, types.ModuleType)}
+    for key in overrides:
+        if key not in settings:
+            raise ValueError('Unknown setting: %s' % key)
+    settings.update(overrides)
+    return types.SimpleNamespace(**settings)
+
+
+def create_service(use_phantom=False, sensors=None, sample_freq=default_sample_freq,
+                   packet_size=10, thread_setup=None, phantom_speed=1.):
+    if use_phantom:
+        from .phantom import PhantomConnector, PhantomService
+        print("Using phantom device")
+        connector = PhantomConnector()
+        service = PhantomService(connector, prefix="", sensors=sensors,
+                                 sample_freq=sample_freq, packet_size=packet_size,
+                                 thread_setup=thread_setup, speed=phantom_speed)
+    else:
+        from .connector import FieldLineConnector
+        from fieldline_api.fieldline_service import FieldLineService
+        timing.mark('import fieldline_api')
+        connector = FieldLineConnector()
+        service = FieldLineService(connector, prefix="")
+    timing.mark('create FieldLine service')
+    return connector, service
+
+
+class AcquisitionSession:
+
+    """
+    One headset and one FieldTrip buffer: the FieldLine connector and
+    service, the processing pipeline and its sinks, the acquisition thread
+    and the sample counter. Sessions share nothing, so several of them can
+    run side by side in one process.
+
+    'settings' defaults to the values in config (see session_settings).
+    'connector' and 'service' may be given to run on another data source,
+    otherwise they are created the first time they are needed.
+    """
+
+    def __init__(self, settings=None, connector=None, service=None,
+                 sample_freq=default_sample_freq):
+        if settings is None:
+            settings = session_settings()
+        self.settings = settings
+        self._connector = connector
+        self._service = service
+        self._service_lock = threading.Lock()
+
+        self.sample_freq = sample_freq
+        self.ft_client = Client()
+        self.ft_data_type = DATATYPE_FLOAT32
+        self.pipeline = Pipeline()
+        self.sample_clock = SampleClock()
+        self.data_stream_multiplier = 1
+
+        self.measure_flag = False
+        self.measure_flag_lock = threading.Lock()
+        self.process_data_flag = False
+        self.process_data_flag_lock = threading.Lock()
+        self.acquisition_thread = None
+
+        self.full_channel_map = self.create_channel_map()
+        self.channel_map, self.low_rate_streams = self.split_channel_map_by_rate()
+        self.channel_decoder = ChannelDecoder(self.channel_map)
+        self.working_chassis = self.full_channel_map.chassis_ids
+        self.working_sensors = self.full_channel_map.sensors_by_chassis()
+        self.broken_sensors = settings.broken_sensors
+
+        # decoded chunks go from the acquisition thread to the writer thread
+        # in pool buffers, so the next one is decoded while this one is sent
+        self.chunk_pool = ChunkPool(settings.chunk_pool_size, settings.chunk_max_samples,
+                                    len(self.channel_map))
+        self.raw_buffer = np.empty((settings.chunk_max_samples, len(self.channel_map)),
+                                   dtype=np.int32)
+        # never holds more than the pool, so bounded to it
+        self.write_q = queue.Queue(maxsize=settings.chunk_pool_size)
+        self.writer_thread = None
+        # last exception of write_chunk and how many chunks failed
+        self.writer_error = None
+        self.writer_errors = 0
+        # chassis clocks against host time, and the latency of every chunk
+        self.timeline = AcquisitionTimeline(self.channel_map, sample_freq)
+        self.event_marker = EventMarker(self.timeline)
+        self.samples_decoded = 0
+        # arrival time of every sample index, set by the latency probe
+        self.arrival_log = None
+        # lossless copy of the raw counts, see open_archive
+        self.archive = None
+        self.overview_sink = None
+        # how late the acquisition thread gets each packet, see realtime.py
+        self.jitter = realtime.JitterStats()
+        self.memory_locked = False
+        # stall detection and recovery of the stream, see init_watchdog
+        self.watchdog = None
+        # the writer and the watchdog's events share the buffer connection
+        self.ft_lock = threading.Lock()
+        # pooled connections for long reads of the buffer, see read_history
+        self.history_reader = None
+        self.diagnostics = Diagnostics(settings.diagnostics_dir, settings.diagnostics_duration,
+                                       settings.diagnostics_interval, self.queue_depths)
+
+    def _create_service(self):
+        with self._service_lock:
+            if self._service is None:
+                self.start_log()
+                if self.settings.diagnostics_signal is not None:
+                    self.diagnostics.install_signal(self.settings.diagnostics_signal)
+                self._connector, self._service = create_service(
+                    self.settings.use_phantom, self.working_sensors, self.sample_freq,
+                    self.settings.phantom_packet_size,
+                    lambda: realtime.setup_thread(self.settings),
+                    self.settings.phantom_speed)
+
+    def start_log(self):
+        s = self.settings
+        log.start(s.log_level, s.log_file, s.log_file_max_bytes, s.log_file_backups,
+                  s.log_rate_interval, s.log_rate_burst)
+
+    @property
+    def fConnector(self):
+        if self._service is None:
+            self._create_service()
+        return self._connector
+
+    @property
+    def fService(self):
+        if self._service is None:
+            self._create_service()
+        return self._service
+
+    def create_channel_map(self):
+        if self.settings.layout_file is not None:
+            return ChannelMap.from_layout(self.settings.layout_file)
+        return ChannelMap.from_config(self.settings.working_chassis,
+                                      self.settings.working_sensors,
+                                      list(self.settings.data_types))
+
+    def data_type_rate(self, data_type):
+        return self.settings.data_types.get(data_type, self.sample_freq)
+
+    def split_channel_map_by_rate(self):
+        full_map = self.full_channel_map
+        rates = {}
+        for data_type in set(full_map.data_types.tolist()):
+            rate = self.data_type_rate(data_type)
+            if rate > self.sample_freq:
+                raise ValueError('Data type %i at %g Hz is above the main rate'
+                                 % (data_type, rate))
+            rates.setdefault(rate, []).append(data_type)
+        main_types = rates.pop(self.sample_freq, [])
+        channel_map = full_map.subset(full_map.data_type_picks(main_types))
+        low_rate_streams = []
+        for rate in sorted(rates, reverse=True):
+            if rate not in self.settings.low_rate_ports:
+                raise ValueError('No buffer port for data types at %g Hz' % rate)
+            sink = FieldTripSink(self.settings.ft_IP, self.settings.low_rate_ports[rate])
+            low_rate_map = full_map.subset(full_map.data_type_picks(rates[rate]))
+            low_rate_streams.append(LowRateStream(low_rate_map, rate, sink))
+        return channel_map, low_rate_streams
+
+    def configure_data_types(self):
+        for data_type in set(self.full_channel_map.data_types.tolist()):
+            rate = self.data_type_rate(data_type)
+            if data_type == DATA_TYPE_BZ and rate == self.sample_freq:
+                # streamed by default
+                continue
+            for chassis, sensors in self.working_sensors.items():
+                self.fService.data_source.start_datatype(chassis, list(sensors), data_type, rate)
+
+    def num_working_sensors(self):
+        return self.full_channel_map.num_sensors()
+
+    def num_restarted_sensors(self):
+        return self.fConnector.registry.count(RESTARTED)
+
+    def num_coarse_zeroed_sensors(self):
+        return self.fConnector.registry.count(COARSE_ZEROED)
+
+    def num_fine_zeroed_sensors(self):
+        return self.fConnector.registry.count(FINE_ZEROED)
+
+    def wait_for_restart_to_finish(self):
+        while (self.num_restarted_sensors() < self.num_working_sensors()):
+            time.sleep(.1)
+
+    def wait_for_coarse_zero_to_finish(self):
+        while (self.num_coarse_zeroed_sensors() < self.num_working_sensors()):
+            time.sleep(.1)
+
+    def wait_for_fine_zero_to_finish(self):
+        while (self.num_fine_zeroed_sensors() < self.num_working_sensors()):
+            time.sleep(.1)
+
+    def turn_off_all_broken_sensors(self):
+        for ch in self.working_chassis:
+            if ch < len(self.broken_sensors):
+                for s in self.broken_sensors[ch]:
+                    self.fService.turn_off_sensor(ch, s)
+
+    def measure(self, *argv):
+        if len(argv) == 1 and type(argv[0]) is bool:
+            with self.measure_flag_lock:
+                self.measure_flag = argv[0]
+        with self.measure_flag_lock:
+            return self.measure_flag
+
+    def process_data(self, *argv):
+        if len(argv) == 1 and type(argv[0]) is bool:
+            with self.process_data_flag_lock:
+                self.process_data_flag = argv[0]
+        with self.process_data_flag_lock:
+            return self.process_data_flag
+
+    def end_measurement(self):
+        if self.fService.is_service_running():
+            self.fService.stop()
+            self.measure(False)
+
+    def restart_all_working_sensors(self):
+        self.fConnector.registry.reset_flag(RESTARTED)
+        for ch in self.working_chassis:
+            for s in self.working_sensors[ch]:
+                self.fService.restart_sensor(ch, s)
+                time.sleep(.1)
+        self.wait_for_restart_to_finish()
+        print("All sensors restarted.")
+
+    def coarse_zero_all_working_sensors(self):
+        self.fConnector.registry.reset_flag(COARSE_ZEROED)
+        for ch in self.working_chassis:
+            for s in self.working_sensors[ch]:
+                self.fService.coarse_zero_sensor(ch, s)
+                time.sleep(.1)
+        self.wait_for_coarse_zero_to_finish()
+        print("All sensors coarse-zeroed.")
+
+    def fine_zero_all_working_sensors(self):
+        self.fConnector.registry.reset_flag(FINE_ZEROED)
+        for ch in self.working_chassis:
+            for s in self.working_sensors[ch]:
+                self.fService.fine_zero_sensor(ch, s)
+                time.sleep(.1)
+        self.wait_for_fine_zero_to_finish()
+        print("All sensors fine-zeroed.")
+
+    def connect_to_fieldtrip_buffer(self):
+        self.ft_client.connect(self.settings.ft_IP, self.settings.ft_port)
+        if self.ft_client.isConnected:
+            print("Fieldtrip Client connected")
+
+    def init_ft_header(self):
+        labels = self.pipeline.labels
+        if self.ft_client.isConnected:
+            self.ft_client.putHeader(len(labels), self.sample_freq, self.ft_data_type, labels)
+            self.sample_clock.reset()
+            self.event_marker.clear()
+            self.timeline.reset()
+            self.samples_decoded = 0
+            header = self.ft_client.getHeader()
+            if header.nChannels == len(labels):
+                print("Fieldtrip header initialized")
+
+    def create_channel_label_list(self):
+        return list(self.channel_map.labels)
+
+    def create_channel_chassis_picks(self, chassis_list):
+        return self.channel_map.picks(chassis_list)
+
+    def create_channel_key_list(self, channel_list):
+        picks = self.channel_map.picks(channel_list)
+        return [self.channel_map.keys[col] for col in picks]
+
+    def create_filter_stage(self):
+        groups = []
+        for group in self.settings.filter_groups:
+            chassis_list = group['chassis']
+            if chassis_list is not None and not isinstance(chassis_list, (list, tuple)):
+                chassis_list = [chassis_list]
+            picks = self.create_channel_chassis_picks(chassis_list)
+            sos = design_sos(self.sample_freq, group.get('band'), group.get('notch', ()))
+            groups.append((picks, sos))
+        sink = None
+        if self.settings.filter_output == OUTPUT_SINK:
+            sink = FieldTripSink(self.settings.ft_IP, self.settings.filter_ft_port)
+        return FilterStage(groups, self.settings.filter_output, sink)
+
+    def create_projection_stage(self):
+        sink = None
+        if self.settings.projector_output == OUTPUT_SINK:
+            sink = FieldTripSink(self.settings.ft_IP, self.settings.projector_ft_port)
+        return ProjectionStage(load_projector(self.settings.projector_file),
+                               self.settings.projector_output, sink)
+
+    def read_history(self, start, stop):
+        """
+        read_history(start, stop) -- samples start to stop-1 from the buffer,
+        fetched over the history connections, never the acquisition's one.
+        """
+        s = self.settings
+        if self.history_reader is None:
+            self.history_reader = HistoryReader(s.ft_IP, s.ft_port, s.history_connections,
+                                                s.history_block_samples)
+        return self.history_reader.read(start, stop)
+
+    def set_projector(self, fname):
+        for stage in self.pipeline.stages:
+            if isinstance(stage, ProjectionStage):
+                stage.set_projector(load_projector(fname))
+                print("Projector loaded from " + fname)
+                return True
+        print("No projection stage running")
+        return False
+
+    def create_quality_monitor(self):
+        s = self.settings
+        # queued, and put in the buffer by write_chunk under ft_lock
+        event_marker = self.event_marker if s.monitor_events else None
+        return QualityMonitor(s.monitor_interval, line_freq=s.monitor_line_freq,
+                              flat_std=s.monitor_flat_std, saturation=s.monitor_saturation,
+                              noise_std=s.monitor_noise_std, drift_rate=s.monitor_drift_rate,
+                              line_power=s.monitor_line_power, event_marker=event_marker)
+
+    def print_quality_status(self):
+        for stage in self.pipeline.stages:
+            if isinstance(stage, QualityMonitor):
+                snapshot = stage.get_snapshot()
+                if snapshot is None:
+                    print("No quality data yet")
+                    return
+                for label, status, std in zip(snapshot['labels'], snapshot['status'], snapshot['std']):
+                    print(label + "\t" + status + "\tstd: " + str(std))
+                return
+        print("Quality monitor not running")
+
+    def query_overview(self, start, stop, width, picks=None):
+        """
+        query_overview(start, stop, width [, picks]) -- min/max/mean of the
+        acquisition from start to stop (s) for a 'width' pixel trace, see
+        OverviewPyramid.query.
+        """
+        if self.overview_sink is None or self.overview_sink.pyramid is None:
+            return None
+        return self.overview_sink.pyramid.query(start, stop, width, picks)
+
+    def host_time_at(self, sample):
+        """Host time.monotonic() at which sample index 'sample' was acquired."""
+        return self.timeline.host_time_at(sample)
+
+    def sample_at_host_time(self, t):
+        return self.timeline.sample_at(t)
+
+    def print_latency(self):
+        stats = self.timeline.latency_stats()
+        if not stats:
+            print("No latency data yet")
+            return
+        print("Latency (ms)\tmedian\t95%\tmax")
+        for name, (median, p95, peak) in sorted(stats.items()):
+            print(name + "\t%.2f\t%.2f\t%.2f" % (median * 1e3, p95 * 1e3, peak * 1e3))
+
+    def queue_depths(self):
+        depths = {'write_q': self.write_q.qsize(),
+                  'chunk_pool free': self.chunk_pool.num_free(),
+                  'chunk_pool waits': self.chunk_pool.waits,
+                  'writer errors': self.writer_errors}
+        if self._connector is not None:
+            depths['data_q'] = self._connector.data_q.qsize()
+        if self.archive is not None:
+            depths['archive'] = self.archive.q.qsize()
+        for i, stage in enumerate(self.pipeline.stages):
+            sink = stage.sink
+            if sink is not None and hasattr(sink, 'q'):
+                depths['stage %i %s' % (i, type(sink).__name__)] = sink.q.qsize()
+            if sink is not None and hasattr(sink, 'viewers'):
+                for j, viewer in enumerate(list(sink.viewers)):
+                    depths['stage %i viewer %i (dropped %i)' % (i, j, viewer.dropped)] = \
+                        viewer.frames.qsize()
+        return depths
+
+    def run_diagnostics(self):
+        prefix = self.diagnostics.trigger()
+        if prefix is None:
+            print("Diagnostics already running")
+        else:
+            print("Writing diagnostics to " + prefix + "-*.txt in " +
+                  str(self.settings.diagnostics_duration) + " s")
+
+    def print_jitter(self):
+        stats = self.jitter.stats()
+        if stats is None:
+            print("No jitter data yet")
+            return
+        count, p50, p99, p999, peak = stats
+        print("Packet jitter (ms) over %i packets\tmedian\t99%%\t99.9%%\tmax" % count)
+        print("\t%.3f\t%.3f\t%.3f\t%.3f" % (p50 * 1e3, p99 * 1e3, p999 * 1e3, peak * 1e3))
+
+    def init_pipeline(self):
+        s = self.settings
+        self.pipeline.stop()
+        self.pipeline = Pipeline()
+        if s.fif_file is not None:
+            self.pipeline.add(TapStage(FifSink(s.fif_file, self.channel_map, s.fif_buffer_seconds,
+                                               s.fif_split_size)))
+        self.overview_sink = None
+        if s.overview_enabled:
+            # written beside the recording, if there is one
+            base = s.fif_file if s.fif_file is not None else s.archive_file
+            self.overview_sink = OverviewSink(s.overview_factors, base, s.overview_memory_seconds)
+            self.pipeline.add(TapStage(self.overview_sink))
+        if s.monitor_enabled:
+            self.pipeline.add(self.create_quality_monitor())
+        if s.projector_file is not None:
+            self.pipeline.add(self.create_projection_stage())
+        if s.filter_enabled:
+            self.pipeline.add(self.create_filter_stage())
+        if s.livestream_port is not None:
+            self.pipeline.add(TapStage(LiveStreamServer(s.livestream_host, s.livestream_port,
+                                                        s.livestream_max_frames)))
+        for factor, port in s.decimated_buffers:
+            self.pipeline.add(DecimationStage(factor, FieldTripSink(s.ft_IP, port)))
+        self.pipeline.start(self.create_channel_label_list(), self.sample_freq)
+
+    def test_data_to_ft(self):
+        arr_data = np.zeros((200, len(self.pipeline.labels)), dtype=np.single)
+        self.ft_client.putData(arr_data)
+
+    def init_sensors(self):
+        if self.num_fine_zeroed_sensors() < self.num_working_sensors():
+            self.force_init_sensors()
+
+    def force_init_sensors(self):
+        self.turn_off_all_broken_sensors()
+        self.restart_all_working_sensors()
+        self.coarse_zero_all_working_sensors()
+        self.fine_zero_all_working_sensors()
+
+    def are_sensors_ready(self):
+        return self.num_fine_zeroed_sensors() == self.num_working_sensors()
+
+    def init_acquisition(self):
+        if self.measure() is True:
+            self.stop_measurement()
+        self.configure_data_types()
+        # the chassis clocks may start again with the data, so neither the
+        # clock fits nor packets left from the last measurement carry over
+        self.timeline.reset()
+        while not self.fConnector.data_q.empty():
+            self.fConnector.data_q.get_nowait()
+            self.fConnector.data_q.task_done()
+        self.fService.start_data()
+        print("fService data started.")
+        self.measure(True)
+        self.jitter.reset()
+        if self.settings.realtime_enabled:
+            self.prepare_realtime()
+        self.start_writer()
+        if self.settings.watchdog_enabled:
+            self.init_watchdog()
+        self.acquisition_thread = threading.Thread(target=self.data_retreiver_thread, daemon=True)
+        self.acquisition_thread.start()
+
+    def prepare_realtime(self):
+        realtime.prefault(self.raw_buffer, *[chunk.buffer for chunk in self.chunk_pool.chunks])
+        if self.settings.realtime_lock_memory and not self.memory_locked:
+            self.memory_locked = realtime.lock_memory()
+
+    def init_watchdog(self):
+        s = self.settings
+        self.watchdog = StreamWatchdog(self.channel_map, self.sample_freq, s.watchdog_stall_timeout,
+                                       s.watchdog_recovery_timeout,
+                                       [self.restart_data, self.reconnect_chassis,
+                                        self.retune_chassis],
+                                       timeline=self.timeline,
+                                       pending=self.fConnector.data_q.qsize)
+        self.watchdog.on_stall.append(self.stream_stalled)
+        self.watchdog.on_gap.append(self.write_gap)
+        self.watchdog.on_recover.append(self.stream_recovered)
+        self.watchdog.start()
+
+    def stop_watchdog(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+    def stream_stalled(self, chassis_list):
+        sample = max(self.sample_clock.samples_written() - 1, 0)
+        for chassis in chassis_list:
+            self.event_marker.mark_sample('fieldline_stall', str(chassis), sample)
+        # nothing may be written for a while, so do not wait for the next chunk
+        self.flush_events()
+
+    def stream_recovered(self, chassis_list):
+        for chassis in chassis_list:
+            self.event_marker.mark_sample('fieldline_recovered', str(chassis),
+                                          self.samples_decoded)
+
+    def flush_events(self):
+        events = self.event_marker.take()
+        if events and self.ft_client.isConnected:
+            with self.ft_lock:
+                self.ft_client.putEvents(events)
+
+    def restart_data(self, chassis_list):
+        self.fService.stop_data()
+        self.fService.start_data()
+
+    def reconnect_chassis(self, chassis_list):
+        self.fService.stop_data()
+        self.fService.connect(self.settings.ip_list)
+        missing = self.fConnector.wait_for_sensors(chassis_list, self.settings.connect_timeout)
+        if missing:
+            raise RuntimeError('chassis %s did not reconnect' % missing)
+        self.configure_data_types()
+        self.fService.start_data()
+
+    def retune_chassis(self, chassis_list):
+        """
+        Tune again the sensors of the chassis that lost their fine zero, or
+        all of their sensors if none did.
+        """
+        registry = self.fConnector.registry
+        sensors = [(ch, s) for ch in chassis_list for s in self.working_sensors[ch]
+                   if not registry.has_flag(ch, s, FINE_ZEROED)]
+        if not sensors:
+            sensors = [(ch, s) for ch in chassis_list for s in self.working_sensors[ch]]
+        self.fService.stop_data()
+        for flag, tune in ((RESTARTED, self.fService.restart_sensor),
+                           (COARSE_ZEROED, self.fService.coarse_zero_sensor),
+                           (FINE_ZEROED, self.fService.fine_zero_sensor)):
+            for ch, s in sensors:
+                registry.clear_flag(ch, s, flag)
+                tune(ch, s)
+                time.sleep(.1)
+            deadline = time.monotonic() + self.settings.watchdog_tune_timeout
+            while not all(registry.has_flag(ch, s, flag) for ch, s in sensors):
+                if time.monotonic() > deadline:
+                    raise RuntimeError('sensors %s did not finish tuning' % sensors)
+                time.sleep(.1)
+        self.fService.start_data()
+
+    def write_gap(self, n_samples):
+        """Write n_samples of NaN for data lost in a stall, marked by a gap event."""
+        self.event_marker.mark_sample('fieldline_gap', str(n_samples), self.samples_decoded,
+                                      n_samples)
+        max_samples = self.chunk_pool.max_samples
+        for start in range(0, n_samples, max_samples):
+            chunk = self.acquire_chunk(min(max_samples, n_samples - start))
+            chunk.data.fill(np.nan)
+            chunk.first_sample = self.samples_decoded
+            self.samples_decoded += len(chunk.data)
+            if self.writer_thread is not None:
+                self.write_q.put(chunk)
+            else:
+                self.write_chunk(chunk)
+
+    def parse_data(self, data, t=None):
+        if t is None:
+            t = time.monotonic()
+        if self.watchdog is not None:
+            self.watchdog.feed(data, t)
+        self.timeline.update(data, self.samples_decoded, t)
+        if self.arrival_log is not None:
+            self.arrival_log.record(self.samples_decoded, len(data), t)
+        max_samples = self.chunk_pool.max_samples
+        for start in range(0, len(data), max_samples):
+            self.decode_chunk(data[start:start + max_samples])
+        for stream in self.low_rate_streams:
+            stream.process(data, self.data_stream_multiplier)
+
+    def decode_chunk(self, data):
+        raw = self.channel_decoder.decode(data, self.raw_buffer[:len(data)])
+        scale = self.channel_decoder.calibration(data[0]) * self.data_stream_multiplier
+        if self.archive is not None:
+            self.archive.write(raw, scale)
+        chunk = self.acquire_chunk(len(data))
+        np.multiply(raw, scale, out=chunk.data, casting='unsafe')
+        if self.watchdog is not None and self.watchdog.nan_columns is not None:
+            chunk.data[:, self.watchdog.nan_columns] = np.nan
+        chunk.first_sample = self.samples_decoded
+        self.samples_decoded += len(data)
+        if self.writer_thread is not None:
+            self.write_q.put(chunk)
+        else:
+            self.write_chunk(chunk)
+
+    def acquire_chunk(self, n_samples):
+        try:
+            return self.chunk_pool.acquire(n_samples, self.settings.chunk_acquire_timeout)
+        except queue.Empty:
+            raise IOError('No chunk buffer freed up in %g s, the writer is stuck (%s)'
+                          % (self.settings.chunk_acquire_timeout, self.writer_error))
+
+    def write_chunk(self, chunk):
+        try:
+            data = self.pipeline.process(chunk.data)
+            with self.ft_lock:
+                self.ft_client.putData(data, self.settings.ft_put_response)
+                self.timeline.chunk_written(chunk.first_sample + len(data) - 1)
+                self.sample_clock.advance(len(data))
+                events = self.event_marker.take()
+                if events:
+                    self.ft_client.putEvents(events)
+        finally:
+            chunk.release()
+
+    def data_writer_thread(self):
+        # just below the acquisition thread, which must never wait on it
+        realtime.setup_thread(self.settings, -1)
+        while True:
+            chunk = self.write_q.get()
+            if chunk is None:
+                break
+            try:
+                self.write_chunk(chunk)
+            except Exception as err:
+                # write_chunk released the chunk, so keep going with the next one
+                self.writer_errors += 1
+                if self.writer_error is None or self.writer_errors % 1000 == 0:
+                    logger.error("Writing chunk at sample %i failed (%i so far): %s",
+                                 chunk.first_sample, self.writer_errors, err,
+                                 exc_info=self.writer_error is None)
+                self.writer_error = err
+
+    def start_writer(self):
+        if self.writer_thread is None:
+            self.writer_error = None
+            self.writer_errors = 0
+            self.writer_thread = threading.Thread(target=self.data_writer_thread, daemon=True)
+            self.writer_thread.start()
+
+    def stop_writer(self):
+        if self.writer_thread is not None:
+            self.write_q.put(None)
+            if self.writer_thread is not threading.current_thread():
+                self.writer_thread.join()
+            self.writer_thread = None
+
+    def mark(self, type, value, time=None, duration=0):
+        return self.event_marker.mark(type, value, time, duration)
+
+    def data_retreiver_thread(self):
+        realtime.setup_thread(self.settings)
+        while self.measure():
+            try:
+                t, data = self.fConnector.data_q.get(timeout=.5)
+            except queue.Empty:
+                continue
+            # when this thread gets the packet, to show its own scheduling
+            self.jitter.tick(len(data) / self.sample_freq)
+            try:
+                self.parse_data(data, t)
+            except Exception as err:
+                logger.error("Packet at sample %i dropped: %s", self.samples_decoded, err,
+                             exc_info=True)
+            self.fConnector.data_q.task_done()
+
+    def init_fieldline_connection(self):
+        if self.fService.is_service_running() is True:
+            return True
+        self.fService.start()
+        print("Fieldline service started.")
+        print("About to connect to ips : " + str(self.settings.ip_list))
+        output = self.fService.connect(self.settings.ip_list)
+        print(str(output))
+        # every chassis comes up on its own, so this waits for the slowest one
+        timeout = self.settings.connect_timeout
+        deadline = time.monotonic() + timeout
+        missing = self.fConnector.wait_for_chassis(self.working_chassis, timeout)
+        if missing:
+            print("Doh! Chassis " + str(missing) + " did not connect after " +
+                  str(timeout) + " s")
+        else:
+            missing = self.fConnector.wait_for_sensors(self.working_chassis,
+                                                       max(deadline - time.monotonic(), 0.))
+            if missing:
+                print("Doh! No Fieldline Device Detected on chassis " + str(missing) +
+                      " after " + str(timeout) + " s")
+        if missing:
+            # or the next call would find the service running and take it as connected
+            self.fService.stop()
+            return False
+        print("Fieldline service connected.")
+        with ThreadPoolExecutor(max_workers=len(self.working_chassis)) as pool:
+            versions = list(pool.map(self.fService.get_version, self.working_chassis))
+        for chassis, version in zip(self.working_chassis, versions):
+            print("Connection with chassis: " + str(chassis) + "... OK")
+            print("Chassis " + str(version))
+        print("---")
+        return True
+
+    def init_fieldtrip_connection(self):
+        self.connect_to_fieldtrip_buffer()
+        self.init_pipeline()
+        self.init_ft_header()
+        for stream in self.low_rate_streams:
+            stream.open()
+        self.open_archive()
+
+    def open_archive(self):
+        s = self.settings
+        self.close_archive()
+        if s.archive_file is not None:
+            self.archive = ArchiveWriter(s.archive_file, self.channel_map.labels,
+                                         self.channel_map.keys, self.sample_freq,
+                                         int(round(s.archive_block_seconds * self.sample_freq)))
+
+    def close_archive(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+    def stop_measurement(self):
+        if self._service is not None and self.measure() is True:
+            self.process_data(False)
+            self.stop_watchdog()
+            self.measure(False)
+            if (self.acquisition_thread is not None and
+                    self.acquisition_thread is not threading.current_thread()):
+                self.acquisition_thread.join()
+                self.acquisition_thread = None
+            self.stop_writer()
+            self.fService.stop_data()
+            if self.memory_locked:
+                realtime.unlock_memory()
+                self.memory_locked = False
+
+    def stop_service(self):
+        if self._service is not None and self._service.is_service_running():
+            self._service.stop()
+        self.pipeline.stop()
+        for stream in self.low_rate_streams:
+            stream.close()
+        self.close_archive()
+
+    def close(self):
+        """close() -- stop everything this session started."""
+        self.stop_measurement()
+        self.stop_service()
+        if self.history_reader is not None:
+            self.history_reader.close()
+            self.history_reader = None
+        self.ft_client.disconnect()
@@ -0,0 +1,28 @@
+"""
+Destinations for processed chunks.
+"""
+
+from .FieldTrip import Client, DATATYPE_FLOAT32
+
+
+class FieldTripSink:
+
+    """Writes chunks to a FieldTrip buffer of its own, with its own header."""
+
+    def __init__(self, hostname='localhost', port=1972,
+                 data_type=DATATYPE_FLOAT32):
+        self.hostname = hostname
+        self.port = port
+        self.data_type = data_type
+        self.client = Client()
+
+    def open(self, labels, sample_freq):
+        if not self.client.isConnected:
+            self.client.connect(self.hostname, self.port)
+        self.client.putHeader(len(labels), sample_freq, self.data_type, labels)
+
+    def write(self, chunk):
+        self.client.putData(chunk)
+
+    def close(self):
+        self.client.disconnect()
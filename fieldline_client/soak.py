@@ -0,0 +1,195 @@
+"""
+Soak test of the whole acquisition path -- phantom device, decoding,
+writer thread, putData to a local buffer -- for a long time and faster than
+real time, watching the process for resources that keep growing.
+
+    python -m fieldline_client.soak --buffer buffer/linux/buffer --duration 600 --speed 6
+
+Every --interval seconds it samples the RSS, threads, open file
+descriptors, queue depths, write latency and how far the written samples
+lag behind the phantom. After the warm-up, a metric that grows through the
+run by more than its limit (see LIMITS, --limit) fails the soak, and the
+exit status is 1.
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+# growth allowed over the run, after the warm-up
+LIMITS = {
+    'rss_mb': 20.,
+    'threads': .5,
+    'fds': .5,
+    'data_q': 20.,
+    'write_q': 2.,
+    'latency_p95_ms': 5.,
+    'lag_ms': 100.,
+}
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as fid:
+            return int(fid.read().split()[1]) * mmap.PAGESIZE
+    except (IOError, OSError):
+        # peak, not current, but still only grows with a leak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def open_fds():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return np.nan
+
+
+def sample_resources(session, elapsed, rate):
+    """One row of metrics, 'elapsed' s into a run streaming 'rate' samples/s."""
+    stats = session.timeline.latency_stats()
+    latency = stats['write'][1] * 1e3 if 'write' in stats else np.nan
+    written = session.sample_clock.samples_written()
+    return {'time': elapsed,
+            'rss_mb': rss_bytes() / 1e6,
+            'threads': threading.active_count(),
+            'fds': open_fds(),
+            'data_q': session.fConnector.data_q.qsize(),
+            'write_q': session.write_q.qsize(),
+            'latency_p95_ms': latency,
+            'lag_ms': (elapsed - written / rate) * 1e3,
+            'samples': written}
+
+
+def steady_growth(times, values, limit):
+    """
+    steady_growth(times, values, limit) -- (growth, failed): the growth of
+    the least-squares line over the run, failing when it is above 'limit'
+    and the medians of the four quarters of the run never go down.
+    """
+    ok = np.isfinite(values)
+    times, values = np.asarray(times)[ok], np.asarray(values)[ok]
+    if len(values) < 8:
+        return 0., False
+    slope = np.polyfit(times, values, 1)[0]
+    growth = slope * (times[-1] - times[0])
+    medians = [np.median(part) for part in np.array_split(values, 4)]
+    monotonic = all(b >= a for a, b in zip(medians[:-1], medians[1:]))
+    return float(growth), bool(growth > limit and monotonic)
+
+
+def analyse(rows, warmup=.2, limits=LIMITS):
+    """[(metric, growth, limit, failed)] over the rows after the warm-up fraction."""
+    rows = rows[int(len(rows) * warmup):]
+    times = [row['time'] for row in rows]
+    results = []
+    for metric, limit in sorted(limits.items()):
+        growth, failed = steady_growth(times, [row[metric] for row in rows], limit)
+        results.append((metric, growth, limit, failed))
+    return results
+
+
+def run_soak(settings, duration, interval=5., progress=True):
+    """Stream for 'duration' seconds with 'settings', returning the sampled rows."""
+    from .session import AcquisitionSession
+    session = AcquisitionSession(settings)
+    rate = session.sample_freq * settings.phantom_speed
+    rows = []
+    try:
+        if not session.init_fieldline_connection():
+            raise RuntimeError('No chassis connected')
+        session.init_fieldtrip_connection()
+        session.init_acquisition()
+        start = time.monotonic()
+        next_time = start
+        while True:
+            next_time += interval
+            time.sleep(max(next_time - time.monotonic(), 0))
+            elapsed = time.monotonic() - start
+            row = sample_resources(session, elapsed, rate)
+            rows.append(row)
+            if progress:
+                print('%7.0f s (%5.2f h simulated)  RSS %7.1f MB  threads %3i  fds %4s  '
+                      'data_q %4i  write_q %2i  p95 %6.2f ms  lag %7.1f ms'
+                      % (elapsed, elapsed * settings.phantom_speed / 3600., row['rss_mb'],
+                         row['threads'], row['fds'], row['data_q'], row['write_q'],
+                         row['latency_p95_ms'], row['lag_ms']))
+            if elapsed >= duration:
+                break
+        session.stop_measurement()
+    finally:
+        session.close()
+    return rows
+
+
+def write_csv(fname, rows):
+    with open(fname, 'w', newline='') as fid:
+        writer = csv.DictWriter(fid, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=600.,
+                        help='seconds of wall-clock time')
+    parser.add_argument('--speed', type=float, default=4.,
+                        help='phantom data rate, in times real time')
+    parser.add_argument('--interval', type=float, default=5.,
+                        help='seconds between samples of the metrics')
+    parser.add_argument('--warmup', type=float, default=.2,
+                        help='fraction of the run left out of the growth checks')
+    parser.add_argument('--packet-size', type=int, default=10)
+    parser.add_argument('--port', type=int, default=1972)
+    parser.add_argument('--buffer', default=None,
+                        help='buffer executable to start on --port for the run')
+    parser.add_argument('--csv', default=None, help='write the sampled metrics here')
+    parser.add_argument('--limit', action='append', default=[], metavar='METRIC=GROWTH',
+                        help='override a growth limit, e.g. rss_mb=50')
+    args = parser.parse_args()
+
+    limits = dict(LIMITS)
+    for item in args.limit:
+        metric, value = item.split('=')
+        if metric not in limits:
+            parser.error('Unknown metric %s (one of %s)' % (metric, ', '.join(sorted(limits))))
+        limits[metric] = float(value)
+
+    from .session import session_settings
+    settings = session_settings(use_phantom=True, ft_port=args.port,
+                                phantom_packet_size=args.packet_size,
+                                phantom_speed=args.speed)
+    settings.chunk_max_samples = max(settings.chunk_max_samples, args.packet_size)
+    buffer_process = None
+    if args.buffer is not None:
+        buffer_process = subprocess.Popen([args.buffer, str(args.port)])
+        time.sleep(.5)
+    try:
+        rows = run_soak(settings, args.duration, args.interval)
+    finally:
+        if buffer_process is not None:
+            buffer_process.terminate()
+            buffer_process.wait()
+
+    if args.csv is not None:
+        write_csv(args.csv, rows)
+    print('Growth after %i%% warm-up over %.2f simulated hours:'
+          % (args.warmup * 100, rows[-1]['time'] * args.speed / 3600.))
+    failed = False
+    for metric, growth, limit, metric_failed in analyse(rows, args.warmup, limits):
+        failed |= metric_failed
+        print('\t%-16s %+10.2f  (limit %g)%s' % (metric, growth, limit,
+                                                 '  STEADY GROWTH' if metric_failed else ''))
+    print('FAILED' if failed else 'PASSED')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,19 @@
+from . import lib
+from . import timing
 from .lib import (init_fieldline_connection, init_sensors,
-                  init_acquisition, stop_measurement,
-                  stop_service, init_fieldtrip_connection)
+                  init_acquisition, stop_service,
+                  init_fieldtrip_connection,
+                  set_projector, print_quality_status, print_latency,
+                  print_jitter, run_diagnostics)
 
 def connect():
     print("About to Connect")
-    init_fieldline_connection()
+    if not init_fieldline_connection():
+        raise RuntimeError("Could not connect to the FieldLine chassis")
+    timing.mark('connect to FieldLine chassis')
     init_fieldtrip_connection()
+    timing.mark('connect to FieldTrip buffer')
+    timing.print_report()
 
 def tune_sensors():
     init_sensors()
@@ -18,16 +26,28 @@ def start_measurement():
     #     print("Sensors are not initialized")
 
 def stop_measurement():
-    stop_measurement()
+    lib.stop_measurement()
 
 def disconnect():
     stop_service()
 
+def load_projector():
+    fname = input("Projector file: ")
+    try:
+        set_projector(fname)
+    except (IOError, ValueError) as err:
+        print("Could not load projector: " + str(err))
+
 def print_commands():
     print("Commands:")
     print("\tInitialize sensors - init")
     print("\tStart Measurment - start")
     print("\tStop Measurement - stop")
+    print("\tLoad projector - projector")
+    print("\tSignal quality - status")
+    print("\tAcquisition latency - latency")
+    print("\tPacket jitter - jitter")
+    print("\tWrite diagnostics - diag")
     print("\tDisconnect and exit - exit")
 
 def main():
@@ -58,6 +78,16 @@ def main():
             stop_measurement()
         elif command == "init":
             tune_sensors()
+        elif command == "projector":
+            load_projector()
+        elif command == "status":
+            print_quality_status()
+        elif command == "latency":
+            print_latency()
+        elif command == "jitter":
+            print_jitter()
+        elif command == "diag":
+            run_diagnostics()
         elif command == "exit":
             print("Exiting program.")
             continue_loop = False
@@ -0,0 +1,34 @@
+"""
+Startup timing marks. Set FIELDLINE_CLIENT_TIMING=1 to print the report
+from the fieldline_client console.
+"""
+
+import os
+import time
+
+_start = time.perf_counter()
+_marks = []
+
+
+def enabled():
+    return os.environ.get('FIELDLINE_CLIENT_TIMING', '') not in ('', '0')
+
+
+def mark(label):
+    """mark(label) -- record that 'label' finished now."""
+    _marks.append((label, time.perf_counter()))
+
+
+def report():
+    lines = ['Startup timing (ms):']
+    last = _start
+    for label, t in _marks:
+        lines.append('\t%8.1f  %8.1f  %s' % ((t - _start) * 1e3,
+                                             (t - last) * 1e3, label))
+        last = t
+    return '\n'.join(lines)
+
+
+def print_report():
+    if enabled():
+        print(report())
@@ -0,0 +1,197 @@
+"""
+Stall detection and staged recovery of the FieldLine stream.
+
+The acquisition thread feeds every packet to a StreamWatchdog, which keeps
+the arrival time (stamped by the connector) of the last packet from every
+chassis. A chassis silent for 'stall_timeout' seconds is stalled: the
+on_stall callbacks are told, and the recovery stages are tried one after
+the other, each given 'recovery_timeout' seconds to bring the data back,
+until the chassis streams again (on_recover) or the stages run out. While
+packets are still waiting to be fed ('pending'), the consumer is behind,
+not the hardware, so nothing is declared stalled and no stage is run.
+
+While a chassis is stalled but the others go on, its channels are NaN.
+When the whole stream comes back after a stall, the on_gap callbacks get
+the number of samples lost before on_recover is called, so the sample
+counter can skip them. The loss is counted in device timestamps, with the
+ticks per sample of the AcquisitionTimeline; only if the device clock
+restarted is it estimated from the arrival times.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger('fieldline_client.watchdog')
+
+
+class StreamWatchdog:
+
+    """
+    StreamWatchdog(channel_map, sample_freq [, stall_timeout,
+    recovery_timeout, stages, check_interval, timeline, pending]) --
+    'stages' are callables taking the list of stalled chassis, tried in
+    order. 'pending' returns how many packets arrived but were not fed yet.
+    """
+
+    def __init__(self, channel_map, sample_freq, stall_timeout=2., recovery_timeout=10.,
+                 stages=(), check_interval=.25, timeline=None, pending=None):
+        self.sample_freq = float(sample_freq)
+        self.stall_timeout = stall_timeout
+        self.recovery_timeout = recovery_timeout
+        self.stages = list(stages)
+        self.check_interval = check_interval
+        self.timeline = timeline
+        self.pending = pending
+        self.keys = {chassis: channel_map.keys[cols[0]]
+                     for chassis, cols in channel_map.chassis_columns.items()}
+        self.columns = dict(channel_map.chassis_columns)
+        self.on_stall = []
+        self.on_gap = []
+        self.on_recover = []
+        self.lock = threading.Lock()
+        self.last_packet = {}
+        self.last_timestamp = {}
+        self.last_time = None
+        self.stalled = set()
+        self.stream_stalled = False
+        # channels to blank while their chassis is stalled, None if none are
+        self.nan_columns = None
+        self.stage = 0
+        self.stage_start = None
+        self.stalls = 0
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self):
+        now = time.monotonic()
+        with self.lock:
+            # the stream gets stall_timeout to start, like any other gap
+            self.last_packet = {chassis: now for chassis in self.keys}
+            self.last_timestamp = {}
+            self.last_time = now
+            self.stalled = set()
+            self.stream_stalled = False
+            self.nan_columns = None
+        self.running.set()
+        self.thread = threading.Thread(target=self.watchdog_thread, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            if self.thread is not threading.current_thread():
+                self.thread.join()
+            self.thread = None
+
+    def feed(self, samples, t=None):
+        """feed(samples [, t]) -- a packet arrived at host time 't'."""
+        if t is None:
+            t = time.monotonic()
+        last = samples[-1]
+        recovered = []
+        with self.lock:
+            lost = 0
+            if self.stream_stalled:
+                lost = self.lost_samples(samples, t)
+                self.stream_stalled = False
+            for chassis, key in self.keys.items():
+                if key in last:
+                    self.last_packet[chassis] = t
+                    self.last_timestamp[chassis] = last[key]['timestamp']
+                    if chassis in self.stalled:
+                        recovered.append(chassis)
+            self.last_time = t
+            if recovered:
+                self.stalled.difference_update(recovered)
+                self.update_nan_columns()
+        if lost:
+            for callback in self.on_gap:
+                callback(lost)
+        if recovered:
+            self.recovered(recovered)
+
+    def lost_samples(self, samples, t):
+        """Samples missing between the last packet fed and 'samples'."""
+        ticks_per_sample = self.timeline.ticks_per_sample if self.timeline is not None else None
+        if ticks_per_sample:
+            for chassis, key in self.keys.items():
+                if key in samples[0] and chassis in self.last_timestamp:
+                    ticks = samples[0][key]['timestamp'] - self.last_timestamp[chassis]
+                    if ticks > 0:
+                        return max(int(round(ticks / ticks_per_sample)) - 1, 0)
+        # no timestamps to go by, or the device clock started again
+        return max(int(round((t - self.last_time) * self.sample_freq)) - len(samples), 0)
+
+    def consumer_behind(self):
+        return self.pending is not None and self.pending() > 0
+
+    def update_nan_columns(self):
+        if self.stalled:
+            self.nan_columns = np.concatenate([self.columns[c] for c in sorted(self.stalled)])
+        else:
+            self.nan_columns = None
+
+    def check(self, t=None):
+        """Mark the chassis silent for too long as stalled, return the new ones."""
+        if t is None:
+            t = time.monotonic()
+        if self.consumer_behind():
+            return []
+        with self.lock:
+            new = [chassis for chassis, last in self.last_packet.items()
+                   if chassis not in self.stalled and t - last > self.stall_timeout]
+            if new:
+                self.stalled.update(new)
+                self.update_nan_columns()
+                if self.stalled == set(self.keys):
+                    self.stream_stalled = True
+        return new
+
+    def recovered(self, chassis_list):
+        log.warning("Stream from chassis %s is back", chassis_list,
+                    extra={'event': 'stream_recovered'})
+        if not self.stalled:
+            self.stage = 0
+            self.stage_start = None
+        for callback in self.on_recover:
+            callback(chassis_list)
+
+    def watchdog_thread(self):
+        while self.running.is_set():
+            time.sleep(self.check_interval)
+            t = time.monotonic()
+            new = self.check(t)
+            if new:
+                self.stalls += 1
+                log.error("No data from chassis %s for %.1f s", new, self.stall_timeout,
+                          extra={'event': 'stream_stalled'})
+                for callback in self.on_stall:
+                    callback(new)
+                if self.stage_start is None:
+                    self.stage = 0
+                    self.stage_start = t - self.recovery_timeout
+            with self.lock:
+                stalled = sorted(self.stalled)
+            if not stalled or self.stage_start is None:
+                continue
+            if t - self.stage_start < self.recovery_timeout or self.consumer_behind():
+                continue
+            if self.stage == len(self.stages):
+                log.error("Every recovery stage failed for chassis %s", stalled,
+                          extra={'event': 'stream_recovery'})
+                # wait for the data to come back by itself
+                self.stage_start = None
+                continue
+            stage = self.stages[self.stage]
+            self.stage += 1
+            log.warning("Recovering chassis %s, stage %i: %s", stalled, self.stage,
+                        stage.__name__, extra={'event': 'stream_recovery'})
+            try:
+                stage(stalled)
+            except Exception as err:
+                log.error("Recovery stage %s failed: %s", stage.__name__, err,
+                          extra={'event': 'stream_recovery'})
+            self.stage_start = time.monotonic()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from fieldline_client.archive import ArchiveReader, ArchiveWriter
+
+LABELS = ['0|01', '0|02', '1|01']
+KEYS = ['00:01:28', '00:02:28', '01:01:28']
+
+
+def write_archive(fname, counts, scales, chunk=37, block_samples=100):
+    writer = ArchiveWriter(fname, LABELS, KEYS, 1000., block_samples)
+    for start in range(0, len(counts), chunk):
+        writer.write(counts[start:start + chunk], scales[start])
+    writer.close()
+
+
+def archive_data(n_samples=1000):
+    rng = np.random.default_rng(0)
+    counts = rng.integers(-150000, 150000, (n_samples, len(LABELS))).astype(np.int32)
+    scales = np.empty((n_samples, len(LABELS)))
+    # the calibration changes once, on a chunk boundary
+    scales[:37 * 10] = [1e-16, 2e-16, 3e-16]
+    scales[37 * 10:] = [1.5e-16, 2e-16, 3e-16]
+    return counts, scales
+
+
+def test_archive_round_trip(tmp_path):
+    fname = str(tmp_path / 'rec.flarch')
+    counts, scales = archive_data()
+    write_archive(fname, counts, scales)
+    reader = ArchiveReader(fname)
+    try:
+        assert reader.labels == LABELS and reader.n_samples == len(counts)
+        np.testing.assert_array_equal(reader.read(0, len(counts)), counts)
+        np.testing.assert_array_equal(reader.read(333, 777), counts[333:777])
+        np.testing.assert_allclose(reader.read(0, len(counts), calibrated=True), counts * scales)
+        blocks = list(reader.iter_blocks())
+        assert blocks[0][0] == 0
+        np.testing.assert_array_equal(np.concatenate([data for _, data in blocks]), counts)
+    finally:
+        reader.close()
+
+
+def test_archive_without_index(tmp_path):
+    fname = str(tmp_path / 'rec.flarch')
+    counts, scales = archive_data()
+    write_archive(fname, counts, scales)
+    # a writer that died leaves the blocks, not the index, and maybe half a block
+    reader = ArchiveReader(fname)
+    last_block = reader.index[-1][2]
+    reader.close()
+    with open(fname, 'r+b') as fid:
+        fid.truncate(last_block + 10)
+    reader = ArchiveReader(fname)
+    try:
+        n_samples = reader.n_samples
+        assert 0 < n_samples < len(counts)
+        np.testing.assert_array_equal(reader.read(0, n_samples), counts[:n_samples])
+    finally:
+        reader.close()
@@ -0,0 +1,25 @@
+import numpy as np
+from scipy import signal
+
+from fieldline_client.decimation import FIRDecimator
+
+
+def test_decimator_matches_reference():
+    x = np.random.default_rng(0).standard_normal((1000, 4))
+    decimator = FIRDecimator(4, 4)
+    out = np.concatenate([decimator.process(x[start:start + 37])
+                          for start in range(0, len(x), 37)])
+    reference = signal.lfilter(decimator.taps, 1., x, axis=0)[::4]
+    np.testing.assert_allclose(out, reference, atol=1e-5)
+
+
+def test_decimator_response():
+    for factor in (2, 4, 10):
+        decimator = FIRDecimator(factor, 1)
+        # frequencies relative to the output Nyquist frequency
+        freqs = np.linspace(0., factor / 2., 4000)
+        _, response = signal.freqz(decimator.taps, worN=freqs * np.pi / factor)
+        gain = 20 * np.log10(np.abs(response) + 1e-20)
+        passband = freqs <= .8
+        assert np.ptp(gain[passband]) < .04
+        assert gain[freqs >= 1.].max() < -59.
@@ -0,0 +1,64 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from fieldline_client.fif import FIFF_DATA_BUFFER, FIFF_NCHAN, FIFF_SFREQ, FifSink, part_name
+
+LABELS = ['0|01', '0|02', '1|01']
+
+
+def read_tags(fname):
+    """(kind, data) of every tag of a FIF file."""
+    tags = []
+    with open(fname, 'rb') as fid:
+        while True:
+            header = fid.read(16)
+            if len(header) < 16:
+                return tags
+            kind, type, size, next = struct.unpack('>iiii', header)
+            tags.append((kind, fid.read(size)))
+
+
+def write_fif(fname, data, split_size=500000000):
+    sink = FifSink(fname, buffer_seconds=.1, split_size=split_size)
+    sink.open(LABELS, 1000.)
+    for start in range(0, len(data), 23):
+        sink.write(data[start:start + 23])
+    sink.close()
+    assert sink.error is None
+
+
+def fif_data(n_samples=1000):
+    rng = np.random.default_rng(1)
+    return (rng.standard_normal((n_samples, len(LABELS))) * 1e-12).astype(np.float32)
+
+
+def test_fif_buffers_round_trip(tmp_path):
+    fname = str(tmp_path / 'rec_raw.fif')
+    data = fif_data()
+    write_fif(fname, data, split_size=5000)
+    parts = []
+    part = 0
+    while os.path.exists(part_name(fname, part)):
+        parts.append(read_tags(part_name(fname, part)))
+        part += 1
+    assert len(parts) > 1
+    for tags in parts:
+        assert struct.unpack('>i', dict(tags)[FIFF_NCHAN]) == (len(LABELS),)
+        assert struct.unpack('>f', dict(tags)[FIFF_SFREQ]) == (1000.,)
+    buffers = [np.frombuffer(value, dtype='>f4').reshape(-1, len(LABELS))
+               for tags in parts for kind, value in tags if kind == FIFF_DATA_BUFFER]
+    np.testing.assert_array_equal(np.concatenate(buffers), data)
+
+
+def test_fif_reads_in_mne(tmp_path):
+    mne = pytest.importorskip('mne')
+    fname = str(tmp_path / 'rec_raw.fif')
+    data = fif_data()
+    write_fif(fname, data, split_size=5000)
+    raw = mne.io.read_raw_fif(fname, preload=True, verbose='error')
+    assert raw.ch_names == LABELS
+    assert raw.info['sfreq'] == 1000.
+    np.testing.assert_allclose(raw.get_data().T, data, rtol=1e-6)
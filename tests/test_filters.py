@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from fieldline_client.filters import SOSFilter, design_sos, sos_highpass, sos_lowpass
+
+signal = pytest.importorskip('scipy.signal')
+
+SAMPLE_FREQ = 1000.
+
+
+def test_butterworth_matches_scipy():
+    for design, btype in ((sos_lowpass, 'lowpass'), (sos_highpass, 'highpass')):
+        sos = design(40., SAMPLE_FREQ, order=4)
+        ref = signal.butter(4, 40., btype, fs=SAMPLE_FREQ, output='sos')
+        _, h = signal.sosfreqz(sos, 512, fs=SAMPLE_FREQ)
+        _, h_ref = signal.sosfreqz(ref, 512, fs=SAMPLE_FREQ)
+        np.testing.assert_allclose(np.abs(h), np.abs(h_ref), atol=1e-9)
+
+
+def test_chunked_filter_matches_sosfilt():
+    rng = np.random.default_rng(0)
+    sos = design_sos(SAMPLE_FREQ, (1., 100.), (60., 120.))
+    x = rng.standard_normal((3000, 5)) + 10.
+    sos_filter = SOSFilter(sos, 5)
+    y = np.concatenate([sos_filter.process(x[i:i + 37]) for i in range(0, len(x), 37)])
+    # the filter starts from the steady state of the first sample
+    zi = signal.sosfilt_zi(sos)[:, :, np.newaxis] * x[0]
+    ref, _ = signal.sosfilt(sos, x, axis=0, zi=zi)
+    np.testing.assert_allclose(y, ref, atol=1e-5)
+
+
+def test_nan_chunk_does_not_corrupt_state():
+    rng = np.random.default_rng(1)
+    sos = design_sos(SAMPLE_FREQ, (1., 100.))
+    x = rng.standard_normal((400, 3))
+    gap = x.copy()
+    gap[100:110, 1] = np.nan
+    sos_filter = SOSFilter(sos, 3)
+    y = np.concatenate([sos_filter.process(gap[i:i + 10]) for i in range(0, len(gap), 10)])
+    assert np.isfinite(sos_filter.zi).all()
+    assert np.isnan(y[100:110, 1]).all()
+    assert np.isfinite(np.delete(y, np.s_[100:110], axis=0)).all()
+    # the other channels never noticed
+    ref_filter = SOSFilter(sos, 3)
+    ref = np.concatenate([ref_filter.process(x[i:i + 10]) for i in range(0, len(x), 10)])
+    np.testing.assert_allclose(y[:, [0, 2]], ref[:, [0, 2]], atol=1e-6)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+
+import numpy as np
+import pytest
+
+from fieldline_client.livestream import (FRAME_HEADER, FRAME_MAGIC, MAX_DECIMATION, OP_BINARY,
+                                         OP_TEXT, LiveStreamServer, Viewer)
+
+LABELS = ['a', 'b', 'c']
+
+
+class FakeWriter:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def unpack(frame):
+    magic, first, n_rows, n_channels, factor = FRAME_HEADER.unpack_from(frame)
+    assert magic == FRAME_MAGIC
+    data = np.frombuffer(frame[FRAME_HEADER.size:], dtype=np.float32)
+    return first, factor, data.reshape(-1, n_rows, n_channels)
+
+
+def test_configure_and_envelope():
+    viewer = Viewer(FakeWriter(), len(LABELS), 4)
+    viewer.configure({'channels': ['c', 0], 'decimate': 4}, LABELS)
+    chunk = np.arange(30, dtype=np.float32).reshape(10, 3)
+    first, factor, (mins, maxs) = unpack(viewer.frame(0, chunk))
+    assert (first, factor) == (0, 4)
+    np.testing.assert_array_equal(mins, chunk[[0, 4]][:, [2, 0]])
+    np.testing.assert_array_equal(maxs, chunk[[3, 7]][:, [2, 0]])
+    # the two samples left over start the next bin
+    first, _, (mins, _) = unpack(viewer.frame(10, chunk[:2]))
+    assert first == 8
+    np.testing.assert_array_equal(mins[0], chunk[[8, 9, 0, 1]][:, [2, 0]].min(axis=0))
+
+
+def test_configure_rejects_bad_requests():
+    viewer = Viewer(FakeWriter(), len(LABELS), 4)
+    for message, error in (([1, 2], TypeError), ({'channels': [3]}, IndexError),
+                           ({'channels': ['x']}, ValueError),
+                           ({'decimate': 1e999}, OverflowError)):
+        with pytest.raises(error):
+            viewer.configure(message, LABELS)
+    viewer.configure({'decimate': 10 ** 9}, LABELS)
+    assert viewer.factor == MAX_DECIMATION
+
+
+def test_bad_viewer_does_not_stop_the_others():
+    server = LiveStreamServer()
+    server.labels = LABELS
+    good, bad = Viewer(FakeWriter(), 3, 4), Viewer(FakeWriter(), 3, 4)
+    bad.picks = np.array([7])
+    server.viewers = {good, bad}
+    server.publish(0, np.zeros((5, 3), dtype=np.float32))
+    assert good.frames.qsize() == 1
+    assert bad.writer.closed and server.viewers == {good}
+
+
+def test_open_raises_when_port_is_taken():
+    busy = socket.socket()
+    busy.bind(('127.0.0.1', 0))
+    busy.listen()
+    try:
+        server = LiveStreamServer(port=busy.getsockname()[1])
+        with pytest.raises(OSError):
+            server.open(LABELS, 1000.)
+    finally:
+        busy.close()
+
+
+def masked(opcode, payload):
+    mask = os.urandom(4)
+    return bytes([0x80 | opcode, 0x80 | len(payload)]) + mask + \
+        bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def read_frame(sock):
+    b0, n = sock.recv(2, socket.MSG_WAITALL)
+    if n == 126:
+        n, = struct.unpack('>H', sock.recv(2, socket.MSG_WAITALL))
+    return b0 & 0x0f, sock.recv(n, socket.MSG_WAITALL)
+
+
+def test_publish_to_websocket_client():
+    server = LiveStreamServer(port=0)
+    server.open(LABELS, 1000.)
+    try:
+        port = server.server.sockets[0].getsockname()[1]
+        sock = socket.create_connection(('127.0.0.1', port), timeout=5.)
+        sock.sendall(b'GET / HTTP/1.1\r\nUpgrade: websocket\r\nSec-WebSocket-Key: x\r\n\r\n')
+        assert sock.recv(4096).startswith(b'HTTP/1.1 101')
+        sock.sendall(masked(OP_TEXT, b'"not an object"'))
+        opcode, payload = read_frame(sock)
+        assert opcode == OP_TEXT and 'error' in json.loads(payload)
+        sock.sendall(masked(OP_TEXT, json.dumps({'channels': ['b']}).encode()))
+        # the configuration is applied on the server's loop; wait for it
+        done = asyncio.run_coroutine_threadsafe(asyncio.sleep(.1), server.loop)
+        done.result()
+        chunk = np.arange(6, dtype=np.float32).reshape(2, 3)
+        server.write(chunk)
+        opcode, payload = read_frame(sock)
+        assert opcode == OP_BINARY
+        first, factor, (data,) = unpack(payload)
+        assert (first, factor) == (0, 1)
+        np.testing.assert_array_equal(data, chunk[:, [1]])
+        sock.close()
+    finally:
+        server.close()
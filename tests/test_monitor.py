@@ -0,0 +1,24 @@
+import numpy as np
+
+from fieldline_client.markers import EventMarker
+from fieldline_client.monitor import QualityMonitor, STATUS_FLAT, STATUS_OK
+
+
+def test_status_change_queues_event_at_last_sample():
+    marker = EventMarker(None)
+    monitor = QualityMonitor(interval=0., flat_std=1e-15, event_marker=marker)
+    monitor.start(['a', 'b'], 1000.)
+    rng = np.random.default_rng(0)
+    chunk = (rng.standard_normal((10, 2)) * 1e-12).astype(np.float32)
+    chunk[:, 1] = 1e-9
+    monitor.process(chunk)
+    events = marker.take()
+    assert [(e.type, e.value, e.sample) for e in events] == [('quality', 'b:' + STATUS_FLAT, 9)]
+    assert monitor.get_snapshot()['status'] == [STATUS_OK, STATUS_FLAT]
+
+
+def test_first_publish_has_no_drift():
+    monitor = QualityMonitor(interval=0., drift_rate=1e-12)
+    monitor.start(['a'], 1000.)
+    monitor.process(np.full((10, 1), 5e-9, dtype=np.float32))
+    assert monitor.get_snapshot()['status'] != ['drift']
@@ -0,0 +1,20 @@
+import numpy as np
+
+from fieldline_client.probe import LatencyHistogram
+
+
+def test_percentiles_follow_the_data():
+    rng = np.random.default_rng(0)
+    latencies = rng.uniform(1e-3, 15.16e-3, 20000)
+    histogram = LatencyHistogram()
+    histogram.add(latencies)
+    for q in (50, 95, 99, 100):
+        assert abs(histogram.percentile(q) - np.percentile(latencies, q)) < histogram.bin_width
+    assert histogram.percentile(99) <= histogram.max == latencies.max()
+
+
+def test_single_value():
+    histogram = LatencyHistogram()
+    histogram.add(np.array([2.03e-3, np.nan]))
+    assert histogram.n == 1
+    assert histogram.percentile(99) == 2.03e-3
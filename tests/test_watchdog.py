@@ -0,0 +1,109 @@
+import numpy as np
+
+from fieldline_client.channel_map import ChannelMap, channel_key
+from fieldline_client.clock_sync import AcquisitionTimeline
+from fieldline_client.filters import FilterStage, design_sos
+from fieldline_client.monitor import QualityMonitor, STATUS_NO_DATA, STATUS_OK
+from fieldline_client.pipeline import Pipeline
+from fieldline_client.watchdog import StreamWatchdog
+
+SAMPLE_FREQ = 1000.
+TICKS_PER_SAMPLE = 25
+PACKET = 10
+
+
+def make_map():
+    return ChannelMap([(0, 1, 28, 'a'), (0, 2, 28, 'b'), (1, 1, 28, 'c')])
+
+
+def packet(first, chassis=(0, 1)):
+    keys = [channel_key(c, s) for c, s in ((0, 1), (0, 2), (1, 1)) if c in chassis]
+    return [{key: {'data': 1, 'calibration': 1., 'timestamp': (first + i) * TICKS_PER_SAMPLE}
+             for key in keys} for i in range(PACKET)]
+
+
+class Feeder:
+
+    def __init__(self, pending=None):
+        channel_map = make_map()
+        self.timeline = AcquisitionTimeline(channel_map, SAMPLE_FREQ)
+        self.watchdog = StreamWatchdog(channel_map, SAMPLE_FREQ, stall_timeout=2.,
+                                       timeline=self.timeline, pending=pending)
+        self.gaps = []
+        self.recovered = []
+        self.watchdog.on_gap.append(self.gaps.append)
+        self.watchdog.on_recover.append(self.recovered.append)
+        self.watchdog.last_packet = {chassis: 0. for chassis in self.watchdog.keys}
+        self.watchdog.last_time = 0.
+        self.decoded = 0
+
+    def feed(self, device_sample, t, chassis=(0, 1)):
+        samples = packet(device_sample, chassis)
+        self.watchdog.feed(samples, t)
+        self.timeline.update(samples, self.decoded, t)
+        self.decoded += len(samples)
+
+
+def test_gap_counted_in_device_samples():
+    feeder = Feeder()
+    for i in range(10):
+        feeder.feed(i * PACKET, i * .01)
+    assert feeder.watchdog.check(3.) == [0, 1]
+    assert feeder.watchdog.nan_columns.tolist() == [0, 1, 2]
+    # the device went on counting for 2900 samples, the host saw 4 s go by
+    feeder.feed(3000, 4.)
+    assert feeder.gaps == [3000 - 100]
+    assert sorted(feeder.recovered[0]) == [0, 1]
+    assert feeder.watchdog.nan_columns is None
+
+
+def test_partial_stall_blanks_one_chassis():
+    feeder = Feeder()
+    feeder.feed(0, 0.)
+    feeder.feed(PACKET, 2.5, chassis=(0,))
+    assert feeder.watchdog.check(2.5) == [1]
+    assert feeder.watchdog.nan_columns.tolist() == [2]
+    feeder.feed(2 * PACKET, 2.6)
+    assert feeder.gaps == []
+    assert feeder.watchdog.nan_columns is None
+
+
+def test_consumer_backlog_is_no_stall():
+    backlog = [5]
+    feeder = Feeder(pending=lambda: backlog[0])
+    feeder.feed(0, 0.)
+    assert feeder.watchdog.check(3.) == []
+    backlog[0] = 0
+    assert feeder.watchdog.check(3.) == [0, 1]
+
+
+def test_pipeline_recovers_after_gap():
+    labels = ['a', 'b', 'c']
+    monitor = QualityMonitor(interval=0.)
+    snapshots = []
+    monitor.on_status.append(snapshots.append)
+    pipeline = Pipeline([FilterStage([(None, design_sos(SAMPLE_FREQ, (1., 100.)))], 'replace'),
+                         monitor])
+    pipeline.start(labels, SAMPLE_FREQ)
+    rng = np.random.default_rng(0)
+
+    def chunk():
+        return (rng.standard_normal((PACKET, 3)) * 1e-12 + 1e-9).astype(np.float32)
+
+    for _ in range(50):
+        pipeline.process(chunk())
+    # a whole-stream gap, then a stall of the last channel only
+    pipeline.process(np.full((PACKET, 3), np.nan, dtype=np.float32))
+    assert snapshots[-1]['status'] == [STATUS_NO_DATA] * 3
+    partial = chunk()
+    partial[:, 2] = np.nan
+    out = pipeline.process(partial)
+    assert np.isfinite(out[:, :2]).all() and np.isnan(out[:, 2]).all()
+    assert snapshots[-1]['status'][2] == STATUS_NO_DATA
+    for _ in range(300):
+        out = pipeline.process(chunk())
+    assert np.isfinite(out).all()
+    for name in ('mean', 'std', 'line_power', 'drift'):
+        assert np.isfinite(snapshots[-1][name]).all(), name
+    assert np.isfinite(monitor.psd).all()
+    assert snapshots[-1]['status'] == [STATUS_OK] * 3